@@ -0,0 +1,365 @@
+"""JSON API for the landlord reference form, contract uploads and status polling.
+
+Plain ASGI, no framework; serve it with any ASGI server:
+
+    uvicorn api_app:app --port 8600 --workers 2
+
+Routes:
+    GET  /api/references/{ref}            the reference form: request summary and fields
+    POST /api/references/{ref}            landlord answers (JSON); same rules as the portal form
+    GET  /api/references/{ref}/status     effective status, for the landlord's page to poll
+    GET  /api/requests                    the signed-in tenant's requests with effective status
+    GET  /api/requests/{token}/status     one of them
+    PUT  /api/requests/{token}/contract   raw file body, ?filename=..., Content-Type is stored
+    GET  /healthz
+
+`ref` is the signed value from a reference link. Its signature and age are
+checked on the event loop before any database access. Tenant routes take the
+app's session token (the rr_session cookie, or `Authorization: Bearer`).
+The portal and upload limits from utils_ratelimit apply per client IP and per
+tenant.
+
+Reads run on aiosqlite. Writes, and the rate limiter (whose SQLite store
+takes a write lock per hit), go through the rentright core on a small thread
+pool with one connection per thread, so the API, the portal and the Streamlit
+app share one implementation of the reference and contract rules. The
+Streamlit app remains the staff UI.
+"""
+import asyncio
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.cookies import SimpleCookie
+from urllib.parse import parse_qs
+
+import aiosqlite
+
+from rentright import Config, contracts, open_db, references
+from rentright.db import ensure_schema
+from utils_email import load_secrets
+from utils_jobs import ensure_jobs_table
+from utils_ratelimit import client_address, get_rate_limiter, throttle_key, trusted_proxy_count
+from utils_session import SESSION_COOKIE, get_session_manager
+
+
+MAX_JSON_BYTES = 64 * 1024
+
+# Field -> (type, default) for the landlord form; defaults match the portal's widgets.
+FORM_FIELDS = {
+    "confirm_landlord": ("bool", False),
+    "score": ("int 1-10", 8),
+    "paid_on_time": ("bool", True),
+    "utilities_unpaid": ("bool", False),
+    "good_condition": ("bool", True),
+    "comments": ("str", None),
+}
+
+STATUS_SQL = (
+    f"SELECT rr.status, {references.EFFECTIVE_STATUS_SQL}, rc.status, rr.filled_at "
+    "FROM reference_requests rr LEFT JOIN reference_contracts rc ON rc.token = rr.token WHERE rr.token = ?"
+)
+TENANT_REQUESTS_SQL = (
+    f"SELECT rr.token, rr.landlord_email, rr.created_at, {references.EFFECTIVE_STATUS_SQL}, rr.score, rc.status "
+    "FROM reference_requests rr LEFT JOIN reference_contracts rc ON rc.token = rr.token "
+    "WHERE rr.tenant_id = ? ORDER BY rr.id DESC"
+)
+FORM_SQL = f"SELECT {', '.join(references.REQUEST_FIELDS)} FROM reference_requests WHERE token = ?"
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str, headers: list | None = None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = headers or []
+
+
+# ---------- Database access ----------
+class Database:
+    """Core calls on a thread pool (one connection per thread); reads on aiosqlite."""
+
+    def __init__(self, config: Config, threads: int = 4):
+        self.config = config
+        self._pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="api-db")
+        self._local = threading.local()
+        self._aconn = None
+        self._aconn_lock = asyncio.Lock()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = open_db(self.config)
+        return conn
+
+    async def call(self, fn, *args):
+        """Run `fn(conn, *args)` on the pool; for the rentright core functions."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, lambda: fn(self._conn(), *args))
+
+    async def fetchall(self, sql: str, params: tuple = ()) -> list:
+        if self._aconn is None:
+            async with self._aconn_lock:
+                if self._aconn is None:
+                    conn = await aiosqlite.connect(self.config.db_path, timeout=30)
+                    await conn.execute("PRAGMA busy_timeout=5000;")
+                    self._aconn = conn
+        async with self._aconn.execute(sql, params) as cur:
+            return list(await cur.fetchall())
+
+    async def fetchone(self, sql: str, params: tuple = ()):
+        rows = await self.fetchall(sql, params)
+        return rows[0] if rows else None
+
+    async def close(self):
+        if self._aconn is not None:
+            await self._aconn.close()
+            self._aconn = None
+        self._pool.shutdown(wait=False)
+
+
+# ---------- Request helpers ----------
+async def read_body(receive, limit: int) -> bytes:
+    """The whole request body; 413 as soon as it exceeds `limit` bytes."""
+    chunks, size = [], 0
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            raise HTTPError(400, "Client disconnected.")
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if size > limit:
+            raise HTTPError(413, f"Request body too large (max {limit // 1024} KB).")
+        chunks.append(chunk)
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+async def send_json(send, status: int, payload, headers: list | None = None):
+    body = json.dumps(payload, ensure_ascii=False).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json; charset=utf-8"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"cache-control", b"no-store")] + (headers or []),
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+def header_map(scope) -> dict:
+    return {k.decode("latin-1").title(): v.decode("latin-1") for k, v in scope.get("headers", [])}
+
+
+def parse_answers(body: bytes) -> dict:
+    """Validate the landlord form; missing fields take the portal's defaults."""
+    try:
+        data = json.loads(body or b"{}")
+    except ValueError:
+        raise HTTPError(400, "Body must be JSON.")
+    if not isinstance(data, dict):
+        raise HTTPError(400, "Body must be a JSON object.")
+    answers = {name: data.get(name, default) for name, (_, default) in FORM_FIELDS.items()}
+    for name in ("confirm_landlord", "paid_on_time", "utilities_unpaid", "good_condition"):
+        if not isinstance(answers[name], bool):
+            raise HTTPError(422, f"{name} must be true or false.")
+    score = answers["score"]
+    if isinstance(score, bool) or not isinstance(score, int) or not 1 <= score <= 10:
+        raise HTTPError(422, "score must be an integer from 1 to 10.")
+    if answers["comments"] is not None and not isinstance(answers["comments"], str):
+        raise HTTPError(422, "comments must be a string.")
+    if not answers["confirm_landlord"]:
+        raise HTTPError(422, "Please confirm you were the landlord.")
+    return answers
+
+
+# ---------- Application ----------
+class ReferenceAPI:
+    def __init__(self, config: Config | None = None, threads: int = 4):
+        self._config = config
+        self._threads = threads
+        self.db = None
+
+    @property
+    def config(self) -> Config:
+        if self._config is None:
+            secrets = load_secrets()
+            if os.environ.get("DB_PATH"):
+                secrets["DB_PATH"] = os.environ["DB_PATH"]
+            self._config = Config.from_secrets(secrets)
+        return self._config
+
+    async def startup(self):
+        if self.db is None:
+            conn = open_db(self.config)
+            ensure_schema(conn)  # no-op once the main app has created the tables
+            ensure_jobs_table(conn)  # uploads queue their encryption and preview
+            conn.close()
+            self.db = Database(self.config, self._threads)
+
+    async def shutdown(self):
+        if self.db is not None:
+            await self.db.close()
+            self.db = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self.lifespan(receive, send)
+        if scope["type"] != "http":
+            return
+        await self.startup()  # servers without lifespan support
+        try:
+            status, payload = await self.route(scope, receive)
+            await send_json(send, status, payload)
+        except HTTPError as e:
+            await send_json(send, e.status, {"error": e.message}, e.headers)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await self.startup()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def route(self, scope, receive) -> tuple[int, dict]:
+        method = scope["method"]
+        parts = [p for p in scope["path"].split("/") if p]
+        if parts == ["healthz"]:
+            return 200, {"ok": True}
+        if parts[:2] == ["api", "references"] and len(parts) in (3, 4):
+            await self.throttle(*throttle_key("portal", self.client_ip(scope)))
+            token = references.resolve_reference_link(self.config, parts[2])
+            if not token:
+                # Rejected before any database access
+                raise HTTPError(404, "Invalid or expired reference token.")
+            if len(parts) == 4 and parts[3] == "status" and method == "GET":
+                return 200, await self.reference_status(token)
+            if len(parts) == 3 and method == "GET":
+                return 200, await self.reference_form(token)
+            if len(parts) == 3 and method == "POST":
+                answers = parse_answers(await read_body(receive, MAX_JSON_BYTES))
+                return 200, await self.submit(token, answers)
+        if parts[:2] == ["api", "requests"]:
+            tenant = await self.tenant(scope)
+            if len(parts) == 2 and method == "GET":
+                return 200, await self.tenant_requests(tenant["id"])
+            if len(parts) == 4 and parts[3] == "status" and method == "GET":
+                await self.owned_request(parts[2], tenant["id"])
+                return 200, await self.reference_status(parts[2])
+            if len(parts) == 4 and parts[3] == "contract" and method in ("PUT", "POST"):
+                return 201, await self.upload(scope, receive, parts[2], tenant["id"])
+        raise HTTPError(404, "Not found.")
+
+    # ---------- Guards ----------
+    def client_ip(self, scope) -> str | None:
+        peer = (scope.get("client") or (None, 0))[0]
+        return client_address(header_map(scope), peer, trusted_proxy_count(self.config.secrets))
+
+    async def throttle(self, action: str, key: str):
+        # Off the event loop: the SQLite store writes under BEGIN IMMEDIATE
+        limiter = get_rate_limiter(self.config.secrets)
+        allowed, retry = await self.db.call(lambda _conn: limiter.hit(action, key))
+        if not allowed:
+            wait = int(retry) + 1
+            raise HTTPError(429, f"Too many requests. Please try again in {wait} seconds.",
+                            [(b"retry-after", str(wait).encode())])
+
+    async def tenant(self, scope) -> dict:
+        headers = header_map(scope)
+        auth = headers.get("Authorization", "")
+        session_token = auth[7:].strip() if auth.lower().startswith("bearer ") else None
+        if not session_token and headers.get("Cookie"):
+            morsel = SimpleCookie(headers["Cookie"]).get(SESSION_COOKIE)
+            session_token = morsel.value if morsel else None
+        if not session_token:
+            raise HTTPError(401, "Sign in required.")
+        manager = get_session_manager({"SECRET_KEY": self.config.secret_key})
+        user = await self.db.call(lambda conn: manager.verify(session_token, conn))
+        if not user:
+            raise HTTPError(401, "Session expired. Please sign in again.")
+        if user.get("role") != "tenant":
+            raise HTTPError(403, "Only tenants can use this endpoint.")
+        return user
+
+    async def owned_request(self, token: str, tenant_id: int):
+        row = await self.db.fetchone("SELECT tenant_id FROM reference_requests WHERE token = ?", (token,))
+        if not row or row[0] != tenant_id:
+            raise HTTPError(404, "Reference request not found.")
+
+    # ---------- Handlers ----------
+    async def reference_form(self, token: str) -> dict:
+        row = await self.db.fetchone(FORM_SQL, (token,))
+        if not row:
+            raise HTTPError(404, "Invalid or expired reference token.")
+        data = dict(zip(references.REQUEST_FIELDS, row))
+        return {
+            "tenant_id": data["tenant_id"],
+            "landlord_email": data["landlord_email"],
+            "status": data["status"],
+            "submitted": data["status"] == "completed",
+            "fields": {name: {"type": kind, "default": default} for name, (kind, default) in FORM_FIELDS.items()},
+        }
+
+    async def reference_status(self, token: str) -> dict:
+        row = await self.db.fetchone(STATUS_SQL, (token,))
+        if not row:
+            raise HTTPError(404, "Reference request not found.")
+        raw, effective, contract, filled_at = row
+        return {"status": effective, "raw_status": raw, "contract_status": contract, "filled_at": filled_at}
+
+    async def submit(self, token: str, answers: dict) -> dict:
+        def submit(conn):
+            data = references.get_reference_request(conn, token)
+            if not data or data["status"] == "completed":
+                return data and data["status"]
+            references.submit_reference(conn, token, **answers)
+            return references.effective_reference_status(
+                conn, references.get_reference_request(conn, token)["status"], token
+            ), True
+
+        result = await self.db.call(submit)
+        if result is None:
+            raise HTTPError(404, "Invalid or expired reference token.")
+        if result == "completed":
+            raise HTTPError(409, "This reference has already been submitted. Thank you!")
+        return {"status": result[0], "message": "Reference submitted successfully. Thank you!"}
+
+    async def tenant_requests(self, tenant_id: int) -> dict:
+        rows = await self.db.fetchall(TENANT_REQUESTS_SQL, (tenant_id,))
+        keys = ["token", "landlord_email", "created_at", "status", "score", "contract_status"]
+        return {"requests": [dict(zip(keys, row)) for row in rows]}
+
+    async def upload(self, scope, receive, token: str, tenant_id: int) -> dict:
+        await self.throttle("upload", f"user:{tenant_id}")
+        filename = (parse_qs(scope.get("query_string", b"").decode("latin-1")).get("filename") or [""])[0]
+        if not filename:
+            raise HTTPError(422, "Pass the file name as ?filename=.")
+        content_type = header_map(scope).get("Content-Type")
+        data = await read_body(receive, self.config.max_upload_bytes)
+        ok, msg = await self.db.call(
+            contracts.save_contract, self.config, token, tenant_id, filename, data, content_type
+        )
+        if not ok:
+            if msg.startswith(("Reference request not found", "You cannot upload")):
+                # Another tenant's token looks the same as a missing one
+                raise HTTPError(404, "Reference request not found.")
+            raise HTTPError(413 if msg.startswith("File too large") else 422, msg)
+        return {"message": msg, **(await self.reference_status(token))}
+
+
+app = ReferenceAPI()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    args = parser.parse_args()
+    import uvicorn
+    uvicorn.run(app, host=args.host, port=args.port)
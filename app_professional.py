@@ -1,65 +1,25 @@
+import time
+_RERUN_STARTED = time.perf_counter()
+
 import streamlit as st
 from pathlib import Path
-import os
-import sqlite3
-
-# Load paths from secrets with safe defaults
-DB_PATH = st.secrets.get('DB_PATH', 'data/app.db')
-UPLOAD_DIR = Path(st.secrets.get('UPLOAD_DIR', 'uploads/contracts'))
-
-# Ensure parent folders exist before use
-db_path_obj = Path(DB_PATH)
-if db_path_obj.parent and str(db_path_obj.parent) not in ('', '.'):
-    db_path_obj.parent.mkdir(parents=True, exist_ok=True)
-DB_PATH = str(db_path_obj)
-UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
-
-
-
-@st.cache_resource(show_spinner=False)
-def get_conn() -> sqlite3.Connection:
-    # Resolve DB path safely
-    try:
-        db_path_val = st.secrets.get("DB_PATH", "data/app.db")
-    except Exception:
-        db_path_val = "data/app.db"
-    db_path_obj = Path(str(db_path_val)).expanduser()
-
-    # Avoid absolute unwritable paths on Streamlit Cloud; force relative if needed
-    if db_path_obj.is_absolute():
-        # Fallback to relative data/ if absolute path is suspicious
-        try:
-            # Make a relative path under current working dir, preserving filename
-            db_path_obj = Path("data") / db_path_obj.name
-        except Exception:
-            db_path_obj = Path("data/app.db")
-
-    # Ensure parent folder exists
-    try:
-        db_path_obj.parent.mkdir(parents=True, exist_ok=True)
-    except Exception as e:
-        st.error(f"Cannot create DB folder '{db_path_obj.parent}': {type(e).__name__}: {e}")
-        raise
-
-    # Connect with short timeout so UI never hangs
-    try:
-        conn = sqlite3.connect(str(db_path_obj), check_same_thread=False, timeout=3)
-        conn.row_factory = sqlite3.Row
-        return conn
-    except Exception as e:
-        st.error(f"DB connect failed: {type(e).__name__}: {e}")
-        raise
-
-
-import sqlite3
 import re
-import hashlib
-import smtplib
-from email.mime.text import MIMEText
-from datetime import datetime
-from uuid import uuid4
-import os
-from pathlib import Path
+from utils_i18n import translate
+from portal_app import render_portal
+from bootstrap import TIMER, run_bootstrap
+from rentright.db import connect, ensure_schema, ensure_consent_column
+from utils_session import (
+    SESSION_COOKIE, SESSION_MAX_AGE, get_session_manager, cookie_script,
+)
+from utils_ratelimit import get_rate_limiter, client_address, throttle_key, trusted_proxy_count
+from rentright import Config, contracts, outreach, references, tenants, users
+from utils_auth import (
+    hash_password_bounded, verify_password_bounded, get_login_throttle, AuthBusy,
+)
+from utils_outbox import (
+    get_email_status, outbox_counts, list_dead_letters, replay_dead_letter, queue_depth,
+)
+from utils_jobs import job_stats, retry_failed_jobs
 
 # ⚠️ set_page_config must be the first Streamlit command
 st.set_page_config(page_title="RentRight", page_icon="🏠", layout="centered")
@@ -68,119 +28,8 @@ if "lang" not in st.session_state:
     st.session_state["lang"] = "English"  # default
 
 def tr(s: str) -> str:
-    """Translate English UI text to Greek when needed."""
-    if st.session_state.get("lang") != "Ελληνικά":
-        return s
-    return {
-        # Auth & common
-        "Sign In": "Σύνδεση",
-        "Create Account": "Δημιουργία Λογαριασμού",
-        "Sign Out": "Αποσύνδεση",
-        "Incorrect email or password. Please try again.": "Λάθος email ή κωδικός. Παρακαλώ δοκιμάστε ξανά.",
-        "Your account has been created. Please sign in to continue.": "Ο λογαριασμός σας δημιουργήθηκε. Συνδεθείτε για να συνεχίσετε.",
-        "Your account has been created — please sign in.": "Ο λογαριασμός σας δημιουργήθηκε — συνδεθείτε.",
-        "Welcome, ": "Καλώς ορίσατε, ",
-        "Please enter your full name.": "Παρακαλώ εισαγάγετε το πλήρες όνομά σας.",
-        "Please enter a valid email address.": "Παρακαλώ εισαγάγετε έγκυρη διεύθυνση email.",
-        "Passwords do not match. Please try again.": "Οι κωδικοί δεν ταιριάζουν. Δοκιμάστε ξανά.",
-        "This email is already registered.": "Αυτό το email έχει ήδη καταχωρηθεί.",
-        "Unknown role:": "Άγνωστος ρόλος:",
-        "Logged in as": "Συνδεθήκατε ως",
-        # SMTP
-        "Missing SMTP details: host, port, username, password, sender, or recipient.": "Λείπουν στοιχεία SMTP: host, port, όνομα χρήστη, κωδικός, αποστολέας ή παραλήπτης.",
-        "Send Test Email": "Αποστολή Δοκιμαστικού Email",
-        tr('Send test to'): "Αποστολή δοκιμής σε",
-        "If you received this email, your SMTP configuration is working. ✅": "Αν λάβατε αυτό το email, η ρύθμιση SMTP λειτουργεί. ✅",
-        "Test email sent successfully.": "Το δοκιμαστικό email στάλθηκε με επιτυχία.",
-        "Failed to send email:": "Αποτυχία αποστολής email:",
-        # Sections
-        "Tenant Dashboard": "Πίνακας Ενοικιαστή",
-        "Landlord Dashboard": "Πίνακας Ιδιοκτήτη",
-        "Administrator Dashboard": "Πίνακας Διαχειριστή",
-        # Future Landlords
-        "Future Landlords (Contacts)": "Μελλοντικοί Ιδιοκτήτες (Επαφές)",
-        "Enter a landlord’s email address": "Εισάγετε το email του ιδιοκτήτη",
-        "Add Contact": "Προσθήκη Επαφής",
-        "Contact added and invitation sent successfully.": "Η επαφή προστέθηκε και η πρόσκληση στάλθηκε με επιτυχία.",
-        "Contact added, but the email could not be sent:": "Η επαφή προστέθηκε, αλλά δεν ήταν δυνατή η αποστολή email:",
-        "Unable to add contact:": "Αδυναμία προσθήκης επαφής:",
-        "Send Invitation": "Αποστολή Πρόσκλησης",
-        "Invited": "Προσκλήθηκε",
-        "Invitation sent successfully.": "Η πρόσκληση στάλθηκε με επιτυχία.",
-        "Unable to send invitation:": "Αδυναμία αποστολής πρόσκλησης:",
-        "Contact removed.": "Η επαφή αφαιρέθηκε.",
-        "Name": "Ονοματεπώνυμο",
-        "Address": "Διεύθυνση",
-        "No future landlord contacts yet.": "Δεν υπάρχουν ακόμα επαφές μελλοντικών ιδιοκτητών.",
-        # Previous Landlords & References
-        "Previous Landlords and References": "Προηγούμενοι Ιδιοκτήτες και Συστάσεις",
-        "Tax ID (9 digits)": "ΑΦΜ (9 ψηφία)",
-        "Add Previous Landlord": "Προσθήκη Προηγούμενου Ιδιοκτήτη",
-        "Please enter the landlord’s name.": "Παρακαλώ εισαγάγετε το όνομα του ιδιοκτήτη.",
-        "Please enter the landlord’s address.": "Παρακαλώ εισαγάγετε τη διεύθυνση του ιδιοκτήτη.",
-        "Previous landlord added successfully.": "Ο προηγούμενος ιδιοκτήτης προστέθηκε με επιτυχία.",
-        "Request Reference": "Αίτημα Σύστασης",
-        "Reference request sent successfully by email.": "Το αίτημα σύστασης στάλθηκε με επιτυχία μέσω email.",
-        "Email delivery failed (": "Η αποστολή email απέτυχε (",
-        "Please share this link manually:": "Παρακαλώ κοινοποιήστε αυτόν τον σύνδεσμο χειροκίνητα:",
-        # Contract
-        "Contract Status:": "Κατάσταση Συμβολαίου:",
-        "Download Contract": "Λήψη Συμβολαίου",
-        "Replace Tenancy Contract (PDF or Image)": "Συμβολαίου Μίσθωσης (PDF ή Εικόνα)",
-        "Upload Tenancy Contract (PDF or Image)": "Ανέβασε Συμβόλαιο Μίσθωσης (PDF ή Εικόνα)",
-        "Contract uploaded. Status reset to Pending Review.": "Το συμβόλαιο μεταφορτώθηκε. Η κατάσταση επαναφέρθηκε σε Αναμονή Ελέγχου.",
-        "Contract uploaded. Status set to Pending Review.": "Το συμβόλαιο μεταφορτώθηκε. Η κατάσταση ορίστηκε σε Αναμονή Ελέγχου.",
-        "Unable to read the saved file:": "Δεν είναι δυνατή η ανάγνωση του αποθηκευμένου αρχείου:",
-        "⏳ Pending Review": "⏳ Αναμονή Ελέγχου",
-        "✅ Verified Contract": "✅ Επικυρωμένο Συμβόλαιο",
-        "❌ Rejected Contract": "❌ Απορριφθέν Συμβόλαιο",
-        # Admin
-        "Pending References (All Tenants)": "Εκκρεμείς Συστάσεις (Όλοι οι Ενοικιαστές)",
-        "No requests available.": "Δεν υπάρχουν διαθέσιμα αιτήματα.",
-        "Reference Link": "Σύνδεσμος Σύστασης",
-        "✅ Verify Contract": "✅ Επικύρωση Συμβολαίου",
-        "Contract verified successfully.": "Το συμβόλαιο επικυρώθηκε με επιτυχία.",
-        "Cancel Reference": "Ακύρωση Σύστασης",
-        "Reference cancelled.": "Η σύσταση ακυρώθηκε.",
-        # Landlord dashboard
-        "Prospective Tenants (Listed You as Future Landlord)": "Υποψήφιοι Ενοικιαστές (Σας έχουν δηλώσει ως μελλοντικό ιδιοκτήτη)",
-        "No tenants have listed you as a future landlord yet.": "Κανένας ενοικιαστής δεν σας έχει δηλώσει ακόμα ως μελλοντικό ιδιοκτήτη.",
-        "Respond Now": "Απάντηση Τώρα",
-        "Submit Reference": "Υποβολή Σύστασης",
-        "Not My Tenant / Cancel": "Δεν είναι ο ενοικιαστής μου / Ακύρωση",
-        "Please confirm you were the landlord.": "Παρακαλώ επιβεβαιώστε ότι ήσασταν ο ιδιοκτήτης.",
-        "Reference submitted successfully.": "Η σύσταση υποβλήθηκε με επιτυχία.",
-        "Request cancelled.": "Το αίτημα ακυρώθηκε.",
-        "View Submitted Reference": "Προβολή Υποβληθείσας Σύστασης",
-        # Public portal
-        "🏠 RentRight — Landlord Reference Portal": "🏠 RentRight — Πύλη Σύστασης Ιδιοκτήτη",
-        "Invalid or expired reference token.": "Μη έγκυρο ή ληγμένο διακριτικό σύστασης.",
-        "This reference has already been submitted. Thank you!": "Αυτή η σύσταση έχει ήδη υποβληθεί. Ευχαριστούμε!",
-        "Reference for Tenant ID #": "Σύσταση για Ενοικιαστή ID #",
-        "I confirm I was the landlord for this tenant.": "Επιβεβαιώνω ότι ήμουν ο ιδιοκτήτης αυτού του ενοικιαστή.",
-        "Overall tenant score": "Συνολική αξιολόγηση ενοικιαστή",
-        "Did the tenant pay on time?": "Πλήρωνε ο ενοικιαστής στην ώρα του;",
-        "Did the tenant leave utilities unpaid?": "Άφησε απλήρωτους λογαριασμούς;",
-        "Did the tenant leave the apartment in good condition?": "Παραδόθηκε το διαμέρισμα σε καλή κατάσταση;",
-        "Optional comments": "Προαιρετικά σχόλια",
-        "All Reference Requests": "Όλα τα Αιτήματα Σύστασης",
-        "No reference requests have been created yet.": "Δεν έχουν δημιουργηθεί ακόμα αιτήματα σύστασης.",
-        # Settings
-        "Email & App Settings": "Ρυθμίσεις Email & Εφαρμογής",
-        "Email Settings (SMTP)": "Ρυθμίσεις Email (SMTP)",
-        "App Base URL": "Βασικό URL Εφαρμογής",
-        "Base URL for Links": "Βασικό URL για Συνδέσμους",
-        # Misc labels
-        "Email": "Email",
-        "Password": "Κωδικός",
-        "Confirm password": "Επιβεβαίωση κωδικού",
-        "Full name": "Πλήρες όνομα",
-        "Role": "Ρόλος",
-        "Tenant": "Ενοικιαστής",
-        "Landlord": "Ιδιοκτήτης",
-        "Admin": "Διαχειριστής",
-        "completed": "Ολοκληρώθηκε"
-    }.get(s, s)
+    """Translate English UI text to Greek when needed (catalog in utils_i18n)."""
+    return translate(s, st.session_state.get("lang"))
 
 
 # === End language utilities ===
@@ -210,7 +59,10 @@ render_topbar_language()
 def load_smtp_defaults():
     """Prefill desde st.secrets a session_state (una sola vez por sesión)."""
     ss = st.session_state
-    sec = st.secrets if hasattr(st, "secrets") else {}
+    if ss.get("smtp_defaults_loaded"):
+        return
+    ss.smtp_defaults_loaded = True
+    sec = app_secrets()
     ss.setdefault("app_base_url", sec.get("APP_BASE_URL", ""))
 
     ss.setdefault("smtp_host", sec.get("SMTP_HOST", ""))
@@ -223,7 +75,7 @@ def load_smtp_defaults():
 
 def get_smtp_config():
     """Devuelve la config efectiva (session_state con fallback a secrets)."""
-    sec = st.secrets if hasattr(st, "secrets") else {}
+    sec = app_secrets()
     host = st.session_state.get("smtp_host") or sec.get("SMTP_HOST", "")
     port = int(st.session_state.get("smtp_port") or sec.get("SMTP_PORT", 587))
     user = st.session_state.get("smtp_user") or sec.get("SMTP_USER", "")
@@ -235,186 +87,136 @@ def get_smtp_config():
     return host, port, user, pwd, from_email, bool(use_tls)
 
 
-def send_email_smtp(to_email: str, subject: str, body: str):
-    """Envía correo por SMTP con STARTTLS (587). Usa secretos si existen."""
+def get_smtp_settings() -> dict:
+    """get_smtp_config() como dict, para utils_outbox.deliver."""
     host, port, user, pwd, from_email, use_tls = get_smtp_config()
+    return {"host": host, "port": port, "user": user, "pwd": pwd, "from_email": from_email, "use_tls": use_tls,
+            "backend": str(app_secrets().get("EMAIL_BACKEND", "")).lower()}
+
+
+def send_email_smtp(to_email: str, subject: str, body: str):
+    """Envía correo por SMTP con STARTTLS (587) usando el pool de sesiones del proceso."""
+    # smtplib/email.mime load here, on the first send, not at app start
+    from utils_email import send_email_smtp as send_now
+    return send_now(get_smtp_settings(), to_email, subject, body)
 
-    if not all([host, port, user, pwd, from_email, to_email]):
-        return False, "Missing SMTP details: host, port, username, password, sender, or recipient."
 
-    try:
-        msg = MIMEText(body, "plain")
-        msg["Subject"] = subject
-        msg["From"] = from_email
-        msg["To"] = to_email
-
-        server = smtplib.SMTP(host, int(port), timeout=15)
-        if use_tls:
-            server.starttls()
-        server.login(user, pwd)
-        server.sendmail(from_email, [to_email], msg.as_string())
-        server.quit()
-        return True, "sent"
-    except Exception as e:
-        return False, f"{type(e).__name__}: {e}"
-    
 def get_latest_reference_for_pair(tenant_id: int, prev_landlord_id: int):
-    cur = get_conn().cursor()
-    cur.execute(
-        """
-        SELECT token, status, created_at
-        FROM reference_requests
-        WHERE tenant_id=? AND prev_landlord_id=?
-        ORDER BY id DESC
-        LIMIT 1
-        """,
-        (tenant_id, prev_landlord_id),
-    )
-    row = cur.fetchone()
-    if not row:
-        return None
-    return {"token": row[0], "status": row[1], "created_at": row[2]}
+    return tenants.get_latest_reference_for_pair(get_conn(), tenant_id, prev_landlord_id)
 
 
 
 DB_PATH = "rental_app.db"
 
 UPLOAD_DIR = Path("uploads") / "contracts"
-UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
 
 # ---------- Utilities ----------
-@st.cache_resource
+@st.cache_resource(show_spinner=False)
 def get_conn():
-    # one shared connection per process/session
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False, timeout=30)
-    # improve concurrent behavior
-    get_conn().execute("PRAGMA journal_mode=WAL;")
-    get_conn().execute("PRAGMA busy_timeout=5000;")  # wait up to 5s if locked
-    return conn
+    # one shared connection per process
+    return connect(DB_PATH)
+
 
+@st.cache_resource(show_spinner=False)
+def app_bootstrap() -> dict:
+    """Directories, schema, migrations, admin user, secrets snapshot: once per process (see bootstrap.py)."""
+    try:
+        sec = dict(st.secrets)
+    except Exception:
+        sec = {}
+    return run_bootstrap(get_conn(), [UPLOAD_DIR], sec)
 
-@st.cache_resource
 
-def ensure_consent_column(conn):
-    cur = get_conn().cursor()
-    cur.execute("PRAGMA table_info(reference_contracts)")
-    cols = [r[1] for r in cur.fetchall()]
-    if "consent_status" not in cols:
-        cur.execute("ALTER TABLE reference_contracts ADD COLUMN consent_status TEXT NOT NULL DEFAULT 'locked'")
-        get_conn().commit()
+def app_secrets() -> dict:
+    return app_bootstrap()["secrets"]
+
+
+@st.cache_resource(show_spinner=False)
+def base_config() -> Config:
+    """Core config (see rentright.config) from the secrets snapshot; once per process."""
+    return Config.from_secrets(app_secrets(), db_path=DB_PATH, upload_dir=UPLOAD_DIR)
+
+
+def app_config() -> Config:
+    """base_config() with this session's App Base URL override, if the admin set one."""
+    return base_config().with_base_url(st.session_state.get("app_base_url"))
 
 
 def init_db(_schema_version: int = 6):
-    conn = get_conn()
-    cur = get_conn().cursor()
-    # (tables creation stays as is above)
-    # Ensure consent column exists
-    try:
-        ensure_consent_column(conn)
-    except Exception:
-        pass
+    ensure_schema(get_conn())
+    ensure_consent_column(get_conn())
     return True
 
 
-# Defensive migration: add consent_status if missing
-try:
-    ensure_consent_column(conn)
-except Exception:
-    pass
+app_bootstrap()
 
 
 def add_future_landlord_contact(tenant_id: int, email: str):
-    email = (email or "").strip().lower()
-    if not re.match(r"^[^@\s]+@[^@\s]+\.[^@\s]+$", email):
-        raise ValueError("Invalid email")
-    conn = get_conn()
-    cur = get_conn().cursor()
-    cur.execute(
-        "INSERT OR IGNORE INTO future_landlord_contacts(tenant_id, email, created_at) VALUES (?,?,?)",
-        (tenant_id, email, datetime.utcnow().isoformat()),
-    )
-    get_conn().commit()
+    tenants.add_future_landlord_contact(get_conn(), tenant_id, email)
 
 
 def list_future_landlord_contacts(tenant_id: int):
-    cur = get_conn().cursor()
-    cur.execute(
-        "SELECT id, email, created_at, invited, invited_at FROM future_landlord_contacts WHERE tenant_id = ? ORDER BY id DESC",
-        (tenant_id,),
-    )
-    return cur.fetchall()
+    return tenants.list_future_landlord_contacts(get_conn(), tenant_id)
+
+def get_future_landlord_contact(contact_id: int, tenant_id: int):
+    return tenants.get_future_landlord_contact(get_conn(), contact_id, tenant_id)
 
 def remove_future_landlord_contact(contact_id: int, tenant_id: int):
-    cur = get_conn().cursor()
-    cur.execute(
-        "DELETE FROM future_landlord_contacts WHERE id = ? AND tenant_id = ?",
-        (contact_id, tenant_id),
-    )
-    get_conn().commit()
+    tenants.remove_future_landlord_contact(get_conn(), contact_id, tenant_id)
 
 def invite_future_landlord(tenant_id: int, email: str, tenant_name: str, tenant_email: str):
-    base = st.session_state.get("app_base_url") or (st.secrets.get("APP_BASE_URL") if hasattr(st, "secrets") else "")
-    join_link = base if base else ""
-    subject = f"{tenant_name} would like to connect with you on RentRight"
-    body = (
-        "Hello,\n\n"
-        f"{tenant_name} ({tenant_email}) has added you as a future landlord on RentRight.\n"
-        + (f"You can sign in or create an account here: {join_link}\n\n" if join_link else "")
-        + "Thank you."
+    allowed, retry = rate_limiter().hit("invite", f"user:{tenant_id}")
+    if not allowed:
+        return False, f"Too many invitations. Please try again in {int(retry) + 1} seconds."
+    # Queued in the same transaction as the invited flag; email_worker.py sends it.
+    return outreach.invite_future_landlord(
+        get_conn(), app_config(), tenant_id, email, tenant_name, tenant_email, st.session_state.get("lang"),
     )
-    ok, msg = send_email_smtp(email, subject, body)
-    if ok:
-        conn = get_conn()
-        cur = get_conn().cursor()
-        cur.execute(
-            "UPDATE future_landlord_contacts SET invited = 1, invited_at = ? WHERE tenant_id = ? AND LOWER(email) = LOWER(?)",
-            (datetime.utcnow().isoformat(), tenant_id, email),
-        )
-        get_conn().commit()
-    return ok, msg
 
 
 
 # ---------- Auth helpers ----------
-def hash_password(password: str, salt: str = "static_salt_change_me") -> str:
-    return hashlib.sha256((salt + password).encode()).hexdigest()
+def rate_limiter():
+    return get_rate_limiter(app_secrets())
+
+
+def rate_limited(action: str, key) -> bool:
+    """Count one hit for `action`; show an error and return True when over the limit."""
+    allowed, retry = rate_limiter().hit(action, key)
+    if not allowed:
+        st.error(f"{tr('Too many requests. Please try again in')} {int(retry) + 1} {tr('seconds.')}")
+    return not allowed
+
+
+def hash_password(password: str) -> str:
+    """scrypt with a per-user salt, on the bounded hashing pool (see utils_auth)."""
+    return hash_password_bounded(password)
+
+
+def update_password_hash(user_id: int, password_hash: str):
+    users.update_password_hash(get_conn(), user_id, password_hash)
+
+
+def client_ip() -> str | None:
+    """Client address for throttling (the peer; X-Forwarded-For only behind TRUSTED_PROXIES)."""
+    ctx = getattr(st, "context", None)
+    if ctx is None:
+        return None
+    return client_address(getattr(ctx, "headers", None) or {}, getattr(ctx, "ip_address", None),
+                          trusted_proxy_count(app_secrets()))
 
 def create_user(email: str, name: str, password: str, role: str):
-    cur = get_conn().cursor()
-    cur.execute(
-        "INSERT INTO users(email, name, password_hash, role, created_at) VALUES (?,?,?,?,?)",
-        (email.lower().strip(), name.strip(), hash_password(password), role, datetime.utcnow().isoformat()),
-    )
-    get_conn().commit()
+    users.create_user(get_conn(), email, name, password, role)
 
 
 def get_user_by_email(email: str):
-    cur = get_conn().cursor()
-    cur.execute("SELECT id, email, name, password_hash, role FROM users WHERE email = ?", (email.lower().strip(),))
-    row = cur.fetchone()
-    if row:
-        keys = ["id","email","name","password_hash","role"]
-        return dict(zip(keys, row))
-    return None
+    return users.get_user_by_email(get_conn(), email)
 
 
 def get_user_by_id(uid: int):
-    cur = get_conn().cursor()
-    cur.execute("SELECT id, email, name, role FROM users WHERE id = ?", (uid,))
-    row = cur.fetchone()
-    if row:
-        keys = ["id","email","name","role"]
-        return dict(zip(keys, row))
-    return None
-def ensure_admin_exists():
-    """Create admin user if missing."""
-    admin = get_user_by_email("admin@gmail.com")
-    if not admin:
-        # name can be anything; password '123' as requested
-        create_user("admin@gmail.com", "Admin", "123", "admin")
-        
-ensure_admin_exists()
+    return users.get_user_by_id(get_conn(), uid)
+
 
 # ---------- Validation ----------
 
@@ -435,11 +237,31 @@ def login_form():
         submitted = st.form_submit_button(tr('Sign In'))
         
     if submitted:
+        throttle = get_login_throttle(rate_limiter())
+        ip = client_ip()
+        wait = throttle.retry_after(email, ip)
+        if wait:
+            st.error(f"{tr('Too many sign-in attempts. Try again in')} {int(wait // 60) + 1} {tr('minutes.')}")
+            return
         user = get_user_by_email(email)
-        if not user or user["password_hash"] != hash_password(password):
+        try:
+            ok, rehash = verify_password_bounded(password, user["password_hash"] if user else None)
+        except (AuthBusy, TimeoutError):
+            st.error(tr('The server is busy. Please try again in a moment.'))
+            return
+        if not ok:
+            throttle.record_failure(email, ip)
             st.error(tr('Incorrect email or password. Please try again.'))
             return
+        throttle.record_success(email)
+        if rehash:
+            # Legacy SHA-256 or outdated scrypt cost: upgrade while we have the plaintext.
+            try:
+                update_password_hash(user["id"], hash_password(password))
+            except (AuthBusy, TimeoutError):
+                pass
         st.session_state.user = {k: user[k] for k in ["id","email","name","role"]}
+        start_session(st.session_state.user)
         st.success(f"Welcome, {user['name']}!")
 
 
@@ -465,7 +287,11 @@ def signup_form():
         if get_user_by_email(email):
             st.error(tr('This email is already registered.'))
             return
-        create_user(email, name, password, role)
+        try:
+            create_user(email, name, password, role)
+        except (AuthBusy, TimeoutError):
+            st.error(tr('The server is busy. Please try again in a moment.'))
+            return
         st.success(tr('Your account has been created. Please sign in to continue.'))
         # 🔁 redirect back to landing/login
         st.session_state.signup_done = True
@@ -493,118 +319,81 @@ def auth_gate():
 
 
 
+def session_manager():
+    return get_session_manager(app_secrets())
+
+
+def flush_session_cookie():
+    """Write a cookie change queued by start_session/logout (queued so st.rerun can't drop it)."""
+    if "session_cookie" not in st.session_state:
+        return
+    import streamlit.components.v1 as components
+    value = st.session_state.pop("session_cookie")
+    components.html(cookie_script(SESSION_COOKIE, value, SESSION_MAX_AGE), height=0)
+
+
+def start_session(user: dict):
+    """Remember the sign-in in a signed cookie so new tabs and reloads skip the login form."""
+    token = session_manager().issue(user)
+    st.session_state.session_sid = session_manager().verify(token)["sid"]
+    st.session_state.session_cookie = token
+
+
+def restore_session():
+    """Rebuild st.session_state.user from the session cookie; signature check only, no user lookup."""
+    if st.session_state.get("user") or st.session_state.get("session_checked"):
+        return
+    st.session_state.session_checked = True
+    try:
+        token = st.context.cookies.get(SESSION_COOKIE)
+    except Exception:
+        return
+    payload = session_manager().verify(token, get_conn())
+    if payload:
+        st.session_state.user = {k: payload[k] for k in ["id","email","name","role"]}
+        st.session_state.session_sid = payload["sid"]
+
+
 def logout_button():
     if st.button(tr('Sign Out')):
+        sid = st.session_state.pop("session_sid", None)
+        if sid:
+            session_manager().revoke(sid, get_conn())
+        st.session_state.session_cookie = None
         st.session_state.user = None
         st.rerun()
 
 # ---------- Tenant data helpers ----------
-import os
-from pathlib import Path
-
-UPLOAD_DIR = Path("uploads") / "contracts"
-UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
-
 def safe_filename(name: str) -> str:
-    base = os.path.basename(name or "contract")
-    return re.sub(r"[^A-Za-z0-9._-]", "_", base)
+    return contracts.safe_filename(name)
 
 def get_contract_by_token(token: str):
-    cur = get_conn().cursor()
-    cur.execute(
-        "SELECT filename, content_type, path, size_bytes, uploaded_at, status, status_updated_at, status_by "
-        "FROM reference_contracts WHERE token=?",
-        (token,),
-    )
-    row = cur.fetchone()
-    if row:
-        keys = ["filename","content_type","path","size_bytes","uploaded_at","status","status_updated_at","status_by"]
-        return dict(zip(keys, row))
-    return None
+    return contracts.get_contract(get_conn(), token)
 
-def save_contract_upload(token: str, tenant_id: int, uploaded_file) -> tuple[bool, str]:
-    # Ensure schema has consent_status column
-    try:
-        ensure_consent_column(conn)
-    except Exception:
-        pass
-    req = get_reference_request_by_token(token)
-    if not req:
-        return False, "Reference request not found."
-    if req["tenant_id"] != tenant_id:
-        return False, "You cannot upload to a request that is not yours."
+def read_contract_file(path: str) -> bytes:
+    """Read a stored contract, decrypting vault blobs (<filename>.bin)."""
+    return contracts.read_contract_file(path)
 
-    allowed_exts = {".pdf", ".png", ".jpg", ".jpeg", ".webp"}
-    name = safe_filename(uploaded_file.name)
-    ext = Path(name).suffix.lower()
-    if ext not in allowed_exts:
-        return False, "Only PDF, PNG, JPG, JPEG, or WEBP files are allowed."
+def contract_preview(token: str) -> bytes | None:
+    """Thumbnail made in the background by job_worker.py, if there is one yet."""
+    return contracts.read_contract_preview(app_config(), token)
 
-    # Size (max 15 MB)
+def save_contract_upload(token: str, tenant_id: int, uploaded_file) -> tuple[bool, str]:
+    allowed, retry = rate_limiter().hit("upload", f"user:{tenant_id}")
+    if not allowed:
+        return False, f"Too many uploads. Please try again in {int(retry) + 1} seconds."
     try:
-        size = len(uploaded_file.getbuffer())
+        data = bytes(uploaded_file.getbuffer())
     except Exception:
-        # fallback
         data = uploaded_file.read()
-        size = len(data)
-        uploaded_file = type("Tmp", (), {"read": lambda self=data: self, "type": "application/octet-stream"})()
-    if size > 15 * 1024 * 1024:
-        return False, "File too large (max 15 MB)."
-
-    # Save file under uploads/contracts/<token>/<filename>
-    folder = UPLOAD_DIR / token
-    folder.mkdir(parents=True, exist_ok=True)
-    path = folder / name
-    with open(path, "wb") as f:
-        f.write(uploaded_file.read())
-
-    now = datetime.utcnow().isoformat()
-    cur = get_conn().cursor()
-    existing = get_contract_by_token(token)
-    if existing:
-        cur.execute(
-            """
-            UPDATE reference_contracts
-               SET filename=?, content_type=?, path=?, size_bytes=?,
-                   uploaded_at=?, status='pending', status_updated_at=?, status_by=NULL
-             WHERE token=?
-            """,
-            (name, getattr(uploaded_file, "type", None) or "application/octet-stream",
-             str(path), size, now, now, token),
-        )
-    else:
-        cur.execute(
-            """
-            INSERT INTO reference_contracts(token, tenant_id, filename, content_type, path, size_bytes,
-                                            status, status_updated_at, status_by, uploaded_at)
-            VALUES (?,?,?,?,?,?, 'pending', ?, NULL, ?)
-            """,
-            (token, tenant_id, name, getattr(uploaded_file, "type", None) or "application/octet-stream",
-             str(path), size, now, now),
-        )
-    get_conn().commit()
-    return True, "Uploaded."
-
-
-def set_contract_status(token: str, status: str, by_email: str) -> tuple[bool, str]:
-    status = (status or "").lower().strip()
-    if status not in {"pending","verified","rejected"}:
-        return False, "Invalid status."
-    if not get_contract_by_token(token):
-        return False, "No contract uploaded for this request."
-
-    cur = get_conn().cursor()
-    cur.execute(
-        "UPDATE reference_contracts SET status=?, status_updated_at=?, status_by=? WHERE token=?",
-        (status, datetime.utcnow().isoformat(), by_email, token),
+    return contracts.save_contract(
+        get_conn(), app_config(), token, tenant_id, uploaded_file.name, data, getattr(uploaded_file, "type", None),
     )
-    get_conn().commit()
 
-    # ⬇️ If contract is now verified, try to promote the reference
-    if status == "verified":
-        promote_reference_if_ready(token)
 
-    return True, "Status updated."
+def set_contract_status(token: str, status: str, by_email: str) -> tuple[bool, str]:
+    # Verifying also promotes the reference if the landlord already answered
+    return contracts.set_contract_status(get_conn(), token, status, by_email)
 
 
 def contract_status_badge(status: str) -> str:
@@ -618,266 +407,112 @@ def contract_status_badge(status: str) -> str:
 
 
 def load_tenant_profile(tenant_id: int):
-    cur = get_conn().cursor()
-    cur.execute("SELECT future_landlord_email, updated_at FROM tenant_profiles WHERE tenant_id = ?", (tenant_id,))
-    row = cur.fetchone()
-    if row:
-        return {"future_landlord_email": row[0], "updated_at": row[1]}
-    return None
+    return tenants.load_tenant_profile(get_conn(), tenant_id)
 
 
 def upsert_tenant_profile(tenant_id: int, future_landlord_email: str | None):
-    now = datetime.utcnow().isoformat()
-    cur = get_conn().cursor()
-    exists = load_tenant_profile(tenant_id)
-    if exists:
-        cur.execute(
-            "UPDATE tenant_profiles SET future_landlord_email = ?, updated_at = ? WHERE tenant_id = ?",
-            (future_landlord_email.strip() if future_landlord_email else None, now, tenant_id),
-        )
-    else:
-        cur.execute(
-            "INSERT INTO tenant_profiles(tenant_id, future_landlord_email, updated_at) VALUES (?,?,?)",
-            (tenant_id, future_landlord_email.strip() if future_landlord_email else None, now),
-        )
-    get_conn().commit()
+    tenants.upsert_tenant_profile(get_conn(), tenant_id, future_landlord_email)
 
 
 def add_previous_landlord(tenant_id: int, email: str, afm: str, name: str, address: str):
-    cur = get_conn().cursor()
-    cur.execute(
-        "INSERT INTO previous_landlords(tenant_id, email, afm, name, address, created_at) VALUES (?,?,?,?,?,?)",
-        (tenant_id, email.strip(), afm.strip(), name.strip(), address.strip(), datetime.utcnow().isoformat()),
-    )
-    get_conn().commit()
+    tenants.add_previous_landlord(get_conn(), tenant_id, email, afm, name, address)
 
 
 def list_previous_landlords(tenant_id: int):
-    cur = get_conn().cursor()
-    cur.execute(
-        "SELECT id, email, afm, name, address, created_at FROM previous_landlords WHERE tenant_id = ? ORDER BY id DESC",
-        (tenant_id,),
-    )
-    return cur.fetchall()
+    return tenants.list_previous_landlords(get_conn(), tenant_id)
 
 
 def delete_previous_landlord(entry_id: int, tenant_id: int):
-    cur = get_conn().cursor()
-    cur.execute("DELETE FROM previous_landlords WHERE id = ? AND tenant_id = ?", (entry_id, tenant_id))
-    get_conn().commit()
+    tenants.delete_previous_landlord(get_conn(), entry_id, tenant_id)
 
 # ---------- References helpers ----------
 
 def generate_token() -> str:
-    return uuid4().hex
+    return references.generate_token()
 
 
-def create_reference_request(tenant_id: int, prev_landlord_id: int, landlord_email: str) -> dict:
-    token = generate_token()
-    cur = get_conn().cursor()
-    cur.execute(
-        "INSERT INTO reference_requests(token, tenant_id, prev_landlord_id, landlord_email, created_at, status) VALUES (?,?,?,?,?,?)",
-        (token, tenant_id, prev_landlord_id, landlord_email, datetime.utcnow().isoformat(), 'pending'),
+def create_reference_request(tenant_id: int, prev_landlord_id: int, landlord_email: str,
+                             tenant_name: str | None = None, tenant_email: str | None = None) -> dict:
+    """Create a request (see rentright.outreach); repeats within the idempotency window return the existing token."""
+    return outreach.create_reference_request(
+        get_conn(), app_config(), tenant_id, prev_landlord_id, landlord_email,
+        tenant_name, tenant_email, st.session_state.get("lang"),
     )
-    get_conn().commit()
-    return {"token": token}
 
 
-def get_reference_request_by_token(token: str):
-    cur = get_conn().cursor()
-    cur.execute(
-        "SELECT id, token, tenant_id, prev_landlord_id, landlord_email, created_at, status, filled_at, confirm_landlord, score, paid_on_time, utilities_unpaid, good_condition, comments FROM reference_requests WHERE token = ?",
-        (token,),
+def request_references_from_all(tenant_id: int, tenant_name: str, tenant_email: str, max_workers: int = 8) -> dict:
+    """Request references from every previous landlord without one pending and send what the limits allow now."""
+    return outreach.request_references_from_all(
+        get_conn(), app_config(), tenant_id, tenant_name, tenant_email,
+        lang=st.session_state.get("lang"), smtp=get_smtp_settings(), max_workers=max_workers,
     )
-    row = cur.fetchone()
-    if not row:
-        return None
-    keys = [
-        "id","token","tenant_id","prev_landlord_id","landlord_email","created_at","status","filled_at",
-        "confirm_landlord","score","paid_on_time","utilities_unpaid","good_condition","comments"
-    ]
-    return dict(zip(keys, row))
-# ---------- Status helpers ----------
-def effective_reference_status(raw_status: str | None, token: str) -> str:
-    """
-    Returns the 'effective' status for showing in UI:
-      - 'cancelled' stays cancelled.
-      - If a contract exists but is not VERIFIED, treat the reference as 'pending'.
-      - Otherwise return the raw status, defaulting to 'pending' when None.
-    """
-    if raw_status == "cancelled":
-        return "cancelled"
-    contract = get_contract_by_token(token)
-    if contract and contract.get("status") != "verified":
-        return "pending"
-    return raw_status or "pending"
 
 
-def promote_reference_if_ready(token: str) -> bool:
-    """
-    Promote a reference to 'completed' IFF:
-      - the reference exists,
-      - it's not already completed,
-      - the contract for this token is VERIFIED,
-      - and the landlord already submitted the reference (confirm_landlord=1).
-    Returns True if a promotion happened.
-    """
-    details = get_reference_request_by_token(token)
-    if not details or details["status"] == "completed":
-        return False
+def get_reference_request_by_token(token: str):
+    return references.get_reference_request(get_conn(), token)
 
-    contract = get_contract_by_token(token)
-    if not (contract and contract.get("status") == "verified"):
-        return False
+# ---------- Status helpers ----------
+def effective_reference_status(raw_status: str | None, token: str) -> str:
+    """Status shown in the UI: pending until an uploaded contract is verified (see rentright.references)."""
+    return references.effective_reference_status(get_conn(), raw_status, token)
 
-    # Make sure the form was actually submitted by the landlord.
-    if not details.get("confirm_landlord"):
-        return False
 
-    cur = get_conn().cursor()
-    cur.execute("UPDATE reference_requests SET status='completed' WHERE token=?", (token,))
-    get_conn().commit()
-    return True
+def promote_reference_if_ready(token: str) -> bool:
+    return references.promote_reference_if_ready(get_conn(), token)
 
 
 def mark_reference_completed(token: str, confirm_landlord: bool, score: int,
                              paid_on_time: bool, utilities_unpaid: bool,
                              good_condition: bool, comments: str | None):
     # Gate completion on contract verification
-    contract = get_contract_by_token(token)
-    is_verified = bool(contract and contract.get("status") == "verified")
-    new_status = "completed" if is_verified else "pending"
-
-    cur = get_conn().cursor()
-    cur.execute(
-        """
-        UPDATE reference_requests
-        SET status=?, filled_at=?, confirm_landlord=?, score=?, paid_on_time=?, utilities_unpaid=?, good_condition=?, comments=?
-        WHERE token=?
-        """,
-        (
-            new_status,
-            datetime.utcnow().isoformat(),
-            1 if confirm_landlord else 0,
-            score,
-            1 if paid_on_time else 0,
-            1 if utilities_unpaid else 0,
-            1 if good_condition else 0,
-            comments.strip() if comments else None,
-            token,
-        ),
-    )
-    get_conn().commit()
+    references.submit_reference(get_conn(), token, confirm_landlord, score, paid_on_time,
+                                utilities_unpaid, good_condition, comments)
 
 def list_reference_requests_global(status: str | None = None):
     """List reference requests across all users. If status is given, filter by it."""
-    cur = get_conn().cursor()
-    if status:
-        cur.execute(
-            "SELECT token, tenant_id, landlord_email, created_at, status, score "
-            "FROM reference_requests WHERE status=? ORDER BY id DESC",
-            (status,),
-        )
-    else:
-        cur.execute(
-            "SELECT token, tenant_id, landlord_email, created_at, status, score "
-            "FROM reference_requests ORDER BY id DESC"
-        )
-    return cur.fetchall()
+    return references.list_reference_requests_global(get_conn(), status)
+
+
+def count_reference_requests_global() -> dict:
+    return references.count_reference_requests_global(get_conn())
+
+
+def list_reference_requests_global_effective(status: str):
+    return references.list_reference_requests_global_effective(get_conn(), status)
+
+
+def list_reference_table_global(status: str):
+    return references.list_reference_table_global(get_conn(), status)
 
 
 def list_reference_requests_for_tenant(tenant_id: int):
-    cur = get_conn().cursor()
-    cur.execute(
-        """
-        SELECT rr.id, rr.token, rr.landlord_email, rr.created_at, rr.status, rr.score
-        FROM reference_requests rr
-        WHERE rr.tenant_id = ?
-        ORDER BY rr.id DESC
-        """,
-        (tenant_id,),
-    )
-    return cur.fetchall()
+    return references.list_reference_requests_for_tenant(get_conn(), tenant_id)
 
 
 def list_reference_requests_for_landlord(landlord_email: str, status: str | None = None):
-    cur = get_conn().cursor()
-    if status:
-        cur.execute(
-            "SELECT token, tenant_id, created_at, status, score FROM reference_requests WHERE landlord_email = ? AND status = ? ORDER BY id DESC",
-            (landlord_email, status),
-        )
-    else:
-        cur.execute(
-            "SELECT token, tenant_id, created_at, status, score FROM reference_requests WHERE landlord_email = ? ORDER BY id DESC",
-            (landlord_email,),
-        )
-    return cur.fetchall()
+    return references.list_reference_requests_for_landlord(get_conn(), landlord_email, status)
+
+
+def count_reference_requests_for_landlord(landlord_email: str) -> dict:
+    return references.count_reference_requests_for_landlord(get_conn(), landlord_email)
+
+
+def list_reference_table_for_landlord(landlord_email: str, status: str | None = None):
+    return references.list_reference_table_for_landlord(get_conn(), landlord_email, status)
 
 
 def cancel_reference_request(token: str):
-    cur = get_conn().cursor()
-    cur.execute("UPDATE reference_requests SET status='cancelled' WHERE token=? AND status='pending'", (token,))
-    get_conn().commit()
+    references.cancel_reference_request(get_conn(), token)
 
 def list_prospective_tenants(landlord_email: str):
     """Unique tenants who listed this landlord (single field or multi list)."""
-    cur = get_conn().cursor()
-    cur.execute(
-        """
-        SELECT u.id, u.name, u.email, MAX(src.updated_at) AS last_update
-        FROM (
-            SELECT tp.tenant_id AS tenant_id, tp.updated_at AS updated_at
-            FROM tenant_profiles tp
-            WHERE LOWER(tp.future_landlord_email) = LOWER(?)
-            UNION ALL
-            SELECT flc.tenant_id AS tenant_id, COALESCE(flc.invited_at, flc.created_at) AS updated_at
-            FROM future_landlord_contacts flc
-            WHERE LOWER(flc.email) = LOWER(?)
-        ) src
-        JOIN users u ON u.id = src.tenant_id
-        GROUP BY u.id, u.name, u.email
-        ORDER BY last_update DESC
-        """,
-        (landlord_email, landlord_email),
-    )
-    return cur.fetchall()
+    return tenants.list_prospective_tenants(get_conn(), landlord_email)
 
 
 
 def list_latest_references_for_tenant(tenant_id: int):
-    """Return each previous landlord with the latest (most recent) reference request, if any, and its answers."""
-    cur = get_conn().cursor()
-    cur.execute(
-        """
-        SELECT pl.id AS prev_id,
-               pl.name AS prev_name,
-               pl.email AS prev_email,
-               pl.afm AS prev_afm,
-               pl.address AS prev_address,
-               rr.token,
-               rr.status,
-               rr.score,
-               rr.paid_on_time,
-               rr.utilities_unpaid,
-               rr.good_condition,
-               rr.comments,
-               rr.created_at,
-               rr.filled_at
-        FROM previous_landlords pl
-        LEFT JOIN reference_requests rr
-          ON rr.prev_landlord_id = pl.id
-         AND rr.tenant_id = pl.tenant_id
-         AND rr.id = (
-              SELECT MAX(id) FROM reference_requests
-               WHERE prev_landlord_id = pl.id AND tenant_id = pl.tenant_id
-           )
-        WHERE pl.tenant_id = ?
-        ORDER BY pl.id DESC
-        """,
-        (tenant_id,),
-    )
-    return cur.fetchall()
+    """Each previous landlord with its latest reference request, if any, and the answers."""
+    return tenants.list_latest_references_for_tenant(get_conn(), tenant_id)
 
 
 # def build_reference_link(token: str) -> str:
@@ -888,61 +523,463 @@ def list_latest_references_for_tenant(tenant_id: int):
 #     return f"http://localhost:8501/?ref={token}"
 
 def build_reference_link(token: str) -> str:
-    base = st.session_state.get("app_base_url") or (st.secrets.get("APP_BASE_URL") if hasattr(st, "secrets") else "")
-    if base:
-        base = base.strip().rstrip("/")
-        return f"{base}/?ref={token}"
-    # fallback that still works when clicked inside the app
-    return f"?ref={token}"
-
-
-def email_reference_request(tenant_name: str, tenant_email: str, landlord_email: str, link: str):
-    subject = f"Reference Request for Tenant {tenant_name}"
-    body = (
-        f"Hello,\n\n"
-        f"{tenant_name} ({tenant_email}) listed you as a previous landlord and is requesting a short reference.\n"
-        f"Please confirm and complete the form here: {link}\n\n"
-        f"Thank you!"
+    """Link with a signed, expiring ref; relative "?ref=..." still works when clicked inside the app."""
+    return references.build_reference_link(app_config(), token)
+
+
+def reference_request_email(tenant_name: str, tenant_email: str, link: str) -> tuple[str, str, str]:
+    """(subject, text, html) in the tenant's current UI language."""
+    return outreach.reference_request_email(st.session_state.get("lang"), tenant_name, tenant_email, link)
+
+
+def email_reference_request(tenant_id: int, tenant_name: str, tenant_email: str, landlord_email: str, link: str,
+                            token: str | None = None):
+    """Queue the reference email; email_worker.py delivers it."""
+    return outreach.email_reference_request(
+        get_conn(), tenant_id, tenant_name, tenant_email, landlord_email, link, token, st.session_state.get("lang"),
     )
-    return send_email_smtp(landlord_email, subject, body)
+
+
+def email_status_badge(kind: str, ref: str) -> str:
+    info = get_email_status(get_conn(), kind, ref)
+    if not info:
+        return ""
+    status = info["status"]
+    if status == "sent":
+        return tr('📧 Email sent')
+    if status == "failed":
+        return tr('⚠️ Email failed')
+    return tr('🕓 Email queued')
 
 # ---------- Landlord Reference Portal (public) ----------
 
-def reference_portal(token: str):
-    st.title(tr('🏠 RentRight — Landlord Reference Portal'))
-    data = get_reference_request_by_token(token)
-    if not data:
-        st.error(tr('Invalid or expired reference token.'))
+def reference_portal(ref: str):
+    """Same page as portal_app.py, which serves it without loading the rest of the app."""
+    render_portal(get_conn(), app_config(), ref)
+
+
+# ---------- Card fragments ----------
+# Each card is an st.fragment that re-queries its own rows, so a click on one
+# card reruns only that card. Actions that move a request to another status
+# tab (and so change the counts above it) still do a full st.rerun().
+
+def flash(key: str, kind: str, msg: str):
+    """Queue a message for a card; shown on its next render (survives st.rerun)."""
+    st.session_state.setdefault("flash", {})[key] = (kind, msg)
+
+
+def show_flash(key: str):
+    item = st.session_state.get("flash", {}).pop(key, None)
+    if item:
+        getattr(st, item[0])(item[1])
+
+
+def rerun_card(status_before: str, token: str):
+    """Full rerun if the request changed status tab, otherwise just this fragment."""
+    req = get_reference_request_by_token(token)
+    status_after = effective_reference_status(req["status"] if req else None, token)
+    if status_after != status_before:
+        st.rerun()
+    st.rerun(scope="fragment")
+
+
+def status_selector(options: list, counts: dict, key: str) -> str:
+    """Tab-like status picker. Unlike st.tabs, only the chosen view gets built."""
+    return st.radio(
+        tr('Show'),
+        options,
+        format_func=lambda s: f"{tr(s.capitalize())} ({counts.get(s, 0)})",
+        horizontal=True,
+        label_visibility="collapsed",
+        key=key,
+    )
+
+
+# Above this many requests the dashboards open in the table view.
+TABLE_VIEW_THRESHOLD = 50
+
+
+def layout_selector(total: int, key: str) -> str:
+    """Cards (one widget set per request) or Table (one dataframe for the whole list)."""
+    return st.radio(
+        tr('Layout'),
+        ["cards", "table"],
+        index=1 if total > TABLE_VIEW_THRESHOLD else 0,
+        format_func=lambda s: tr(s.capitalize()),
+        horizontal=True,
+        label_visibility="collapsed",
+        key=key,
+    )
+
+
+def request_table(rows: list, columns: list, key: str) -> str | None:
+    """Render rows (token first) as one dataframe; return the selected row's token.
+
+    The token column is hidden. The whole list goes to the browser as a single
+    Arrow table rather than a set of widgets per row.
+    """
+    if not rows:
+        st.info(tr('No requests found.'))
+        return None
+    data = {name: [r[i + 1] for r in rows] for i, name in enumerate(columns)}
+    event = st.dataframe(
+        data,
+        hide_index=True,
+        use_container_width=True,
+        on_select="rerun",
+        selection_mode="single-row",
+        key=key,
+    )
+    selected = event.selection.rows
+    if not selected or selected[0] >= len(rows):
+        st.caption(tr('Select a row to open the request.'))
+        return None
+    return rows[selected[0]][0]
+
+
+@st.fragment
+def admin_request_card(token: str, prefix: str):
+    details = get_reference_request_by_token(token)
+    if not details:
         return
+    tenant = get_user_by_id(details["tenant_id"])
+    tenant_label = tenant["name"] if tenant else f"Tenant #{details['tenant_id']}"
+    final_status = effective_reference_status(details["status"], token)
 
-    if data["status"] == "completed":
-        st.success(tr('This reference has already been submitted. Thank you!'))
-        st.stop()
-
-    st.info(f"Reference for Tenant ID #{data['tenant_id']} — sent to {data['landlord_email']}")
-    with st.form("reference_form"):
-        confirm = st.checkbox(tr('I confirm I was the landlord for this tenant.'))
-        score = st.slider(tr('Overall tenant score'), min_value=1, max_value=10, value=8)
-        paid_on_time = st.radio(tr('Did the tenant pay on time?'), ["Yes","No"], horizontal=True)
-        utilities_unpaid = st.radio(tr('Did the tenant leave utilities unpaid?'), ["No","Yes"], horizontal=True)
-        good_condition = st.radio(tr('Did the tenant leave the apartment in good condition?'), ["Yes","No"], horizontal=True)
-        comments = st.text_area(tr('Optional comments'))
-        submit = st.form_submit_button(tr('Submit Reference'))
-
-    if submit:
-        if not confirm:
-            st.error(tr('Please confirm you were the landlord.'))
-            return
-        mark_reference_completed(
-            token,
-            confirm_landlord=True,
-            score=int(score),
-            paid_on_time=(paid_on_time == "Yes"),
-            utilities_unpaid=(utilities_unpaid == "Yes"),
-            good_condition=(good_condition == "Yes"),
-            comments=comments,
+    pl_name = pl_afm = pl_email = pl_addr = "—"
+    if details.get("prev_landlord_id"):
+        cur = get_conn().cursor()
+        cur.execute(
+            "SELECT name, afm, email, address FROM previous_landlords WHERE id=?",
+            (details["prev_landlord_id"],),
         )
-        st.success("Reference submitted successfully. Thank you!")
+        row = cur.fetchone()
+        if row:
+            pl_name, pl_afm, pl_email, pl_addr = row
+
+    with st.container(border=True):
+        show_flash(f"admin_{token}")
+        cols = st.columns([3, 3, 3, 2])
+        cols[0].markdown(f"**Tenant:** {tenant_label} ({tenant['email'] if tenant else '—'})")
+        cols[1].markdown(f"**To landlord:** {details['landlord_email']}")
+        cols[2].markdown(f"**Created:** {details['created_at']}")
+        cols[3].markdown(f"**Status:** {final_status}")
+
+        st.caption(f"Previous landlord: **{pl_name}** ({pl_email}) · AFM: **{pl_afm}** · Address: {pl_addr}")
+
+        link = build_reference_link(token)
+        st.text_input(tr('Reference Link'), value=link, key=f"{prefix}_link_{token}", disabled=True)
+
+        # --- Contract section ---
+        contract = get_contract_by_token(token)
+        if contract:
+            st.markdown(f"**Contract:** {contract['filename']} · {contract_status_badge(contract['status'])}")
+            st.caption(
+                f"Uploaded: {contract['uploaded_at']} • "
+                f"Last status update: {contract['status_updated_at'] or '—'}"
+                + (f" • by {contract['status_by']}" if contract['status_by'] else "")
+            )
+            preview = contract_preview(token)
+            if preview:
+                st.image(preview, width=240)
+            try:
+                st.download_button(
+                    tr('Download Contract'),
+                    data=read_contract_file(contract["path"]),
+                    file_name=contract["filename"],
+                    mime=contract["content_type"],
+                    key=f"{prefix}_dl_{token}",
+                )
+            except Exception as e:
+                st.warning(f"Unable to read the saved file: {e}")
+        else:
+            st.caption(tr('No contract uploaded yet.'))
+
+        # --- Admin actions (conditional) ---
+        ac1, ac2 = st.columns(2)
+
+        show_verify = (str(final_status).lower() != "completed")
+        show_cancel = (str(final_status).lower() != "cancelled")
+
+        if show_verify:
+            if ac1.button(tr('✅ Verify Contract'), key=f"{prefix}_verify_{token}"):
+                ok, msg = set_contract_status(token, "verified", st.session_state.user["email"])
+                if ok:
+                    promote_reference_if_ready(token)  # keep your existing promotion
+                    flash(f"admin_{token}", "success", tr('Contract verified successfully.'))
+                    rerun_card(final_status, token)
+                else:
+                    st.error(msg)
+        else:
+            ac1.caption(tr('Already completed — no verification needed.'))
+
+        if show_cancel:
+            if ac2.button(tr('Cancel Reference'), key=f"{prefix}_cancel_{token}"):
+                cancel_reference_request(token)
+                flash(f"admin_{token}", "warning", tr('Reference cancelled.'))
+                rerun_card(final_status, token)
+        else:
+            ac2.caption(tr('Already cancelled.'))
+
+
+@st.fragment
+def landlord_request_card(token: str, prefix: str):
+    details = get_reference_request_by_token(token)
+    if not details:
+        return
+    status, score = details["status"], details["score"]
+    tenant = get_user_by_id(details["tenant_id"])
+    with st.container(border=True):
+        show_flash(f"landlord_{token}")
+        cols = st.columns([3,2,3,2])
+        tenant_label = tenant["name"] if tenant else f"Tenant #{details['tenant_id']}"
+        cols[0].markdown(f"**Tenant:** {tenant_label}")
+        cols[1].markdown(f"**Status:** {status}")
+        cols[2].markdown(f"**Created:** {details['created_at']}")
+        cols[3].markdown(f"**Score:** {score if score is not None else '—'}")
+
+        link = build_reference_link(token)
+        st.text_input(tr('Reference Link'), value=link, key=f"{prefix}_link_{token}", disabled=True)
+
+        if status == "pending":
+            # ❌ no key here
+            with st.expander(tr('Respond Now')):
+                # forms use a positional key/name, not key=...
+                with st.form(f"{prefix}_landlord_response_{token}"):
+                    confirm = st.checkbox(
+                        tr('I confirm I was the landlord for this tenant.'),
+                        key=f"{prefix}_confirm_{token}"
+                    )
+                    s = st.slider(
+                        tr('Overall tenant score'), 1, 10, 8,
+                        key=f"{prefix}_score_{token}"
+                    )
+                    paid_on_time = st.radio(
+                        tr('Did the tenant pay on time?'), ["Yes","No"],
+                        horizontal=True, key=f"{prefix}_paid_{token}"
+                    )
+                    utilities_unpaid = st.radio(
+                        tr('Did the tenant leave utilities unpaid?'), ["No","Yes"],
+                        horizontal=True, key=f"{prefix}_utilities_{token}"
+                    )
+                    good_condition = st.radio(
+                        tr('Did the tenant leave the apartment in good condition?'), ["Yes","No"],
+                        horizontal=True, key=f"{prefix}_condition_{token}"
+                    )
+                    comments = st.text_area(
+                        tr('Optional comments'),
+                        key=f"{prefix}_comments_{token}"
+                    )
+
+                    col_a, col_b = st.columns([1,1])
+                    # ❌ form_submit_button has no key=
+                    submit = col_a.form_submit_button(tr('Submit Reference'))
+                    cancel_btn = col_b.form_submit_button(tr('Not My Tenant / Cancel'))
+
+                if submit:
+                    if not confirm:
+                        st.error(tr('Please confirm you were the landlord.'))
+                    else:
+                        mark_reference_completed(
+                            token,
+                            confirm_landlord=True,
+                            score=int(s),
+                            paid_on_time=(paid_on_time == "Yes"),
+                            utilities_unpaid=(utilities_unpaid == "Yes"),
+                            good_condition=(good_condition == "Yes"),
+                            comments=comments,
+                        )
+                        flash(f"landlord_{token}", "success", tr('Reference submitted successfully.'))
+                        st.rerun()  # status counts changed
+
+                if cancel_btn:
+                    cancel_reference_request(token)
+                    flash(f"landlord_{token}", "warning", tr('Request cancelled.'))
+                    st.rerun()  # status counts changed
+
+        elif status == "completed":
+            # ❌ no key here
+            with st.expander(tr('View Submitted Reference')):
+                st.write(f"Confirmed landlord: {'Yes' if details['confirm_landlord'] else 'No'}")
+                st.write(f"Score: {details['score']}/10")
+                st.write(f"Paid on time: {'Yes' if details['paid_on_time'] else 'No'}")
+                st.write(f"Utilities unpaid: {'Yes' if details['utilities_unpaid'] else 'No'}")
+                st.write(f"Apartment in good condition: {'Yes' if details['good_condition'] else 'No'}")
+                if details.get('comments'):
+                    st.write("**Comments:**")
+                    st.write(details['comments'])
+
+
+@st.fragment
+def future_landlord_card(cid: int):
+    tenant_id = st.session_state.user["id"]
+    contact = get_future_landlord_contact(cid, tenant_id)
+    if not contact:
+        return
+    fl_email, invited = contact["email"], contact["invited"]
+    with st.container(border=True):
+        show_flash(f"fl_{cid}")
+        cols = st.columns([4,2,2,2])
+        cols[0].markdown(f"**{fl_email}**")
+
+        if invited:
+            cols[2].success(tr('Invited'))
+            badge = email_status_badge("invite", f"{tenant_id}:{fl_email.strip().lower()}")
+            if badge:
+                cols[1].caption(badge)
+        else:
+            if cols[2].button(tr('Send Invitation'), key=f"invite_fl_{cid}"):
+                ok, msg = invite_future_landlord(
+                    tenant_id,
+                    fl_email,
+                    st.session_state.user["name"],
+                    st.session_state.user["email"],
+                )
+                if ok:
+                    flash(f"fl_{cid}", "success", tr('Invitation queued.'))
+                    st.rerun(scope="fragment")
+                else:
+                    st.error(f"Unable to queue invitation: {msg}")
+            if cols[3].button(tr('Remove'), key=f"remove_fl_{cid}"):
+                remove_future_landlord_contact(cid, tenant_id)
+                flash("fl_list", "info", tr('Contact removed.'))
+                st.rerun()  # the list itself changed
+
+
+@st.fragment
+def previous_landlord_panel(pid: int, email: str, afm: str, name: str, address: str):
+    """Collapsible previous-landlord section whose body is only built while open.
+
+    st.expander runs its body (requests query, contract lookups, file reads for
+    downloads) even when collapsed, so the open state is an explicit toggle
+    instead. Opening or closing one panel reruns only that panel.
+    """
+    with st.container(border=True):
+        is_open = st.toggle(f"{name} • {email}", key=f"open_pl_{pid}")
+        if not is_open:
+            return
+
+        st.write(f"**AFM:** {afm}")
+        st.write(f"**Address:** {address}")
+
+        c1, c2 = st.columns([1, 2])
+        with c1:
+            if (st.button(tr('Request Reference'), key=f"req_{pid}")
+                    and not rate_limited("reference_request", f"user:{st.session_state.user['id']}")):
+                created = create_reference_request(
+                    st.session_state.user["id"], pid, email,
+                    tenant_name=st.session_state.user["name"],
+                    tenant_email=st.session_state.user["email"],
+                )
+                if created.get("duplicate"):
+                    st.info(tr('A reference request was just sent to this landlord.'))
+                else:
+                    st.success(tr('Reference request created. The email is queued for delivery.'))
+        with c2:
+            cur = get_conn().cursor()
+            cur.execute(
+                "SELECT token, status, created_at, score FROM reference_requests WHERE prev_landlord_id=? ORDER BY id DESC",
+                (pid,),
+            )
+            reqs = cur.fetchall()
+            if reqs:
+                for (tok, status, created_at2, score) in reqs:
+                    tenant_request_card(tok)
+            else:
+                st.caption(tr('No reference requests have been created yet.'))
+
+
+def handle_contract_upload(tok: str, uploaded, success_msg: str):
+    """Save an uploaded file once (the uploader keeps it across reruns) and refresh this card."""
+    file_id = getattr(uploaded, "file_id", None) or f"{uploaded.name}:{uploaded.size}"
+    if st.session_state.get(f"up_saved_{tok}") == file_id:
+        return
+    ok, msg = save_contract_upload(tok, st.session_state.user["id"], uploaded)
+    if ok:
+        st.session_state[f"up_saved_{tok}"] = file_id
+        flash(f"tenant_{tok}", "success", success_msg)
+        st.rerun(scope="fragment")
+    else:
+        st.error(msg)
+
+
+@st.fragment
+def tenant_request_card(tok: str):
+    req = get_reference_request_by_token(tok)
+    if not req:
+        return
+    status, score = req["status"], req["score"]
+    show_flash(f"tenant_{tok}")
+    # Use the effective status (gated by contract verification)
+    final_status = effective_reference_status(status, tok)
+
+    colA, colB, colC = st.columns([2, 2, 2])
+    colA.write(f"Status: **{final_status}**")  # <-- final status here
+    if score is not None:
+        colB.write(f"Score: **{score}**/10")
+    badge = email_status_badge("reference_request", tok)
+    if badge:
+        colC.write(badge)
+
+    # --- Contract upload / status per request token ---
+    contract = get_contract_by_token(tok)
+
+    # NEW guard: when verified/completed, hide any upload UI
+    if str(final_status).lower() == tr('completed'):
+        if contract:
+            st.markdown(f"**{tr('Contract Status:')}** {contract_status_badge(contract['status'])}")
+
+            # Allow download only (no replace)
+            try:
+                st.download_button(
+                    tr('Download Contract'),
+                    data=read_contract_file(contract["path"]),
+                    file_name=contract["filename"],
+                    mime=contract.get("content_type") or contract.get("mime_type"),
+                    key=f"dl_{tok}",
+                )
+            except Exception as e:
+                st.warning(f"Unable to read the saved file: {e}")
+        else:
+            st.markdown(tr('Contract verified — no file upload needed.'))
+        # No uploader shown when completed
+    else:
+        # Not completed yet → show normal upload/replace flow
+        if contract:
+            st.markdown(f"**{tr('Contract Status:')}** {contract_status_badge(contract['status'])}")
+            st.caption(
+                f"Uploaded: {contract['uploaded_at']} • "
+                f"Last status update: {contract['status_updated_at'] or '—'}"
+                + (f" • by {contract['status_by']}" if contract.get('status_by') else "")
+            )
+            try:
+                st.download_button(
+                    tr('Download Contract'),
+                    data=read_contract_file(contract["path"]),
+                    file_name=contract["filename"],
+                    mime=contract.get("content_type") or contract.get("mime_type"),
+                    key=f"dl_{tok}",
+                )
+            except Exception as e:
+                st.warning(f"Unable to read the saved file: {e}")
+
+            uploaded = st.file_uploader(
+                tr('Replace Tenancy Contract (PDF or Image)'),
+                type=["pdf", "png", "jpg", "jpeg", "webp"],
+                key=f"up_{tok}",
+            )
+            if uploaded is not None:
+                handle_contract_upload(tok, uploaded, tr('Contract uploaded. Status reset to Pending Review.'))
+        else:
+            st.markdown(f"**{tr('Contract Status:')}** {tr('⏳ Pending Review')} {tr('(no file yet)')}")
+            uploaded = st.file_uploader(
+                tr('Upload Tenancy Contract (PDF or Image)'),
+                type=["pdf", "png", "jpg", "jpeg", "webp"],
+                key=f"up_{tok}",
+            )
+            if uploaded is not None:
+                handle_contract_upload(tok, uploaded, tr('Contract uploaded. Status set to Pending Review.'))
+    # --- End contract block ---
 
 
 def admin_dashboard():
@@ -966,7 +1003,7 @@ def admin_dashboard():
             value=st.session_state.get("app_base_url", ""),
             help="e.g., https://yourdomain.com"
         )
-                # --- SMTP quick test ---
+        # --- SMTP quick test ---
         st.markdown("---")
         st.caption(tr('Send Test Email'))
         test_to = st.text_input(
@@ -975,61 +1012,102 @@ def admin_dashboard():
             key="admin_test_to",
         )
         if st.button(tr('Send test email'), key="admin_send_test_email"):
-            try:
-                ok, msg = send_email_smtp(
-                    to_email=test_to,
-                    subject="RentRight SMTP Test",
-                    body="If you received this email, your SMTP configuration is working. ✅",
-                )
-            except NameError:
-                # Fallback si no existe send_email_smtp()
-                host = st.session_state.get("smtp_host")
-                port = int(st.session_state.get("smtp_port", 587))
-                user = st.session_state.get("smtp_user")
-                pwd = st.session_state.get("smtp_pass")
-                from_email = st.session_state.get("smtp_from") or user
-                use_tls = st.session_state.get("smtp_tls", True)
-                try:
-                    _msg = MIMEText("If you received this email, your SMTP configuration is working. ✅", "plain")
-                    _msg["Subject"] = "RentRight SMTP Test"
-                    _msg["From"] = from_email
-                    _msg["To"] = test_to
-                    server = smtplib.SMTP(host, port, timeout=15)
-                    if use_tls:
-                        server.starttls()
-                    server.login(user, pwd)
-                    server.sendmail(from_email, [test_to], _msg.as_string())
-                    server.quit()
-                    ok, msg = True, "sent"
-                except Exception as e:
-                    ok, msg = False, f"{type(e).__name__}: {e}"
-
+            ok, msg = send_email_smtp(
+                to_email=test_to,
+                subject="RentRight SMTP Test",
+                body="If you received this email, your SMTP configuration is working. ✅",
+            )
             if ok:
                 st.success(tr('Test email sent successfully.'))
             else:
                 st.error(f"{tr('Failed to send email:')} {msg}")
 
+    # ---------------- Startup timing ----------------
+    with st.expander(tr('Startup Timing')):
+        timing = TIMER.summary()
+        t1, t2, t3 = st.columns(3)
+        t1.metric(tr('Cold start (ms)'), f"{timing['cold_total_ms']:.1f}")
+        t2.metric(tr('Warm setup p50 (ms)'), f"{timing['warm_setup_p50_ms']:.1f}")
+        t3.metric(tr('Warm rerun p50 (ms)'), f"{timing['warm_total_p50_ms']:.1f}")
+        st.caption(
+            f"{tr('first run')} {timing['first_run_ms']:.1f} ms · {timing['reruns']} reruns · setup p95 {timing['warm_setup_p95_ms']:.1f} ms · "
+            f"rerun p95 {timing['warm_total_p95_ms']:.1f} ms · cold at {timing['cold_at']} · "
+            + ", ".join(f"{k} {v:.1f} ms" for k, v in timing["cold_ms"].items())
+        )
+
+    # ---------------- Rate limits ----------------
+    with st.expander(tr('Rate Limits')):
+        hits = rate_limiter().stats()
+        if not hits:
+            st.caption(tr('No rate-limited actions yet.'))
+        else:
+            limits = rate_limiter().limits
+            st.table([
+                {"action": action, "limit": f"{limits[action]['limit']} / {int(limits[action]['window'])}s",
+                 "allowed": m["allowed"], "blocked": m["blocked"]}
+                for action, m in sorted(hits.items())
+            ])
+            st.caption(tr('Counts are for this app process since it started.'))
+
+    # ---------------- Email delivery (outbox + dead letters) ----------------
+    with st.expander(tr('Email Delivery')):
+        counts = outbox_counts(get_conn())
+        m1, m2, m3, m4 = st.columns(4)
+        m1.metric(tr('Queued'), counts["queued"])
+        m2.metric(tr('Sending'), counts["sending"])
+        m3.metric(tr('Sent'), counts["sent"])
+        m4.metric(tr('Failed'), counts["failed"])
+
+        depth = queue_depth(get_conn())
+        if depth:
+            st.caption(tr('Queue depth by recipient domain'))
+            st.table([{"domain": d, "queued": n} for d, n in depth.items()])
+
+        dead = list_dead_letters(get_conn())
+        if not dead:
+            st.caption(tr('No undeliverable emails.'))
+        else:
+            if st.button(tr('Replay all failed emails'), key="dead_replay_all"):
+                n = replay_dead_letter(get_conn())
+                st.success(f"{n} {tr('emails requeued.')}")
+                st.rerun()
+            for (dead_id, outbox_id, kind, ref, to_email, subject, attempts, last_error, dead_at) in dead:
+                with st.container(border=True):
+                    st.markdown(f"**{to_email}** · {subject}")
+                    st.caption(f"{kind} · {attempts} attempts · {dead_at} · {last_error}")
+                    if st.button(tr('Replay'), key=f"dead_replay_{dead_id}"):
+                        replay_dead_letter(get_conn(), dead_id)
+                        st.rerun()
+
+    # ---------------- Background jobs (job_worker.py) ----------------
+    with st.expander(tr('Background Jobs')):
+        stats = job_stats(get_conn())
+        if not stats:
+            st.caption(tr('No background jobs yet.'))
+        else:
+            st.table([
+                {"kind": kind, "due": s["due"], "scheduled": s["scheduled"], "running": s["running"],
+                 "failed": s["failed"], "oldest due (s)": s["oldest_due_s"],
+                 "wait avg (s)": s["wait_avg_s"], "run avg (s)": s["run_avg_s"], "done (1h)": s["done"]}
+                for kind, s in sorted(stats.items())
+            ])
+            if any(s["failed"] for s in stats.values()) and st.button(tr('Retry failed jobs'), key="jobs_retry"):
+                n = retry_failed_jobs(get_conn())
+                st.success(f"{n} {tr('jobs requeued.')}")
+                st.rerun()
+
     st.markdown("---")
 
     # ---------------- Pending references management ----------------
     st.subheader(tr('Pending References (All Tenants)'))
 
-    # Pull everything, then compute effective status using contract state
-    all_reqs = list_reference_requests_global()
-    def eff(rec):
-        token, tenant_id, landlord_email, created_at, status, score = rec
-        return effective_reference_status(status, token)
-
-    pending_reqs   = [r for r in all_reqs if eff(r) == "pending"]
-    completed_reqs = [r for r in all_reqs if eff(r) == "completed"]
-    cancelled_reqs = [r for r in all_reqs if eff(r) == "cancelled"]
+    # Counts in one grouped query; only the selected status is listed and rendered.
+    counts = count_reference_requests_global()
 
     c1, c2, c3 = st.columns(3)
-    c1.metric("Pending (effective)", len(pending_reqs))
-    c2.metric("Completed (effective)", len(completed_reqs))
-    c3.metric(tr('Cancelled'), len(cancelled_reqs))
-
-    tab_pending, tab_completed, tab_cancelled = st.tabs([tr('Pending'), tr('Completed'), tr('Cancelled')])
+    c1.metric("Pending (effective)", counts["pending"])
+    c2.metric("Completed (effective)", counts["completed"])
+    c3.metric(tr('Cancelled'), counts["cancelled"])
 
     def render_admin_reqs(reqs, prefix: str):
         if not reqs:
@@ -1037,111 +1115,24 @@ def admin_dashboard():
             return
 
         for (token, tenant_id, landlord_email, created_at, status, score) in reqs:
-            tenant = get_user_by_id(tenant_id)
-            tenant_label = tenant["name"] if tenant else f"Tenant #{tenant_id}"
-            final_status = effective_reference_status(status, token)
-
-            # Fetch request details and previous landlord info
-            details = get_reference_request_by_token(token)
-            pl_name = pl_afm = pl_email = pl_addr = "—"
-            if details and details.get("prev_landlord_id"):
-                cur = get_conn().cursor()
-                cur.execute(
-                    "SELECT name, afm, email, address FROM previous_landlords WHERE id=?",
-                    (details["prev_landlord_id"],),
-                )
-                row = cur.fetchone()
-                if row:
-                    pl_name, pl_afm, pl_email, pl_addr = row
-
-            with st.container(border=True):
-                cols = st.columns([3, 3, 3, 2])
-                cols[0].markdown(f"**Tenant:** {tenant_label} ({tenant['email'] if tenant else '—'})")
-                cols[1].markdown(f"**To landlord:** {landlord_email}")
-                cols[2].markdown(f"**Created:** {created_at}")
-                cols[3].markdown(f"**Status:** {final_status}")
-
-                # ⬇️ Show previous landlord Name + AFM
-             
-                st.caption(f"Previous landlord: **{pl_name}** ({pl_email}) · AFM: **{pl_afm}** · Address: {pl_addr}")
-
-
-                link = build_reference_link(token)
-                st.text_input(tr('Reference Link'), value=link, key=f"{prefix}_link_{token}", disabled=True)
-
-                # --- Contract section ---
-                contract = get_contract_by_token(token)
-                if contract:
-                    st.markdown(f"**Contract:** {contract['filename']} · {contract_status_badge(contract['status'])}")
-                    st.caption(
-                        f"Uploaded: {contract['uploaded_at']} • "
-                        f"Last status update: {contract['status_updated_at'] or '—'}"
-                        + (f" • by {contract['status_by']}" if contract['status_by'] else "")
-                    )
-                    try:
-                        with open(contract["path"], "rb") as f:
-                            st.download_button(
-                                tr('Download Contract'),
-                                data=f.read(),
-                                file_name=contract["filename"],
-                                mime=contract["content_type"],
-                                key=f"{prefix}_dl_{token}",
-                            )
-                    except Exception as e:
-                        st.warning(f"Unable to read the saved file: {e}")
-                else:
-                    st.caption(tr('No contract uploaded yet.'))
-
-                # --- Admin actions ---
-                # --- Admin actions (conditional) ---
-                ac1, ac2 = st.columns(2)
-
-                show_verify = (str(final_status).lower() != "completed")
-                show_cancel = (str(final_status).lower() != "cancelled")
-
-                if show_verify:
-                    if ac1.button(tr('✅ Verify Contract'), key=f"{prefix}_verify_{token}"):
-                        ok, msg = set_contract_status(token, "verified", st.session_state.user["email"])
-                        if ok:
-                            promote_reference_if_ready(token)  # keep your existing promotion
-                            st.success(tr('Contract verified successfully.'))
-                            st.rerun()
-                        else:
-                            st.error(msg)
-                else:
-                    ac1.caption(tr('Already completed — no verification needed.'))
-
-                if show_cancel:
-                    if ac2.button(tr('Cancel Reference'), key=f"{prefix}_cancel_{token}"):
-                        cancel_reference_request(token)
-                        st.warning(tr('Reference cancelled.'))
-                        st.rerun()
-                else:
-                    ac2.caption(tr('Already cancelled.'))
-
-                # ac1, ac2 = st.columns(2)
-                # if ac1.button(tr('✅ Verify Contract'), key=f"{prefix}_verify_{token}"):
-                #     ok, msg = set_contract_status(token, "verified", st.session_state.user["email"])
-                #     if ok:
-                #         # Try to promote to completed if the landlord already submitted the reference
-                #         promote_reference_if_ready(token)
-                #         st.success(tr('Contract verified successfully.'))
-                #         st.rerun()
-                #     else:
-                #         st.error(msg)
-
-                # if ac2.button(tr('Cancel Reference'), key=f"{prefix}_cancel_{token}"):
-                #     cancel_reference_request(token)
-                #     st.warning(tr('Reference cancelled.'))
-                #     st.rerun()
-
-
-    with tab_pending:
-        render_admin_reqs(pending_reqs, "admin_pending")
-    with tab_completed:
-        render_admin_reqs(completed_reqs, "admin_completed")
-    with tab_cancelled:
-        render_admin_reqs(cancelled_reqs, "admin_cancelled")
+            admin_request_card(token, prefix)
+
+    sel_col, layout_col = st.columns([3, 1])
+    with sel_col:
+        view = status_selector(["pending", "completed", "cancelled"], counts, key="admin_status_view")
+    with layout_col:
+        layout = layout_selector(counts[view], key="admin_layout")
+
+    if layout == "table":
+        token = request_table(
+            list_reference_table_global(view),
+            ["Tenant", "Tenant email", "Landlord", "Created", "Status", "Score", "Contract"],
+            key=f"admin_table_{view}",
+        )
+        if token:
+            admin_request_card(token, f"admin_{view}_detail")
+    else:
+        render_admin_reqs(list_reference_requests_global_effective(view), f"admin_{view}")
 
     st.markdown("---")
     logout_button()
@@ -1181,42 +1172,20 @@ def tenant_dashboard():
                     st.session_state.user["email"],
                 )
                 if ok:
-                    st.success(tr('Contact added and invitation sent successfully.'))
+                    st.success(tr('Contact added and invitation queued.'))
                     st.rerun()  # refresh list to show 'Invited' status
                 else:
-                    st.warning(f"Contact added, but the email could not be sent: {msg}")
+                    st.warning(f"Contact added, but the email could not be queued: {msg}")
             except Exception as e:
                 st.warning(f"{tr('Unable to add contact:')} {e}")
 
 
     # List + actions (send connection / remove)
     fl_rows = list_future_landlord_contacts(st.session_state.user["id"]) or []
+    show_flash("fl_list")
     if fl_rows:
         for (cid, fl_email, created_at, invited, invited_at) in fl_rows:
-            with st.container(border=True):
-                cols = st.columns([4,2,2,2])
-                cols[0].markdown(f"**{fl_email}**")
-               
-                if invited:
-                    cols[2].success(tr('Invited'))
-             
-                else:
-                    if cols[2].button(tr('Send Invitation'), key=f"invite_fl_{cid}"):
-                        ok, msg = invite_future_landlord(
-                            st.session_state.user["id"],
-                            fl_email,
-                            st.session_state.user["name"],
-                            st.session_state.user["email"],
-                        )
-                        if ok:
-                            st.success(tr('Invitation sent successfully.'))
-                            st.rerun()
-                        else:
-                            st.error(f"Unable to send invitation: {msg}")
-                    if cols[3].button(tr('Remove'), key=f"remove_fl_{cid}"):
-                        remove_future_landlord_contact(cid, st.session_state.user["id"])
-                        st.info(tr('Contact removed.'))
-                        st.rerun()
+            future_landlord_card(cid)
     else:
         st.caption(tr('No future landlord contacts yet.'))
 
@@ -1248,117 +1217,33 @@ def tenant_dashboard():
 
     rows = list_previous_landlords(st.session_state.user["id"]) or []
     st.subheader(tr('All Reference Requests'))
+    if (len(rows) > 1 and st.button(tr('Request References from All Previous Landlords'), key="req_all")
+            and not rate_limited("reference_request", f"user:{st.session_state.user['id']}")):
+        with st.spinner(tr('Sending reference requests…')):
+            summary = request_references_from_all(
+                st.session_state.user["id"], st.session_state.user["name"], st.session_state.user["email"]
+            )
+        if summary.get("duplicate"):
+            st.info(tr('Reference requests were just sent. Please wait a few minutes before trying again.'))
+        elif not summary["created"]:
+            st.info(tr('Every previous landlord already has a pending request.'))
+        elif summary["failed"]:
+            st.warning(
+                f"{summary['created']} {tr('requests created')}: {summary['sent']} {tr('emailed')}, "
+                f"{summary['failed']} {tr('failed — please share these links manually:')}"
+            )
+            for tok in summary["errors"]:
+                st.code(build_reference_link(tok))
+        elif summary["queued"]:
+            st.success(
+                f"{summary['created']} {tr('requests created')}: {summary['sent']} {tr('emailed')}, "
+                f"{summary['queued']} {tr('queued for delivery shortly.')}"
+            )
+        else:
+            st.success(f"{summary['created']} {tr('requests created and emailed.')}")
     if rows:
         for (pid, email, afm, name, address, created_at) in rows:
-            with st.expander(f"{name} • {email}"):
-                st.write(f"**AFM:** {afm}")
-                st.write(f"**Address:** {address}")
-
-                c1, c2 = st.columns([1, 2])
-                with c1:
-                    if st.button(tr('Request Reference'), key=f"req_{pid}"):
-                        rec = create_reference_request(st.session_state.user["id"], pid, email)
-                        link = build_reference_link(rec["token"])
-                        ok, msg = email_reference_request(
-                            st.session_state.user["name"], st.session_state.user["email"], email, link
-                        )
-                        if ok:
-                            st.success(tr('Reference request sent successfully by email.'))
-                        else:
-                            st.warning(f"Email delivery failed ({msg}). Please share this link manually:")
-                            st.code(link)
-                with c2:
-                    cur = get_conn().cursor()
-                    cur.execute(
-                        "SELECT token, status, created_at, score FROM reference_requests WHERE prev_landlord_id=? ORDER BY id DESC",
-                        (pid,),
-                    )
-                    reqs = cur.fetchall()
-                    if reqs:
-                        for (tok, status, created_at2, score) in reqs:
-                            # Use the effective status (gated by contract verification)
-                            final_status = effective_reference_status(status, tok)
-
-                            colA, colB, colC = st.columns([2, 2, 2])
-                            colA.write(f"Status: **{final_status}**")  # <-- final status here
-                            if score is not None:
-                                colB.write(f"Score: **{score}**/10")
-                            link = build_reference_link(tok)
-                            # colC.write(link)
-
-                            # --- Contract upload / status per request token ---
-                            contract = get_contract_by_token(tok)
-
-                            # NEW guard: when verified/completed, hide any upload UI
-                            if str(final_status).lower() == tr('completed'):
-                                if contract:
-                                    st.markdown(f"**{tr('Contract Status:')}** {contract_status_badge(contract['status'])}")
-
-                                    # Allow download only (no replace)
-                                    try:
-                                        with open(contract["path"], "rb") as f:
-                                            st.download_button(
-                                                tr('Download Contract'),
-                                                data=f.read(),
-                                                file_name=contract["filename"],
-                                                mime=contract.get("content_type") or contract.get("mime_type"),
-                                                key=f"dl_{tok}",
-                                            )
-                                    except Exception as e:
-                                        st.warning(f"Unable to read the saved file: {e}")
-                                else:
-                                    st.markdown(tr('Contract verified — no file upload needed.'))
-                                # No uploader shown when completed
-                            else:
-                                # Not completed yet → show normal upload/replace flow
-                                if contract:
-                                    st.markdown(f"**{tr('Contract Status:')}** {contract_status_badge(contract['status'])}")
-                                    st.caption(
-                                        f"Uploaded: {contract['uploaded_at']} • "
-                                        f"Last status update: {contract['status_updated_at'] or '—'}"
-                                        + (f" • by {contract['status_by']}" if contract.get('status_by') else "")
-                                    )
-                                    try:
-                                        with open(contract["path"], "rb") as f:
-                                            st.download_button(
-                                                tr('Download Contract'),
-                                                data=f.read(),
-                                                file_name=contract["filename"],
-                                                mime=contract.get("content_type") or contract.get("mime_type"),
-                                                key=f"dl_{tok}",
-                                            )
-                                    except Exception as e:
-                                        st.warning(f"Unable to read the saved file: {e}")
-
-                                    uploaded = st.file_uploader(
-                                        tr('Replace Tenancy Contract (PDF or Image)'),
-                                        type=["pdf", "png", "jpg", "jpeg", "webp"],
-                                        key=f"up_{tok}",
-                                    )
-                                    if uploaded is not None:
-                                        ok, msg = save_contract_upload(tok, st.session_state.user["id"], uploaded)
-                                        if ok:
-                                            st.success(tr('Contract uploaded. Status reset to Pending Review.'))
-                                            st.rerun()
-                                        else:
-                                            st.error(msg)
-                                else:
-                                    st.markdown(f"**{tr('Contract Status:')}** {tr('⏳ Pending Review')} {tr('(no file yet)')}")
-                                    uploaded = st.file_uploader(
-                                        tr('Upload Tenancy Contract (PDF or Image)'),
-                                        type=["pdf", "png", "jpg", "jpeg", "webp"],
-                                        key=f"up_{tok}",
-                                    )
-                                    if uploaded is not None:
-                                        ok, msg = save_contract_upload(tok, st.session_state.user["id"], uploaded)
-                                        if ok:
-                                            st.success(tr('Contract uploaded. Status set to Pending Review.'))
-                                            st.rerun()
-                                        else:
-                                            st.error(msg)
-                            # --- End contract block ---
-                    else:
-                        st.caption(tr('No reference requests have been created yet.'))
+            previous_landlord_panel(pid, email, afm, name, address)
     else:
         st.info(tr('No previous landlords added yet.'))
 
@@ -1436,17 +1321,12 @@ def landlord_dashboard():
     st.subheader(tr('Reference Requests Sent To You'))
 
     # Quick stats
-    all_reqs = list_reference_requests_for_landlord(landlord_email)
-    pending_reqs = [r for r in all_reqs if r[3] == "pending"]
-    completed_reqs = [r for r in all_reqs if r[3] == "completed"]
-    cancelled_reqs = [r for r in all_reqs if r[3] == "cancelled"]
+    counts = count_reference_requests_for_landlord(landlord_email)
 
     c1, c2, c3 = st.columns(3)
-    c1.metric(tr('Pending'), len(pending_reqs))
-    c2.metric(tr('Completed'), len(completed_reqs))
-    c3.metric(tr('Cancelled'), len(cancelled_reqs))
-
-    tab_all, tab_pending, tab_completed, tab_cancelled = st.tabs([tr('All'), tr('Pending'), tr('Completed'), tr('Cancelled')])
+    c1.metric(tr('Pending'), counts["pending"])
+    c2.metric(tr('Completed'), counts["completed"])
+    c3.metric(tr('Cancelled'), counts["cancelled"])
 
     def render_requests(reqs, prefix: str):
         if not reqs:
@@ -1454,98 +1334,25 @@ def landlord_dashboard():
             return
 
         for (token, tenant_id, created_at, status, score) in reqs:
-            tenant = get_user_by_id(tenant_id)
-            with st.container(border=True):
-                cols = st.columns([3,2,3,2])
-                tenant_label = tenant["name"] if tenant else f"Tenant #{tenant_id}"
-                cols[0].markdown(f"**Tenant:** {tenant_label}")
-                cols[1].markdown(f"**Status:** {status}")
-                cols[2].markdown(f"**Created:** {created_at}")
-                cols[3].markdown(f"**Score:** {score if score is not None else '—'}")
-
-                link = build_reference_link(token)
-                st.text_input(tr('Reference Link'), value=link, key=f"{prefix}_link_{token}", disabled=True)
-
-                if status == "pending":
-                    # ❌ no key here
-                    with st.expander(tr('Respond Now')):
-                        # forms use a positional key/name, not key=...
-                        with st.form(f"{prefix}_landlord_response_{token}"):
-                            confirm = st.checkbox(
-                                tr('I confirm I was the landlord for this tenant.'),
-                                key=f"{prefix}_confirm_{token}"
-                            )
-                            s = st.slider(
-                                tr('Overall tenant score'), 1, 10, 8,
-                                key=f"{prefix}_score_{token}"
-                            )
-                            paid_on_time = st.radio(
-                                tr('Did the tenant pay on time?'), ["Yes","No"],
-                                horizontal=True, key=f"{prefix}_paid_{token}"
-                            )
-                            utilities_unpaid = st.radio(
-                                tr('Did the tenant leave utilities unpaid?'), ["No","Yes"],
-                                horizontal=True, key=f"{prefix}_utilities_{token}"
-                            )
-                            good_condition = st.radio(
-                                tr('Did the tenant leave the apartment in good condition?'), ["Yes","No"],
-                                horizontal=True, key=f"{prefix}_condition_{token}"
-                            )
-                            comments = st.text_area(
-                                tr('Optional comments'),
-                                key=f"{prefix}_comments_{token}"
-                            )
-
-                            col_a, col_b = st.columns([1,1])
-                            # ❌ form_submit_button has no key=
-                            submit = col_a.form_submit_button(tr('Submit Reference'))
-                            cancel_btn = col_b.form_submit_button(tr('Not My Tenant / Cancel'))
-
-                        if submit:
-                            if not confirm:
-                                st.error(tr('Please confirm you were the landlord.'))
-                            else:
-                                mark_reference_completed(
-                                    token,
-                                    confirm_landlord=True,
-                                    score=int(s),
-                                    paid_on_time=(paid_on_time == "Yes"),
-                                    utilities_unpaid=(utilities_unpaid == "Yes"),
-                                    good_condition=(good_condition == "Yes"),
-                                    comments=comments,
-                                )
-                                st.success(tr('Reference submitted successfully.'))
-                                st.rerun()
-
-                        if cancel_btn:
-                            cancel_reference_request(token)
-                            st.warning(tr('Request cancelled.'))
-                            st.rerun()
-
-                elif status == "completed":
-                    # ❌ no key here
-                    with st.expander(tr('View Submitted Reference')):
-                        details = get_reference_request_by_token(token)
-                        if details:
-                            st.write(f"Confirmed landlord: {'Yes' if details['confirm_landlord'] else 'No'}")
-                            st.write(f"Score: {details['score']}/10")
-                            st.write(f"Paid on time: {'Yes' if details['paid_on_time'] else 'No'}")
-                            st.write(f"Utilities unpaid: {'Yes' if details['utilities_unpaid'] else 'No'}")
-                            st.write(f"Apartment in good condition: {'Yes' if details['good_condition'] else 'No'}")
-                            if details.get('comments'):
-                                st.write("**Comments:**")
-                                st.write(details['comments'])
-
-
-
-    with tab_all:
-        render_requests(all_reqs, "all")
-    with tab_pending:
-        render_requests(pending_reqs, "pending")
-    with tab_completed:
-        render_requests(completed_reqs, "completed")
-    with tab_cancelled:
-        render_requests(cancelled_reqs, "cancelled")
+            landlord_request_card(token, prefix)
+
+    sel_col, layout_col = st.columns([3, 1])
+    with sel_col:
+        view = status_selector(["all", "pending", "completed", "cancelled"], counts, key="landlord_status_view")
+    with layout_col:
+        layout = layout_selector(counts[view], key="landlord_layout")
+
+    status = None if view == "all" else view
+    if layout == "table":
+        token = request_table(
+            list_reference_table_for_landlord(landlord_email, status),
+            ["Tenant", "Created", "Status", "Score"],
+            key=f"landlord_table_{view}",
+        )
+        if token:
+            landlord_request_card(token, f"{view}_detail")
+    else:
+        render_requests(list_reference_requests_for_landlord(landlord_email, status), view)
 
 
 # ---------- App ----------
@@ -1554,11 +1361,16 @@ def main():
     params = st.query_params
     token = params.get("ref")
     if token:
+        # Public, unauthenticated entry point: throttle per client before any token work
+        if rate_limited(*throttle_key("portal", client_ip())):
+            return
         reference_portal(token)
         return
 
     st.title("🏠 RentRight")
 
+    restore_session()
+    flush_session_cookie()
     if st.session_state.get("user"):
         role = st.session_state.user["role"]
         if role == "tenant":
@@ -1575,25 +1387,15 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    _setup_done = time.perf_counter()
+    try:
+        main()
+    finally:
+        TIMER.record_rerun(_setup_done - _RERUN_STARTED, time.perf_counter() - _RERUN_STARTED)
 
 
 
 
 def load_contract_plaintext(token: str) -> bytes | None:
     """Return decrypted contract bytes if landlord has consented."""
-    contract = get_contract_by_token(token)
-    if not contract:
-        return None
-    cur = get_conn().cursor()
-    row = cur.execute("SELECT consent_status FROM reference_contracts WHERE token=?", (token,)).fetchone()
-    consent = (row[0] if row else "locked")
-    if consent != "consented":
-        return None
-    try:
-        with open(contract["path"], "rb") as f:
-            cipher = f.read()
-        from utils_vault import decrypt_bytes
-        return decrypt_bytes(cipher)
-    except Exception:
-        return None
\ No newline at end of file
+    return contracts.load_contract_plaintext(get_conn(), token)
\ No newline at end of file
@@ -0,0 +1,97 @@
+"""Micro-benchmarks for the rentright core, without Streamlit.
+
+Seeds a scratch database with --requests reference requests (a third with a
+pending contract) and times the core calls the dashboards and the portal make.
+
+    python bench_core.py --requests 5000 --iterations 2000
+"""
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from rentright.db import ensure_consent_column, ensure_schema
+from rentright import Config, open_db, references
+from utils_outbox import ensure_outbox_table
+
+
+def seed(conn, n: int) -> list[str]:
+    now = datetime.utcnow().isoformat()
+    conn.execute(
+        "INSERT INTO users(email, name, password_hash, role, created_at) VALUES ('t@example.com','Tenant','x','tenant',?)",
+        (now,),
+    )
+    conn.execute(
+        "INSERT INTO previous_landlords(tenant_id, email, afm, name, address, created_at) "
+        "VALUES (1,'l@example.com','123456789','Landlord','Street 1',?)",
+        (now,),
+    )
+    tokens = [references.generate_token() for _ in range(n)]
+    conn.executemany(
+        "INSERT INTO reference_requests(token, tenant_id, prev_landlord_id, landlord_email, created_at, status) "
+        "VALUES (?,1,1,'l@example.com',?,?)",
+        [(t, now, random.choice(["pending", "completed", "cancelled"])) for t in tokens],
+    )
+    conn.executemany(
+        "INSERT INTO reference_contracts(token, tenant_id, filename, content_type, path, size_bytes, status, uploaded_at) "
+        "VALUES (?,1,'c.pdf','application/pdf','/dev/null',0,'pending',?)",
+        [(t, now) for t in tokens[::3]],
+    )
+    conn.commit()
+    return tokens
+
+
+def timed(fn, iterations: int) -> dict:
+    samples = []
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    samples.sort()
+    return {
+        "p50_us": statistics.median(samples) * 1e6,
+        "p99_us": samples[min(len(samples) - 1, int(0.99 * len(samples)))] * 1e6,
+        "per_s": len(samples) / sum(samples) if sum(samples) else 0.0,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--iterations", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="bench_core_") as tmp:
+        config = Config(db_path=str(Path(tmp) / "bench.db"), upload_dir=Path(tmp) / "uploads", secret_key="bench")
+        conn = open_db(config)
+        ensure_schema(conn)
+        ensure_consent_column(conn)
+        ensure_outbox_table(conn)
+        tokens = seed(conn, args.requests)
+        links = [references.build_reference_link(config, t).split("ref=", 1)[1] for t in tokens[:100]]
+
+        cases = {
+            "resolve link": lambda: references.resolve_reference_link(config, random.choice(links)),
+            "get request": lambda: references.get_reference_request(conn, random.choice(tokens)),
+            "effective status": lambda: references.effective_reference_status(conn, "pending", random.choice(tokens)),
+            "count (global)": lambda: references.count_reference_requests_global(conn),
+            "table (pending)": lambda: references.list_reference_table_global(conn, "pending"),
+            "submit reference": lambda: references.submit_reference(
+                conn, random.choice(tokens), True, 8, True, False, True, "fine"),
+        }
+        print(f"{'case':<18} {'p50 us':>10} {'p99 us':>10} {'per s':>10}")
+        for name, fn in cases.items():
+            # Whole-table scans get fewer rounds
+            n = max(10, args.iterations // 50) if name.startswith(("count", "table")) else args.iterations
+            r = timed(fn, n)
+            print(f"{name:<18} {r['p50_us']:>10.1f} {r['p99_us']:>10.1f} {r['per_s']:>10.0f}")
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
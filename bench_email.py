@@ -0,0 +1,324 @@
+"""Email throughput benchmark against a local in-process SMTP sink.
+
+No real mail server needed: an asyncio SMTP sink (aiosmtpd-style, stdlib only)
+runs on a background thread and accepts everything, AUTH included. --latency
+adds a delay to every server reply to mimic a remote server's round trip.
+
+    python bench_email.py --messages 500 --concurrency 8 --latency 20
+
+Scenarios (all run by default, pick with --scenario):
+    send     utils_email.send_email_smtp, the app's immediate send, from
+             --concurrency caller threads
+    invite   rentright.outreach.invite_future_landlord for --messages contacts,
+             then the outbox drained as email_worker.py does
+    fanout   rentright.outreach.request_references_from_all for tenants with
+             --fanout previous landlords each, sending inline
+
+Each scenario runs once per delivery mode (--mode):
+    direct   new connection + EHLO + LOGIN + QUIT per message (the pre-pool
+             path, kept as the baseline)
+    pooled   send_email_smtp on the shared utils_email.SMTPPool
+    async    send_email_smtp with EMAIL_BACKEND = "async"
+             (utils_email_async.AsyncSMTPSender)
+
+invite and fanout deliver through the outbox (utils_outbox.deliver), which
+has no per-message connection path, so they skip direct. Their p50/p99 time
+the outreach call itself (what the user waits for); msg/s covers delivery too.
+"render us" is the mean utils_templates.render time per message inside
+those calls.
+Per-domain pacing is lifted so the sink, not the scheduler, sets the pace.
+"""
+import argparse
+import asyncio
+import smtplib
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+from rentright.db import ensure_consent_column, ensure_schema
+from email_worker import drain_once
+from rentright import Config, open_db, outreach
+from utils_email import build_message, close_all_pools, send_email_smtp
+from utils_email_async import close_all_senders
+from utils_outbox import DomainScheduler, ensure_outbox_table, load_rate_limits
+
+
+UNPACED = {"EMAIL_RATE_LIMITS": {"global": {"rate": 1e6, "burst": 1e6}, "default": {"rate": 1e6, "burst": 1e6}}}
+
+
+# ---------- Local SMTP sink ----------
+class SMTPSink:
+    """Minimal SMTP server that accepts and counts every message."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency_ms: float = 0.0):
+        self.host = host
+        self.port = port
+        self.latency = latency_ms / 1000.0
+        self.received = 0
+        self.connections = 0
+        self._loop = None
+        self._server = None
+        self._ready = threading.Event()
+
+    async def _reply(self, writer, line: str):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        writer.write((line + "\r\n").encode())
+        await writer.drain()
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        await self._reply(writer, "220 sink ESMTP")
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                cmd = line.decode(errors="replace").strip().upper()
+                if cmd.startswith("EHLO"):
+                    writer.write(b"250-sink\r\n250-8BITMIME\r\n250-AUTH PLAIN LOGIN\r\n")
+                    await self._reply(writer, "250 SMTPUTF8")
+                elif cmd.startswith("DATA"):
+                    await self._reply(writer, "354 end with <CRLF>.<CRLF>")
+                    while (await reader.readline()) not in (b".\r\n", b".\n", b""):
+                        pass
+                    self.received += 1
+                    await self._reply(writer, "250 OK queued")
+                elif cmd.startswith("AUTH"):
+                    await self._reply(writer, "235 2.7.0 Authentication successful")
+                elif cmd.startswith("QUIT"):
+                    await self._reply(writer, "221 bye")
+                    break
+                else:
+                    # HELO, MAIL, RCPT, RSET, NOOP... all accepted.
+                    await self._reply(writer, "250 OK")
+        finally:
+            writer.close()
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._server = self._loop.run_until_complete(asyncio.start_server(self._handle, self.host, self.port))
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self._loop.run_forever()
+
+    def start(self) -> "SMTPSink":
+        threading.Thread(target=self._run, daemon=True).start()
+        self._ready.wait()
+        return self
+
+    def stop(self):
+        if self._loop:
+            self._loop.call_soon_threadsafe(self._server.close)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+def smtp_settings(sink: SMTPSink, mode: str) -> dict:
+    """What load_smtp_config would return for the sink."""
+    return {"host": sink.host, "port": sink.port, "user": "bench", "pwd": "bench",
+            "from_email": "bench@rentright.test", "use_tls": False, "backend": "async" if mode == "async" else ""}
+
+
+# ---------- Delivery modes ----------
+def send_direct(smtp: dict, to_email: str, subject: str, body: str, html: str | None = None) -> tuple[bool, str]:
+    msg = build_message(smtp["from_email"], to_email, subject, body, html)
+    server = smtplib.SMTP(smtp["host"], smtp["port"], timeout=15)
+    server.login(smtp["user"], smtp["pwd"])
+    server.sendmail(smtp["from_email"], [to_email], msg.as_string())
+    server.quit()
+    return True, "sent"
+
+
+MODES = {
+    "direct": send_direct,
+    "pooled": send_email_smtp,
+    "async": send_email_smtp,  # smtp_settings sets backend = "async"
+}
+
+
+# ---------- Scenarios ----------
+def _timed_map(fn, items, concurrency: int) -> list[float]:
+    def one(item):
+        t0 = time.perf_counter()
+        ok, msg = fn(item)
+        if not ok:
+            raise RuntimeError(msg)
+        return time.perf_counter() - t0
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(one, items))
+
+
+@contextmanager
+def timed_render(samples: list):
+    """Time each template render the outreach functions do, without changing what they call."""
+    real = outreach.render_email
+
+    def render(*args, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            return real(*args, **kwargs)
+        finally:
+            samples.append(time.perf_counter() - t0)
+
+    outreach.render_email = render
+    try:
+        yield samples
+    finally:
+        outreach.render_email = real
+
+
+def _scratch_db(tmp: str) -> tuple[Config, object]:
+    config = Config(db_path=str(Path(tmp) / "bench.db"), upload_dir=Path(tmp) / "uploads",
+                    app_base_url="https://rentright.test", secret_key="bench", secrets=UNPACED)
+    conn = open_db(config)
+    ensure_schema(conn)
+    ensure_consent_column(conn)
+    ensure_outbox_table(conn)
+    return config, conn
+
+
+def _add_tenant(conn, i: int) -> int:
+    cur = conn.execute(
+        "INSERT INTO users(email, name, password_hash, role, created_at) VALUES (?,?,'x','tenant',?)",
+        (f"tenant{i}@example.com", f"Tenant {i}", datetime.utcnow().isoformat()),
+    )
+    return cur.lastrowid
+
+
+def scenario_send(mode: str, smtp: dict, n: int, concurrency: int, fanout: int) -> dict:
+    send = MODES[mode]
+    messages = [(f"landlord{i}@example.com", "RentRight benchmark", "Hello from the benchmark.\n") for i in range(n)]
+    return {"latencies": _timed_map(lambda m: send(smtp, *m), messages, concurrency)}
+
+
+def scenario_invite(mode: str, smtp: dict, n: int, concurrency: int, fanout: int) -> dict:
+    with tempfile.TemporaryDirectory(prefix="bench_email_") as tmp:
+        config, conn = _scratch_db(tmp)
+        tenant_id = _add_tenant(conn, 0)
+        now = datetime.utcnow().isoformat()
+        emails = [f"landlord{i}@example.com" for i in range(n)]
+        conn.executemany("INSERT INTO future_landlord_contacts(tenant_id, email, created_at) VALUES (?,?,?)",
+                         [(tenant_id, e, now) for e in emails])
+        conn.commit()
+
+        latencies, render_times = [], []
+        with timed_render(render_times):
+            for i, email in enumerate(emails):
+                t0 = time.perf_counter()
+                outreach.invite_future_landlord(conn, config, tenant_id, email, "Tenant 0", "tenant0@example.com",
+                                                lang="en" if i % 2 else "el")
+                latencies.append(time.perf_counter() - t0)
+
+        scheduler = DomainScheduler(load_rate_limits(config.secrets))
+        while drain_once(conn, smtp, concurrency, scheduler):
+            pass
+        conn.close()
+    return {"latencies": latencies, "render": render_times}
+
+
+def scenario_fanout(mode: str, smtp: dict, n: int, concurrency: int, fanout: int) -> dict:
+    """n landlords split into tenants of `fanout`; one request_references_from_all call per tenant."""
+    with tempfile.TemporaryDirectory(prefix="bench_email_") as tmp:
+        config, conn = _scratch_db(tmp)
+        now = datetime.utcnow().isoformat()
+        tenants = []
+        for t in range(0, n, fanout):
+            tenant_id = _add_tenant(conn, t)
+            conn.executemany(
+                "INSERT INTO previous_landlords(tenant_id, email, afm, name, address, created_at) "
+                "VALUES (?,?,'123456789','Landlord','Street 1',?)",
+                [(tenant_id, f"landlord{i}@example.com", now) for i in range(t, min(n, t + fanout))],
+            )
+            tenants.append((tenant_id, t))
+        conn.commit()
+
+        latencies, render_times = [], []
+        with timed_render(render_times):
+            for tenant_id, t in tenants:
+                t0 = time.perf_counter()
+                outreach.request_references_from_all(conn, config, tenant_id, f"Tenant {t}", f"tenant{t}@example.com",
+                                                     lang="en", smtp=smtp, max_workers=concurrency)
+                latencies.append(time.perf_counter() - t0)
+
+        # Anything held back or rescheduled goes out the way email_worker.py would send it.
+        scheduler = DomainScheduler(load_rate_limits(config.secrets))
+        while drain_once(conn, smtp, concurrency, scheduler):
+            pass
+        conn.close()
+    return {"latencies": latencies, "render": render_times}
+
+
+SCENARIOS = {"send": scenario_send, "invite": scenario_invite, "fanout": scenario_fanout}
+SCENARIO_MODES = {"send": list(MODES), "invite": ["pooled", "async"], "fanout": ["pooled", "async"]}
+
+
+# ---------- Reporting ----------
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[k]
+
+
+def run_one(scenario: str, mode: str, n: int, concurrency: int, latency_ms: float, fanout: int) -> dict:
+    sink = SMTPSink(latency_ms=latency_ms).start()
+    t0 = time.perf_counter()
+    result = SCENARIOS[scenario](mode, smtp_settings(sink, mode), n, concurrency, fanout)
+    elapsed = time.perf_counter() - t0
+    # The shared pools and senders are keyed by port; each sink gets a fresh one.
+    close_all_pools()
+    close_all_senders()
+    sink.stop()
+
+    lat = result["latencies"]
+    render_times = result.get("render") or []
+    return {
+        "scenario": scenario,
+        "mode": mode,
+        "messages": n,
+        "received": sink.received,
+        "connections": sink.connections,
+        "elapsed_s": elapsed,
+        "msg_per_s": sink.received / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(lat, 50) * 1000,
+        "p99_ms": percentile(lat, 99) * 1000,
+        "render_us": statistics.mean(render_times) * 1e6 if render_times else 0.0,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=5.0, help="ms added to every sink reply")
+    parser.add_argument("--fanout", type=int, default=10, help="previous landlords per tenant in the fanout scenario")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), action="append")
+    parser.add_argument("--mode", choices=sorted(MODES), action="append")
+    args = parser.parse_args(argv)
+
+    scenarios = args.scenario or list(SCENARIOS)
+    modes = args.mode or list(MODES)
+
+    print(f"{'scenario':<8} {'mode':<8} {'msgs':>6} {'conns':>6} {'msg/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'render us':>10}")
+    for scenario in scenarios:
+        for mode in modes:
+            if mode not in SCENARIO_MODES[scenario]:
+                continue
+            r = run_one(scenario, mode, args.messages, args.concurrency, args.latency, args.fanout)
+            print(
+                f"{r['scenario']:<8} {r['mode']:<8} {r['received']:>6} {r['connections']:>6} "
+                f"{r['msg_per_s']:>9.1f} {r['p50_ms']:>8.2f} {r['p99_ms']:>8.2f} {r['render_us']:>10.1f}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
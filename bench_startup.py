@@ -0,0 +1,240 @@
+"""Cold-start benchmark with an enforced import and first-render budget.
+
+Every measurement runs in a fresh interpreter, in a scratch working directory
+(so the app's bootstrap creates its database and upload folders there, not in
+the repo):
+
+    python bench_startup.py                      # all targets, 3 runs each
+    python bench_startup.py --target portal --top 15
+    python bench_startup.py --budget app=1200 --budget portal=600
+
+Per target it reports:
+    process   wall time of `python -X importtime -c "import ..."`
+    imports   cumulative import time of the target's modules (-X importtime)
+    render    first AppTest run of the Streamlit script (app and portal only)
+
+and fails (exit 1) when `process` or `render` is over budget, or when a module
+that should load lazily (cryptography, smtplib, email.mime, ...) was imported
+at start. Targets whose dependencies are not installed are reported as
+skipped. --no-enforce reports without failing.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parent
+
+# Only needed by the code paths that use them; must not load at start.
+LAZY_MODULES = ["cryptography", "smtplib", "email.mime", "aiosmtplib", "utils_email_async"]
+
+# process_ms / render_ms budgets are for a warm disk cache on a dev laptop.
+TARGETS = {
+    "app": {
+        "modules": ["app_professional"],
+        "script": "app_professional.py",
+        "process_ms": 1500,
+        "render_ms": 1500,
+        "lazy": LAZY_MODULES,
+    },
+    "portal": {
+        "modules": ["portal_app"],
+        "script": "portal_app.py",
+        "process_ms": 1000,
+        "render_ms": 800,
+        # The portal additionally must not pull in the main app or its auth/outbox stack.
+        "lazy": LAZY_MODULES + ["app_professional", "utils_auth", "utils_outbox", "utils_email"],
+    },
+    "core": {
+        # The app's own modules and the rentright core without Streamlit: what this repo adds to start-up.
+        "modules": [
+            "bootstrap", "utils_i18n", "utils_templates", "utils_session", "utils_ratelimit",
+            "utils_tokens", "utils_auth", "utils_outbox", "utils_vault",
+            "rentright", "rentright.users", "rentright.tenants", "rentright.references",
+            "rentright.contracts", "rentright.outreach",
+        ],
+        "process_ms": 250,
+        "lazy": LAZY_MODULES,
+    },
+    "api": {
+        "modules": ["api_app"],
+        "process_ms": 300,
+        # The JSON API must stay free of Streamlit and the staff UI.
+        "lazy": ["cryptography", "aiosmtplib", "streamlit", "app_professional"],
+    },
+    "worker": {
+        "modules": ["email_worker"],
+        "process_ms": 300,
+        "lazy": ["cryptography", "aiosmtplib"],
+    },
+    "jobs": {
+        "modules": ["job_worker"],
+        "process_ms": 300,
+        "lazy": ["cryptography", "aiosmtplib", "streamlit", "PIL"],
+    },
+}
+
+_IMPORTTIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)")
+_MODULES_MARK = "__bench_modules__="
+
+
+# ---------- Measurements ----------
+def _env() -> dict:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(ROOT), env.get("PYTHONPATH")]))
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    return env
+
+
+def parse_importtime(stderr: str) -> list[tuple[str, int, int, int]]:
+    """(module, self_us, cumulative_us, depth) for every -X importtime line."""
+    rows = []
+    for line in stderr.splitlines():
+        m = _IMPORTTIME.match(line)
+        if m:
+            rows.append((m.group(4), int(m.group(1)), int(m.group(2)), len(m.group(3)) // 2))
+    return rows
+
+
+def measure_import(modules: list[str], workdir: str) -> dict:
+    code = (
+        f"import {', '.join(modules)}\n"
+        "import sys, json\n"
+        f"print({_MODULES_MARK!r} + json.dumps(sorted(sys.modules)))\n"
+    )
+    t0 = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=workdir, env=_env(), capture_output=True, text=True,
+    )
+    wall = time.perf_counter() - t0
+    if proc.returncode != 0:
+        last = (proc.stderr.strip().splitlines() or ["failed"])[-1]
+        return {"error": last}
+
+    rows = parse_importtime(proc.stderr)
+    loaded = []
+    for line in proc.stdout.splitlines():
+        if line.startswith(_MODULES_MARK):
+            loaded = json.loads(line[len(_MODULES_MARK):])
+    return {
+        "process_ms": wall * 1000,
+        "imports_ms": sum(cum for name, _, cum, depth in rows if depth == 0 and name in modules) / 1000,
+        "rows": rows,
+        "loaded": loaded,
+    }
+
+
+def measure_render(script: str, workdir: str, timeout: float = 60.0) -> dict:
+    """First run of the script under streamlit.testing (no browser, fresh process)."""
+    code = (
+        "import time\n"
+        "t0 = time.perf_counter()\n"
+        "from streamlit.testing.v1 import AppTest\n"
+        f"at = AppTest.from_file({str(ROOT / script)!r}, default_timeout={timeout})\n"
+        "at.run()\n"
+        "print(f'render_ms={(time.perf_counter() - t0) * 1000:.3f} exceptions={len(at.exception)}')\n"
+    )
+    proc = subprocess.run([sys.executable, "-c", code], cwd=workdir, env=_env(), capture_output=True, text=True)
+    if proc.returncode != 0:
+        return {"error": (proc.stderr.strip().splitlines() or ["failed"])[-1]}
+    m = re.search(r"render_ms=([\d.]+) exceptions=(\d+)", proc.stdout)
+    if not m:
+        return {"error": "no timing in output"}
+    if int(m.group(2)):
+        return {"error": f"{m.group(2)} exception(s) during first render"}
+    return {"render_ms": float(m.group(1))}
+
+
+# ---------- Report ----------
+def lazy_violations(loaded: list[str], lazy: list[str]) -> list[str]:
+    return sorted({name for name in loaded for prefix in lazy if name == prefix or name.startswith(prefix + ".")})
+
+
+def run_target(name: str, spec: dict, repeat: int, render: bool) -> dict:
+    samples, renders = [], []
+    with tempfile.TemporaryDirectory(prefix=f"bench_startup_{name}_") as workdir:
+        for _ in range(repeat):
+            r = measure_import(spec["modules"], workdir)
+            if "error" in r:
+                return {"target": name, "skipped": r["error"]}
+            samples.append(r)
+        if render and spec.get("script"):
+            for _ in range(repeat):
+                r = measure_render(spec["script"], workdir)
+                if "error" in r:
+                    renders = r["error"]
+                    break
+                renders.append(r["render_ms"])
+
+    last = samples[-1]
+    return {
+        "target": name,
+        "process_ms": statistics.median(s["process_ms"] for s in samples),
+        "imports_ms": statistics.median(s["imports_ms"] for s in samples),
+        "render_ms": statistics.median(renders) if isinstance(renders, list) and renders else None,
+        "render_error": renders if isinstance(renders, str) else None,
+        "rows": last["rows"],
+        "violations": lazy_violations(last["loaded"], spec.get("lazy", [])),
+    }
+
+
+def check_budget(result: dict, spec: dict) -> list[str]:
+    failures = []
+    if result["process_ms"] > spec["process_ms"]:
+        failures.append(f"process {result['process_ms']:.0f} ms > {spec['process_ms']} ms")
+    if result["render_ms"] is not None and spec.get("render_ms") and result["render_ms"] > spec["render_ms"]:
+        failures.append(f"render {result['render_ms']:.0f} ms > {spec['render_ms']} ms")
+    if result["violations"]:
+        failures.append("loaded at start: " + ", ".join(result["violations"]))
+    return failures
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--target", choices=sorted(TARGETS), action="append")
+    parser.add_argument("--repeat", type=int, default=3, help="fresh processes per target (median is reported)")
+    parser.add_argument("--top", type=int, default=8, help="slowest imports (self time) to list per target")
+    parser.add_argument("--budget", action="append", default=[], metavar="TARGET=MS",
+                        help="override a target's process budget")
+    parser.add_argument("--no-render", action="store_true", help="skip the AppTest first-render measurement")
+    parser.add_argument("--no-enforce", action="store_true", help="report only; always exit 0")
+    args = parser.parse_args(argv)
+
+    targets = {name: dict(TARGETS[name]) for name in (args.target or list(TARGETS))}
+    for item in args.budget:
+        name, _, ms = item.partition("=")
+        if name in targets:
+            targets[name]["process_ms"] = float(ms)
+
+    failed = False
+    print(f"{'target':<8} {'process ms':>11} {'imports ms':>11} {'render ms':>10} {'budget ms':>10}  result")
+    for name, spec in targets.items():
+        r = run_target(name, spec, args.repeat, not args.no_render)
+        if "skipped" in r:
+            print(f"{name:<8} {'-':>11} {'-':>11} {'-':>10} {spec['process_ms']:>10.0f}  skipped: {r['skipped']}")
+            continue
+        failures = check_budget(r, spec)
+        failed |= bool(failures)
+        render = f"{r['render_ms']:.1f}" if r["render_ms"] is not None else "-"
+        print(
+            f"{name:<8} {r['process_ms']:>11.1f} {r['imports_ms']:>11.1f} {render:>10} "
+            f"{spec['process_ms']:>10.0f}  {'; '.join(failures) or 'ok'}"
+        )
+        if r["render_error"]:
+            print(f"{'':<8} render skipped: {r['render_error']}")
+        for mod, self_us, cum_us, depth in sorted(r["rows"], key=lambda row: -row[1])[:args.top]:
+            print(f"{'':<8}   {self_us / 1000:>7.1f} ms self {cum_us / 1000:>8.1f} ms cum  {mod}")
+
+    return 1 if failed and not args.no_enforce else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
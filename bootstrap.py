@@ -0,0 +1,126 @@
+"""One-time, per-process setup for the Streamlit app.
+
+Streamlit re-executes app_professional.py on every interaction, but imported
+modules live for the whole process. The app wraps `run_bootstrap` in
+st.cache_resource, so directories, schema, migrations, the admin account and
+the secrets snapshot are handled once per process. A rerun does no setup I/O.
+
+TIMER keeps the cold-start cost (per step) separately from warm reruns (the
+script's own setup path and the whole rerun), for the admin dashboard.
+"""
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+from rentright.db import ensure_consent_column, ensure_schema
+
+
+ADMIN_EMAIL = "admin@gmail.com"
+ADMIN_NAME = "Admin"
+ADMIN_PASSWORD = "123"
+
+
+# ---------- Timing ----------
+class StartupTimer:
+    """Cold-start steps (once per process) and warm rerun samples (rolling)."""
+
+    def __init__(self, samples: int = 500):
+        self.cold = {}
+        self.cold_at = None
+        self.first_run_ms = None  # the rerun that paid for the bootstrap
+        self._setup = deque(maxlen=samples)
+        self._total = deque(maxlen=samples)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def step(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.cold[name] = time.perf_counter() - t0
+
+    def record_rerun(self, setup_seconds: float, total_seconds: float | None = None):
+        with self._lock:
+            if self.first_run_ms is None:
+                self.first_run_ms = (total_seconds or setup_seconds) * 1000
+                return
+            self._setup.append(setup_seconds)
+            if total_seconds is not None:
+                self._total.append(total_seconds)
+
+    @staticmethod
+    def _pct(values, pct: float) -> float:
+        if not values:
+            return 0.0
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+    def summary(self) -> dict:
+        with self._lock:
+            setup, total = list(self._setup), list(self._total)
+        return {
+            "cold_at": self.cold_at,
+            "cold_ms": {k: v * 1000 for k, v in self.cold.items()},
+            "cold_total_ms": sum(self.cold.values()) * 1000,
+            "first_run_ms": self.first_run_ms or 0.0,
+            "reruns": len(setup),
+            "warm_setup_p50_ms": self._pct(setup, 50) * 1000,
+            "warm_setup_p95_ms": self._pct(setup, 95) * 1000,
+            "warm_total_p50_ms": self._pct(total, 50) * 1000,
+            "warm_total_p95_ms": self._pct(total, 95) * 1000,
+        }
+
+
+TIMER = StartupTimer()
+
+
+# ---------- Setup steps ----------
+def ensure_admin(conn: sqlite3.Connection, email: str = ADMIN_EMAIL, name: str = ADMIN_NAME,
+                 password: str = ADMIN_PASSWORD):
+    """Create the admin user if missing."""
+    from utils_auth import hash_password
+
+    if conn.execute("SELECT 1 FROM users WHERE email = ?", (email,)).fetchone():
+        return
+    conn.execute(
+        "INSERT OR IGNORE INTO users(email, name, password_hash, role, created_at) VALUES (?,?,?,?,?)",
+        (email, name, hash_password(password), "admin", datetime.utcnow().isoformat()),
+    )
+    conn.commit()
+
+
+def run_bootstrap(conn: sqlite3.Connection, dirs: list, secrets: dict | None = None) -> dict:
+    """Everything the app needs before its first render. Returns the secrets snapshot."""
+    from utils_auth import CONFIGURE_KEYS as AUTH_KEYS, configure as configure_auth
+    from utils_jobs import ensure_jobs_table
+    from utils_outbox import ensure_outbox_table
+    from utils_session import ensure_session_table, signing_key
+
+    snapshot = dict(secrets or {})
+    signing_key(snapshot)  # fail on the first run, not on the first emailed link
+    with TIMER.step("directories"):
+        for d in dirs:
+            Path(d).mkdir(parents=True, exist_ok=True)
+    with TIMER.step("schema"):
+        ensure_schema(conn)
+        ensure_consent_column(conn)
+        ensure_outbox_table(conn)
+        ensure_jobs_table(conn)
+        ensure_session_table(conn)
+    with TIMER.step("auth"):
+        auth = {k.lower(): v for k, v in dict(snapshot.get("AUTH", {}) or {}).items()}
+        unknown = sorted(k for k in auth if k not in AUTH_KEYS)
+        if unknown:
+            print(f"bootstrap: ignoring unknown AUTH settings: {', '.join(unknown)}", file=sys.stderr)
+        configure_auth(**{k: v for k, v in auth.items() if k in AUTH_KEYS})
+        ensure_admin(conn)
+    TIMER.cold_at = datetime.utcnow().isoformat()
+    print(f"bootstrap: cold start {sum(TIMER.cold.values()) * 1000:.1f} ms "
+          + " ".join(f"{k}={v * 1000:.1f}ms" for k, v in TIMER.cold.items()), file=sys.stderr)
+    return {"secrets": snapshot}
@@ -0,0 +1,95 @@
+"""Background worker that drains the email outbox.
+
+Runs as its own process next to the Streamlit app:
+
+    python email_worker.py --db rental_app.db --concurrency 4
+
+SMTP settings come from SMTP_* environment variables or .streamlit/secrets.toml;
+EMAIL_BACKEND = "async" sends through utils_email_async instead of the pool.
+Failed sends are retried with backoff; while the SMTP host's circuit breaker is
+open the worker stops claiming mail and waits for the breaker to half-open.
+Sends are paced per recipient domain by EMAIL_RATE_LIMITS (see
+utils_outbox.DomainScheduler); queue depth per domain is logged as it drains.
+"""
+import argparse
+import os
+import signal
+import sqlite3
+import sys
+import threading
+import time
+
+from rentright.db import connect
+from utils_email import load_secrets, load_smtp_config, get_breaker
+from utils_outbox import (
+    ensure_outbox_table, send_claimed, outbox_counts, queue_depth, DomainScheduler, load_rate_limits,
+    prune_idempotency_keys,
+)
+
+
+def drain_once(conn: sqlite3.Connection, smtp: dict, concurrency: int, scheduler: DomainScheduler) -> int:
+    """Claim what the rate limits allow, send it concurrently, record results. Returns rows handled."""
+    rows = scheduler.claim(conn, concurrency * 4)
+    summary = send_claimed(conn, rows, smtp, max_workers=concurrency, scheduler=scheduler)
+    for ref, msg in summary["errors"].items():
+        print(f"outbox ref={ref} failed: {msg}", file=sys.stderr)
+    for ref, msg in summary["retries"].items():
+        print(f"outbox ref={ref} will retry: {msg}", file=sys.stderr)
+    if summary["lost"]:
+        print(f"{summary['lost']} outbox row(s) were re-claimed after their lease ran out; not recorded",
+              file=sys.stderr)
+    return len(rows)
+
+
+def run(db_path: str, concurrency: int, poll_interval: float, once: bool = False):
+    conn = connect(db_path)
+    ensure_outbox_table(conn)
+    secrets = load_secrets()
+    smtp = load_smtp_config(secrets)
+    breaker = get_breaker(smtp["host"])
+    scheduler = DomainScheduler(load_rate_limits(secrets))
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+
+    last_prune = 0.0
+    while not stop.is_set():
+        if time.monotonic() - last_prune > 3600:
+            prune_idempotency_keys(conn)
+            last_prune = time.monotonic()
+        if breaker.is_open():
+            wait = breaker.seconds_until_retry()
+            print(f"circuit open for {smtp['host']}; pausing {wait:.0f}s", file=sys.stderr)
+            if once:
+                break
+            stop.wait(max(wait, poll_interval))
+            continue
+        handled = drain_once(conn, smtp, concurrency, scheduler)
+        if handled:
+            print(f"handled={handled} {outbox_counts(conn)} depth={queue_depth(conn)}")
+            continue
+        throttled = scheduler.seconds_until_next(conn)
+        if throttled:
+            # Mail is due but every domain with a backlog is out of tokens.
+            stop.wait(min(throttled, poll_interval))
+            continue
+        if once:
+            break
+        stop.wait(poll_interval)
+    conn.close()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=os.environ.get("DB_PATH", "rental_app.db"))
+    parser.add_argument("--concurrency", type=int, default=4, help="parallel SMTP sends")
+    parser.add_argument("--poll", type=float, default=2.0, help="seconds to sleep when the queue is empty")
+    parser.add_argument("--once", action="store_true", help="drain the queue and exit")
+    args = parser.parse_args(argv)
+    run(args.db, args.concurrency, args.poll, args.once)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,319 @@
+"""Background worker for the `jobs` queue (see utils_jobs).
+
+Runs as its own process next to the Streamlit app, like email_worker.py:
+
+    python job_worker.py --db rental_app.db --concurrency 4
+    python job_worker.py --stats              # queue depth and latency as JSON, then exit
+
+Up to --concurrency jobs run at once on a thread pool, each thread with its own
+SQLite connection; claiming, leases and results go through the main thread's
+connection. The worker also keeps the periodic sweeps (retention, upload
+scrubbing, outbox pruning, and with JOB_WORKER_SENDS_EMAIL the outbox drain)
+scheduled. Every --report seconds it logs queue depth, the age of the oldest
+due job and run times per kind. SIGTERM/SIGINT stop claiming and let running
+jobs finish.
+"""
+import argparse
+import json
+import os
+import signal
+import socket
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+
+from rentright import Config, contracts, open_db
+from rentright.db import connect
+from utils_email import load_secrets
+from utils_jobs import (
+    DEFAULT_LEASE_SECONDS, PermanentJobError, claim_jobs, complete_job, enqueue_job, ensure_jobs_table,
+    extend_leases, fail_job, job_stats, prune_jobs, seconds_until_due,
+)
+from utils_outbox import ensure_outbox_table, prune_idempotency_keys
+
+
+# ---------- Handlers ----------
+# kind -> handler(conn, config, payload) -> result dict (logged). Raise to retry,
+# PermanentJobError to fail without retrying.
+def _token(payload: dict) -> str:
+    token = payload.get("token")
+    if not token:
+        raise PermanentJobError("payload has no token")
+    return token
+
+
+def encrypt_contract(conn, config: Config, payload: dict) -> dict:
+    """Move a plaintext upload into the vault (same steps as migrate_vault.py, for one row)."""
+    from migrate_vault import VAULT_SUFFIX, encrypt_file
+
+    if not (os.environ.get("FERNET_KEY") or os.environ.get("STREAMLIT_FERNET_KEY")):
+        return {"skipped": "no FERNET_KEY"}
+    row = conn.execute(
+        "SELECT id, path, uploaded_at FROM reference_contracts WHERE token=?", (_token(payload),)
+    ).fetchone()
+    if not row or not row[1] or row[1].endswith(VAULT_SUFFIX):
+        return {"skipped": "nothing to encrypt"}
+    row_id, path, uploaded_at = row
+    res = encrypt_file(row_id, path)
+    if not res["ok"]:
+        if res["error"] == "missing file":
+            # Replaced (save_contract deletes the previous file) or removed by retention.
+            return {"skipped": "file gone"}
+        if res.get("permanent"):
+            raise PermanentJobError(res["error"])  # retrying will not make it decrypt
+        raise RuntimeError(res["error"])
+    # Compare-and-swap on path and upload time: a re-upload in between leaves the row alone.
+    cur = conn.execute(
+        "UPDATE reference_contracts SET path=? WHERE id=? AND path=? AND uploaded_at=?",
+        (res["new_path"], row_id, path, uploaded_at),
+    )
+    conn.commit()
+    if cur.rowcount == 1:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass  # already gone; the row points at the blob, so the job is done
+        return {"encrypted": res["new_path"]}
+    # Re-uploaded meanwhile (that upload queued its own job), or another job for this
+    # upload swapped first and the row already points at the same blob.
+    current = conn.execute("SELECT path FROM reference_contracts WHERE id=?", (row_id,)).fetchone()
+    if not current or current[0] != res["new_path"]:
+        os.remove(res["new_path"])
+    return {"skipped": "replaced"}
+
+
+def preview_contract(conn, config: Config, payload: dict) -> dict:
+    path = contracts.make_contract_preview(conn, _token(payload))
+    return {"preview": str(path) if path else None}
+
+
+def retention(conn, config: Config, payload: dict) -> dict:
+    sec = config.secrets
+    return {"contracts_removed": contracts.cleanup_old_contracts(
+        conn,
+        days_rejected=int(payload.get("days_rejected", sec.get("RETENTION_REJECTED_DAYS", 30))),
+        days_cancelled=int(payload.get("days_cancelled", sec.get("RETENTION_CANCELLED_DAYS", 90))),
+    )}
+
+
+def scrub(conn, config: Config, payload: dict) -> dict:
+    return {"files_removed": contracts.scrub_uploads(conn, config)}
+
+
+def prune(conn, config: Config, payload: dict) -> dict:
+    return {"idempotency_keys": prune_idempotency_keys(conn), "jobs": prune_jobs(conn)}
+
+
+def drain_outbox(conn, config: Config, payload: dict) -> dict:
+    """Send what the outbox rate limits allow; for deployments without email_worker.py.
+
+    Drains for up to `seconds`, using the process-wide scheduler so the
+    per-domain pacing carries over from one run to the next.
+    """
+    from email_worker import drain_once
+    from utils_email import load_smtp_config
+    from utils_outbox import get_scheduler
+
+    scheduler = get_scheduler(config.secrets)
+    smtp = load_smtp_config(config.secrets)
+    deadline = time.monotonic() + float(payload.get("seconds", 20))
+    handled = 0
+    while time.monotonic() < deadline:
+        n = drain_once(conn, smtp, int(payload.get("concurrency", 4)), scheduler)
+        if not n:
+            break
+        handled += n
+    return {"handled": handled}
+
+
+HANDLERS = {
+    "contracts.encrypt": encrypt_contract,
+    "contracts.preview": preview_contract,
+    "contracts.retention": retention,
+    "contracts.scrub": scrub,
+    "maintenance.prune": prune,
+    "email.drain": drain_outbox,
+}
+
+# kind -> (seconds between runs, priority). One instance each, kept scheduled by the worker.
+PERIODIC = {
+    "contracts.retention": (24 * 3600, -10),
+    "contracts.scrub": (6 * 3600, -10),
+    "maintenance.prune": (3600, -5),
+}
+# Only with JOB_WORKER_SENDS_EMAIL = true, for deployments that run no email_worker.py.
+EMAIL_DRAIN = {"email.drain": (30, 5)}
+
+
+def periodic_jobs(config: Config) -> dict:
+    if str(config.secrets.get("JOB_WORKER_SENDS_EMAIL", "")).lower() in ("1", "true", "yes"):
+        return {**PERIODIC, **EMAIL_DRAIN}
+    return PERIODIC
+
+
+def schedule_periodic(conn: sqlite3.Connection, kinds: list[str] | None = None, periodic: dict | None = None) -> int:
+    """Queue the next run of each periodic sweep unless one is already waiting. Returns jobs added."""
+    added = 0
+    cur = conn.cursor()
+    for kind, (every, priority) in (periodic or PERIODIC).items():
+        if kinds and kind not in kinds:
+            continue
+        last = cur.execute(
+            "SELECT MAX(finished_at) FROM jobs WHERE kind=? AND status='done'", (kind,)
+        ).fetchone()[0]
+        run_at = datetime.fromisoformat(last) + timedelta(seconds=every) if last else datetime.utcnow()
+        if enqueue_job(cur, kind, priority=priority, run_at=run_at, dedupe_key=f"periodic:{kind}"):
+            added += 1
+    conn.commit()
+    return added
+
+
+# ---------- Worker ----------
+class Worker:
+    def __init__(self, config: Config, concurrency: int, lease_seconds: int,
+                 kinds: list[str] | None = None):
+        self.config = config
+        self.concurrency = concurrency
+        self.lease_seconds = lease_seconds
+        self.kinds = kinds
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.conn = open_db(config)
+        self._local = threading.local()
+        self.pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="job")
+        self.running = {}  # future -> job
+        # kind -> {"ok", "failed", "run_s"}; this process only, for the periodic log line
+        self.counters = {}
+
+    def _thread_conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = open_db(self.config)
+        return conn
+
+    def _run(self, job: dict):
+        handler = HANDLERS.get(job["kind"])
+        if handler is None:
+            raise PermanentJobError(f"no handler for {job['kind']!r}")
+        t0 = time.perf_counter()
+        result = handler(self._thread_conn(), self.config, job["payload"])
+        return result, time.perf_counter() - t0
+
+    def claim(self) -> int:
+        free = self.concurrency - len(self.running)
+        if free <= 0:
+            return 0
+        jobs = claim_jobs(self.conn, self.worker_id, free, self.lease_seconds, self.kinds)
+        for job in jobs:
+            self.running[self.pool.submit(self._run, job)] = job
+        return len(jobs)
+
+    def collect(self, timeout: float) -> int:
+        """Wait up to `timeout` for running jobs and record the ones that finished."""
+        if not self.running:
+            return 0
+        done, _ = wait(list(self.running), timeout=timeout, return_when=FIRST_COMPLETED)
+        for fut in done:
+            job = self.running.pop(fut)
+            c = self.counters.setdefault(job["kind"], {"ok": 0, "failed": 0, "run_s": 0.0})
+            try:
+                result, elapsed = fut.result()
+            except Exception as e:
+                status = fail_job(self.conn, job, f"{type(e).__name__}: {e}", isinstance(e, PermanentJobError))
+                c["failed"] += 1
+                print(f"job #{job['id']} {job['kind']} attempt {job['attempts']} failed "
+                      f"({status or 'lease lost, not recorded'}): {e}", file=sys.stderr)
+                continue
+            if not complete_job(self.conn, job):
+                print(f"job #{job['id']} {job['kind']} finished after its lease was lost; not recorded",
+                      file=sys.stderr)
+            c["ok"] += 1
+            c["run_s"] += elapsed
+            print(f"job #{job['id']} {job['kind']} done in {elapsed * 1000:.0f} ms {json.dumps(result, default=str)}")
+        return len(done)
+
+    def heartbeat(self):
+        extend_leases(self.conn, list(self.running.values()), self.lease_seconds)
+
+    def report(self):
+        stats = job_stats(self.conn)
+        depth = {k: f"{v['due']}+{v['scheduled']}" for k, v in stats.items() if v["due"] or v["scheduled"]}
+        oldest = max((v["oldest_due_s"] for v in stats.values()), default=0.0)
+        runs = {k: f"{c['ok']}ok/{c['failed']}err avg {c['run_s'] / max(1, c['ok']) * 1000:.0f}ms"
+                for k, c in self.counters.items()}
+        print(f"running={len(self.running)} depth(due+scheduled)={depth} oldest_due={oldest:.1f}s runs={runs}")
+
+    def close(self):
+        while self.running:
+            self.collect(timeout=1.0)
+        self.pool.shutdown(wait=True)
+        self.conn.close()
+
+
+def run(db_path: str, concurrency: int, poll_interval: float, lease_seconds: int = DEFAULT_LEASE_SECONDS,
+        kinds: list[str] | None = None, report_every: float = 60.0, once: bool = False):
+    secrets = load_secrets()
+    config = Config.from_secrets(secrets, db_path=db_path)
+    conn = open_db(config)
+    ensure_jobs_table(conn)
+    ensure_outbox_table(conn)
+    conn.close()
+    worker = Worker(config, concurrency, lease_seconds, kinds)
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+
+    last_schedule = last_beat = last_report = 0.0
+    while not stop.is_set():
+        now = time.monotonic()
+        if not once and now - last_schedule > 60:
+            schedule_periodic(worker.conn, kinds, periodic_jobs(config))
+            last_schedule = now
+        if now - last_beat > lease_seconds / 3:
+            worker.heartbeat()
+            last_beat = now
+        if report_every and now - last_report > report_every:
+            worker.report()
+            last_report = now
+
+        claimed = worker.claim()
+        if worker.running:
+            # Short wait while there is work; a slot frees up as soon as any job finishes.
+            worker.collect(timeout=0.05 if claimed else poll_interval)
+            continue
+        due_in = seconds_until_due(worker.conn)
+        if once and (due_in is None or due_in > 0):
+            break
+        stop.wait(poll_interval if due_in is None else min(max(due_in, 0.05), poll_interval))
+    worker.close()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=os.environ.get("DB_PATH", "rental_app.db"))
+    parser.add_argument("--concurrency", type=int, default=4, help="jobs running at once")
+    parser.add_argument("--poll", type=float, default=2.0, help="seconds to sleep when nothing is due")
+    parser.add_argument("--lease", type=int, default=DEFAULT_LEASE_SECONDS,
+                        help="seconds a claimed job stays leased without a heartbeat")
+    parser.add_argument("--kind", action="append", choices=sorted(HANDLERS),
+                        help="only run these job kinds (repeatable)")
+    parser.add_argument("--report", type=float, default=60.0, help="seconds between metrics lines (0 = off)")
+    parser.add_argument("--once", action="store_true", help="run what is due now and exit")
+    parser.add_argument("--stats", action="store_true", help="print queue depth and latency per kind as JSON and exit")
+    args = parser.parse_args(argv)
+
+    if args.stats:
+        conn = connect(args.db)
+        ensure_jobs_table(conn)
+        print(json.dumps(job_stats(conn), indent=2))
+        conn.close()
+        return 0
+    run(args.db, args.concurrency, args.poll, args.lease, args.kind, args.report, args.once)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+"""Migrate legacy plaintext contract uploads into the encrypted vault.
+
+Older builds (app_professional.py) stored contracts as plaintext files under
+uploads/contracts/<token>/<filename>. The vault path stores Fernet blobs named
+<filename>.bin. This command finds the remaining plaintext rows, encrypts them
+in a worker pool and swaps the DB path one row at a time, so it is safe to run
+against the live database and can be stopped and restarted at any point.
+
+New uploads are still written as plaintext by rentright.contracts.save_contract
+and encrypted afterwards by the `contracts.encrypt` job (job_worker.py). Run
+this again (e.g. from cron) to pick up any upload whose job did not run, such
+as when the worker was down or FERNET_KEY was not set for it. Rows whose file
+no longer exists are reported as missing and left as they are; they do not
+fail the run.
+
+Usage:
+    FERNET_KEY=... python migrate_vault.py --db rental_app.db --workers 4
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from uuid import uuid4
+
+from rentright.db import connect
+
+
+VAULT_SUFFIX = ".bin"
+
+
+def iter_plaintext_rows(conn: sqlite3.Connection, batch_size: int):
+    """Yield batches of (id, token, path) for rows not yet in the vault.
+
+    Keyset pagination keeps every SELECT short, so readers and the app's
+    writers are never blocked for the length of the migration.
+    """
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            """
+            SELECT id, token, path FROM reference_contracts
+             WHERE id > ? AND path != '' AND path NOT LIKE ?
+             ORDER BY id
+             LIMIT ?
+            """,
+            (last_id, "%" + VAULT_SUFFIX, batch_size),
+        ).fetchall()
+        if not rows:
+            return
+        last_id = rows[-1][0]
+        yield rows
+
+
+def encrypt_file(row_id: int, path: str) -> dict:
+    """Worker: write <path>.bin next to the plaintext file and verify it.
+
+    Runs in a separate process; the original file and the DB row are left
+    untouched so an interrupted run leaves nothing half-migrated.
+    """
+    from utils_vault import encrypt_bytes, decrypt_bytes, sha256_bytes, is_encrypted_sample
+
+    src = Path(path)
+    if not src.exists():
+        return {"id": row_id, "ok": False, "error": "missing file"}
+
+    data = src.read_bytes()
+    if is_encrypted_sample(data):
+        # Already a Fernet blob that was never renamed. One that does not decrypt
+        # (wrong key, truncated) is left for a person to look at, not wrapped again.
+        try:
+            decrypt_bytes(data)
+        except Exception as e:
+            return {"id": row_id, "ok": False, "permanent": True,
+                    "error": f"looks encrypted but does not decrypt: {type(e).__name__}"}
+        cipher = data
+    else:
+        cipher = encrypt_bytes(data)
+        if sha256_bytes(decrypt_bytes(cipher)) != sha256_bytes(data):
+            return {"id": row_id, "ok": False, "error": "round-trip check failed"}
+
+    dst = src.with_name(src.name + VAULT_SUFFIX)
+    # Unique per writer: two jobs for the same upload must not share a temp file.
+    tmp = dst.with_name(f"{dst.name}.{os.getpid()}.{uuid4().hex[:8]}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(cipher)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, dst)
+    return {"id": row_id, "ok": True, "old_path": str(src), "new_path": str(dst)}
+
+
+def swap_path(conn: sqlite3.Connection, row_id: int, old_path: str, new_path: str) -> bool:
+    """Point the row at the vault blob in its own short transaction.
+
+    The WHERE on the old path makes this a compare-and-swap: if the tenant
+    re-uploaded while we were encrypting, the row is left alone.
+    """
+    cur = conn.execute(
+        "UPDATE reference_contracts SET path=? WHERE id=? AND path=?",
+        (new_path, row_id, old_path),
+    )
+    conn.commit()
+    return cur.rowcount == 1
+
+
+def remove_leftover_originals(conn: sqlite3.Connection) -> int:
+    """Delete plaintext files whose row already points at the vault blob.
+
+    Covers a run that was stopped between the path swap and the unlink.
+    """
+    removed = 0
+    rows = conn.execute(
+        "SELECT path FROM reference_contracts WHERE path LIKE ?",
+        ("%" + VAULT_SUFFIX,),
+    ).fetchall()
+    for (path,) in rows:
+        original = Path(path[: -len(VAULT_SUFFIX)])
+        if original.exists():
+            original.unlink()
+            removed += 1
+    return removed
+
+
+def migrate(db_path: str, workers: int, batch_size: int, dry_run: bool = False) -> dict:
+    conn = connect(db_path)
+    stats = {"migrated": 0, "skipped": 0, "missing": 0, "failed": 0, "leftovers_removed": 0}
+
+    if not dry_run:
+        stats["leftovers_removed"] = remove_leftover_originals(conn)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for batch in iter_plaintext_rows(conn, batch_size):
+            if dry_run:
+                for row_id, token, path in batch:
+                    print(f"would migrate #{row_id} {token}: {path}")
+                stats["skipped"] += len(batch)
+                continue
+
+            futures = {pool.submit(encrypt_file, row_id, path): (row_id, token) for row_id, token, path in batch}
+            for fut in as_completed(futures):
+                row_id, token = futures[fut]
+                try:
+                    res = fut.result()
+                except Exception as e:
+                    res = {"id": row_id, "ok": False, "error": f"{type(e).__name__}: {e}"}
+
+                if not res["ok"] and res["error"] == "missing file":
+                    # Replaced by a re-upload meanwhile, or removed by hand; retrying cannot help.
+                    stats["missing"] += 1
+                    print(f"missing #{row_id} {token}: no file, row left as is", file=sys.stderr)
+                    continue
+                if not res["ok"]:
+                    stats["failed"] += 1
+                    print(f"failed #{row_id} {token}: {res['error']}", file=sys.stderr)
+                    continue
+
+                if swap_path(conn, row_id, res["old_path"], res["new_path"]):
+                    try:
+                        os.remove(res["old_path"])
+                    except FileNotFoundError:
+                        pass
+                    stats["migrated"] += 1
+                else:
+                    # Row changed under us; drop the blob we just wrote.
+                    try:
+                        os.remove(res["new_path"])
+                    except FileNotFoundError:
+                        pass
+                    stats["skipped"] += 1
+
+    conn.close()
+    return stats
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=os.environ.get("DB_PATH", "rental_app.db"))
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--batch", type=int, default=100, help="rows per SELECT page")
+    parser.add_argument("--dry-run", action="store_true", help="list rows without touching them")
+    args = parser.parse_args(argv)
+
+    if not args.dry_run and not (os.environ.get("FERNET_KEY") or os.environ.get("STREAMLIT_FERNET_KEY")):
+        print("FERNET_KEY (or STREAMLIT_FERNET_KEY) must be set.", file=sys.stderr)
+        return 2
+
+    t0 = time.perf_counter()
+    stats = migrate(args.db, args.workers, args.batch, args.dry_run)
+    elapsed = time.perf_counter() - t0
+    print(
+        f"migrated={stats['migrated']} skipped={stats['skipped']} missing={stats['missing']} failed={stats['failed']} "
+        f"leftovers_removed={stats['leftovers_removed']} in {elapsed:.1f}s"
+    )
+    return 1 if stats["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+"""Standalone entry point for the public landlord reference portal.
+
+    streamlit run portal_app.py --server.port 8502
+
+Landlords only ever open `?ref=` links. This script serves that one page and
+imports only the core's reference helpers (rentright.references), the rate
+limiter and the translation catalog. It does not load
+the dashboards, SMTP, the outbox or password hashing. Point APP_BASE_URL at a
+deployment of this script to serve landlord traffic from lean processes.
+app_professional.py still answers `?ref=` links itself, with the same page
+(render_portal).
+
+Each run records its import time (script start to main) and first-paint time
+(script start to the end of the render). The first run of a process is
+printed to stderr.
+"""
+import time
+_STARTED = time.perf_counter()
+
+import os
+import sys
+
+import streamlit as st
+
+from bootstrap import StartupTimer
+from rentright import Config, open_db, references
+from rentright.db import ensure_schema
+from utils_i18n import GREEK_LANG, translate
+from utils_ratelimit import client_address, get_rate_limiter, throttle_key, trusted_proxy_count
+
+
+def tr(s: str) -> str:
+    return translate(s, st.session_state.get("lang"))
+
+
+def render_portal(conn, config: Config, ref: str):
+    st.title(tr('🏠 RentRight — Landlord Reference Portal'))
+    token = references.resolve_reference_link(config, ref)
+    if not token:
+        # Rejected before any database access
+        st.error(tr('Invalid or expired reference token.'))
+        return
+    data = references.get_reference_request(conn, token)
+    if not data:
+        st.error(tr('Invalid or expired reference token.'))
+        return
+
+    if data["status"] == "completed":
+        st.success(tr('This reference has already been submitted. Thank you!'))
+        return
+
+    st.info(f"Reference for Tenant ID #{data['tenant_id']} — sent to {data['landlord_email']}")
+    with st.form("reference_form"):
+        confirm = st.checkbox(tr('I confirm I was the landlord for this tenant.'))
+        score = st.slider(tr('Overall tenant score'), min_value=1, max_value=10, value=8)
+        paid_on_time = st.radio(tr('Did the tenant pay on time?'), ["Yes","No"], horizontal=True)
+        utilities_unpaid = st.radio(tr('Did the tenant leave utilities unpaid?'), ["No","Yes"], horizontal=True)
+        good_condition = st.radio(tr('Did the tenant leave the apartment in good condition?'), ["Yes","No"], horizontal=True)
+        comments = st.text_area(tr('Optional comments'))
+        submit = st.form_submit_button(tr('Submit Reference'))
+
+    if submit:
+        if not confirm:
+            st.error(tr('Please confirm you were the landlord.'))
+            return
+        references.submit_reference(
+            conn,
+            token,
+            confirm_landlord=True,
+            score=int(score),
+            paid_on_time=(paid_on_time == "Yes"),
+            utilities_unpaid=(utilities_unpaid == "Yes"),
+            good_condition=(good_condition == "Yes"),
+            comments=comments,
+        )
+        st.success("Reference submitted successfully. Thank you!")
+
+
+# ---------- Process-wide state ----------
+@st.cache_resource(show_spinner=False)
+def portal_config() -> Config:
+    try:
+        secrets = dict(st.secrets)
+    except Exception:
+        secrets = {}
+    if os.environ.get("DB_PATH"):
+        secrets["DB_PATH"] = os.environ["DB_PATH"]
+    return Config.from_secrets(secrets)
+
+
+@st.cache_resource(show_spinner=False)
+def portal_conn():
+    conn = open_db(portal_config())
+    ensure_schema(conn)  # no-op once the main app has created the tables
+    return conn
+
+
+@st.cache_resource(show_spinner=False)
+def portal_timer() -> StartupTimer:
+    return StartupTimer()
+
+
+def client_ip() -> str | None:
+    ctx = getattr(st, "context", None)
+    if ctx is None:
+        return None
+    return client_address(getattr(ctx, "headers", None) or {}, getattr(ctx, "ip_address", None),
+                          trusted_proxy_count(portal_config().secrets))
+
+
+def main():
+    st.set_page_config(page_title="RentRight", page_icon="🏠", layout="centered")
+    lang = st.selectbox("🌐 Language", ["🇬🇧", "🇬🇷"], key="lang_flag", label_visibility="collapsed")
+    st.session_state["lang"] = GREEK_LANG if lang == "🇬🇷" else "English"
+
+    config = portal_config()
+    allowed, retry = get_rate_limiter(config.secrets).hit(*throttle_key("portal", client_ip()))
+    if not allowed:
+        st.error(f"{tr('Too many requests. Please try again in')} {int(retry) + 1} {tr('seconds.')}")
+        return
+    ref = st.query_params.get("ref")
+    if not ref:
+        st.title(tr('🏠 RentRight — Landlord Reference Portal'))
+        st.info(tr('Open the reference link from your email to continue.'))
+        return
+    render_portal(portal_conn(), config, ref)
+
+
+if __name__ == "__main__":
+    _imported = time.perf_counter()
+    try:
+        main()
+    finally:
+        timer = portal_timer()
+        first = timer.first_run_ms is None
+        timer.record_rerun(_imported - _STARTED, time.perf_counter() - _STARTED)
+        if first:
+            print(f"portal: imports {(_imported - _STARTED) * 1000:.1f} ms, "
+                  f"first paint {timer.first_run_ms:.1f} ms", file=sys.stderr)
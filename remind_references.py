@@ -0,0 +1,151 @@
+"""Send one reminder digest per landlord for stale pending reference requests.
+
+Finds `reference_requests` still pending after --older-than days, groups them
+by landlord_email and queues a single digest email per landlord (through the
+outbox, so email_worker.py delivers it). Every reminded token is recorded in
+`reference_reminders` in the same transaction and is skipped until the
+--cooldown has passed.
+
+Run it from cron, or keep it running with --every:
+
+    python remind_references.py --db rental_app.db --older-than 3 --cooldown 7
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+from itertools import groupby
+
+from rentright import Config, open_db
+from rentright.config import MissingSecretKey, signing_key
+from rentright.db import ensure_schema
+from utils_email import load_secrets
+from utils_tokens import reference_link
+from utils_outbox import ensure_outbox_table, enqueue_email
+from utils_templates import render
+
+
+def ensure_reminder_schema(conn: sqlite3.Connection):
+    cur = conn.cursor()
+    # Serves the "pending and older than N days" scan without touching other rows.
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_reference_requests_status_created "
+        "ON reference_requests(status, created_at)"
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS reference_reminders (
+            token TEXT PRIMARY KEY,
+            landlord_email TEXT NOT NULL,
+            last_reminded_at TEXT NOT NULL,
+            reminder_count INTEGER NOT NULL DEFAULT 1,
+            FOREIGN KEY (token) REFERENCES reference_requests(token) ON DELETE CASCADE
+        )
+        """
+    )
+    conn.commit()
+
+
+def find_stale_requests(conn: sqlite3.Connection, older_than_days: float, cooldown_days: float):
+    """Pending requests older than the threshold and not reminded within the cooldown, by landlord."""
+    now = datetime.utcnow()
+    cur = conn.cursor()
+    cur.execute(
+        """
+        SELECT rr.landlord_email, rr.token, rr.created_at, u.name, u.email
+          FROM reference_requests rr
+          JOIN users u ON u.id = rr.tenant_id
+          LEFT JOIN reference_reminders rm ON rm.token = rr.token
+         WHERE rr.status = 'pending'
+           AND rr.created_at < ?
+           AND (rm.last_reminded_at IS NULL OR rm.last_reminded_at < ?)
+         ORDER BY LOWER(rr.landlord_email), rr.created_at
+        """,
+        (
+            (now - timedelta(days=older_than_days)).isoformat(),
+            (now - timedelta(days=cooldown_days)).isoformat(),
+        ),
+    )
+    return cur.fetchall()
+
+
+def queue_digests(conn: sqlite3.Connection, base_url: str, older_than_days: float, cooldown_days: float,
+                  lang: str = "en", dry_run: bool = False, secret_key: str | None = None) -> dict:
+    """Links are signed with `secret_key`, which must be the app's SECRET_KEY."""
+    secret_key = secret_key or signing_key()
+    rows = find_stale_requests(conn, older_than_days, cooldown_days)
+    stats = {"landlords": 0, "requests": 0}
+    now = datetime.utcnow().isoformat()
+
+    for landlord_key, group in groupby(rows, key=lambda r: r[0].strip().lower()):
+        group = list(group)
+        items = [
+            {
+                "tenant_name": name,
+                "tenant_email": email,
+                "requested_on": created_at[:10],
+                "link": reference_link(base_url, token, secret_key),
+            }
+            for _, token, created_at, name, email in group
+        ]
+        stats["landlords"] += 1
+        stats["requests"] += len(items)
+        if dry_run:
+            print(f"would remind {group[0][0]} about {len(items)} request(s)")
+            continue
+
+        subject, body, html = render("reference_digest", lang, count=len(items), items=items)
+        cur = conn.cursor()
+        # Digest and reminder bookkeeping commit together, so a crash can't double-remind.
+        enqueue_email(cur, "reference_digest", f"{landlord_key}:{now[:10]}", group[0][0], subject, body, html)
+        cur.executemany(
+            """
+            INSERT INTO reference_reminders(token, landlord_email, last_reminded_at, reminder_count)
+            VALUES (?,?,?,1)
+            ON CONFLICT(token) DO UPDATE SET last_reminded_at=excluded.last_reminded_at,
+                                             reminder_count=reminder_count+1
+            """,
+            [(token, landlord_email, now) for landlord_email, token, _, _, _ in group],
+        )
+        conn.commit()
+    return stats
+
+
+def main(argv=None) -> int:
+    secrets = load_secrets()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=os.environ.get("DB_PATH", "rental_app.db"))
+    parser.add_argument("--older-than", type=float, default=3, help="days a request must be pending")
+    parser.add_argument("--cooldown", type=float, default=7, help="days before the same request is reminded again")
+    parser.add_argument("--base-url", default=os.environ.get("APP_BASE_URL") or secrets.get("APP_BASE_URL", ""))
+    parser.add_argument("--lang", default="en", help="digest language (en or el)")
+    parser.add_argument("--every", type=float, default=0, help="repeat every N hours instead of running once")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args(argv)
+
+    try:
+        config = Config.from_secrets(secrets, db_path=args.db)
+    except MissingSecretKey as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    conn = open_db(config)
+    ensure_schema(conn)
+    ensure_outbox_table(conn)
+    ensure_reminder_schema(conn)
+
+    while True:
+        stats = queue_digests(conn, args.base_url, args.older_than, args.cooldown, args.lang, args.dry_run,
+                              secret_key=config.secret_key)
+        print(f"{datetime.utcnow().isoformat()} digests={stats['landlords']} requests={stats['requests']}")
+        if not args.every:
+            break
+        time.sleep(args.every * 3600)
+    conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,27 @@
+"""Streamlit-free core of RentRight.
+
+The data helpers behind every entry point: the Streamlit app, the reference
+portal, background workers and benchmarks. Nothing here reads st.secrets or
+st.session_state. Each function takes the SQLite connection as its first
+argument, plus a Config where it needs paths, link signing or the base URL,
+and the UI language where it renders an email.
+
+    from rentright import Config, open_db
+    from rentright import references
+
+    config = Config.from_secrets(load_secrets())
+    conn = open_db(config)
+    references.count_reference_requests_global(conn)
+
+Modules:
+    config      Config, open_db and signing_key
+    db          connect and the core schema
+    users       accounts
+    tenants     tenant profile, previous landlords, future-landlord contacts
+    references  reference requests: lookups, status rules, landlord answers
+    contracts   uploaded tenancy contracts
+    outreach    creating requests and invitations with their emails queued
+"""
+from .config import Config, open_db
+
+__all__ = ["Config", "open_db"]
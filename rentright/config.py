@@ -0,0 +1,74 @@
+"""Explicit configuration, built once by each entry point and passed in."""
+import os
+import sqlite3
+from dataclasses import dataclass, field, replace
+from datetime import date
+from pathlib import Path
+
+from utils_tokens import REFERENCE_LINK_MAX_AGE, legacy_tokens_until, link_max_age
+
+from .db import connect
+
+
+class MissingSecretKey(RuntimeError):
+    pass
+
+
+def signing_key(secrets: dict | None = None) -> str:
+    """SECRET_KEY from the environment or secrets. Raises MissingSecretKey when neither has one.
+
+    Emailed links and sessions are signed with it, and the app, portal_app.py,
+    api_app.py and the workers must all verify each other's signatures, so
+    there is no per-process fallback.
+    """
+    key = os.environ.get("SECRET_KEY") or (secrets or {}).get("SECRET_KEY")
+    if not key:
+        raise MissingSecretKey(
+            "SECRET_KEY is not set. Set it in the environment or .streamlit/secrets.toml, with the same value "
+            "for the app, portal_app.py, api_app.py and the workers."
+        )
+    return str(key)
+
+
+@dataclass(frozen=True)
+class Config:
+    db_path: str = "rental_app.db"
+    upload_dir: Path = Path("uploads") / "contracts"
+    app_base_url: str = ""
+    # Filled from SECRET_KEY by from_secrets; links refuse to sign or verify with an empty key.
+    secret_key: str = ""
+    link_max_age: int = REFERENCE_LINK_MAX_AGE
+    max_upload_bytes: int = 15 * 1024 * 1024
+    # Bare 32-hex refs from before link signing are accepted through this day; None turns them off.
+    legacy_links_until: date | None = None
+    # Raw secrets for the parts that read their own sections (rate limits, email pacing).
+    secrets: dict = field(default_factory=dict, compare=False, hash=False, repr=False)
+
+    @classmethod
+    def from_secrets(cls, secrets: dict | None = None, **overrides) -> "Config":
+        """Config from a secrets mapping (st.secrets, or utils_email.load_secrets()); keywords win."""
+        sec = dict(secrets or {})
+        values = {
+            "db_path": sec.get("DB_PATH", cls.db_path),
+            "upload_dir": Path(sec.get("UPLOAD_DIR", cls.upload_dir)),
+            "app_base_url": sec.get("APP_BASE_URL", ""),
+            "secret_key": signing_key(sec),
+            "link_max_age": link_max_age(sec),
+            "legacy_links_until": legacy_tokens_until(sec),
+            "secrets": sec,
+        }
+        values.update(overrides)
+        return cls(**values)
+
+    def legacy_links_allowed(self, today: date | None = None) -> bool:
+        """Checked per link, so a long-running process stops accepting bare refs after the cutoff."""
+        return self.legacy_links_until is not None and (today or date.today()) <= self.legacy_links_until
+
+    def with_base_url(self, base_url: str | None) -> "Config":
+        """Same config with a different link base (e.g. the admin's per-session override)."""
+        return replace(self, app_base_url=base_url) if base_url else self
+
+
+def open_db(config: Config) -> sqlite3.Connection:
+    """WAL connection to config.db_path, shareable across threads (see rentright.db.connect)."""
+    return connect(config.db_path)
@@ -0,0 +1,251 @@
+"""Tenancy contracts uploaded against a reference request."""
+import os
+import re
+import sqlite3
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from uuid import uuid4
+
+from .config import Config
+from .references import get_reference_request, promote_reference_if_ready
+
+
+CONTRACT_FIELDS = [
+    "filename", "content_type", "path", "size_bytes", "uploaded_at", "status", "status_updated_at", "status_by",
+]
+ALLOWED_EXTENSIONS = {".pdf", ".png", ".jpg", ".jpeg", ".webp"}
+CONTRACT_STATUSES = {"pending", "verified", "rejected"}
+
+
+def safe_filename(name: str) -> str:
+    base = os.path.basename(name or "contract")
+    return re.sub(r"[^A-Za-z0-9._-]", "_", base)
+
+
+def get_contract(conn: sqlite3.Connection, token: str) -> dict | None:
+    row = conn.execute(
+        f"SELECT {', '.join(CONTRACT_FIELDS)} FROM reference_contracts WHERE token = ?", (token,)
+    ).fetchone()
+    return dict(zip(CONTRACT_FIELDS, row)) if row else None
+
+
+def read_contract_file(path: str) -> bytes:
+    """Read a stored contract, decrypting vault blobs (<filename>.bin)."""
+    with open(path, "rb") as f:
+        data = f.read()
+    if str(path).endswith(".bin"):
+        from utils_vault import decrypt_bytes
+        return decrypt_bytes(data)
+    return data
+
+
+def save_contract(conn: sqlite3.Connection, config: Config, token: str, tenant_id: int,
+                  filename: str, data: bytes, content_type: str | None = None) -> tuple[bool, str]:
+    """Store a tenant's contract for `token` under upload_dir/<token>/ and (re)set it to pending review."""
+    req = get_reference_request(conn, token)
+    if not req:
+        return False, "Reference request not found."
+    if req["tenant_id"] != tenant_id:
+        return False, "You cannot upload to a request that is not yours."
+
+    name = safe_filename(filename)
+    if Path(name).suffix.lower() not in ALLOWED_EXTENSIONS:
+        return False, "Only PDF, PNG, JPG, JPEG, or WEBP files are allowed."
+    size = len(data)
+    if size > config.max_upload_bytes:
+        return False, f"File too large (max {config.max_upload_bytes // (1024 * 1024)} MB)."
+
+    folder = Path(config.upload_dir) / token
+    folder.mkdir(parents=True, exist_ok=True)
+    # Unique on disk: a re-upload never overwrites a file a background job may still be reading.
+    path = folder / f"{uuid4().hex[:12]}_{name}"
+    with open(path, "wb") as f:
+        f.write(data)
+
+    now = datetime.utcnow().isoformat()
+    content_type = content_type or "application/octet-stream"
+    previous = get_contract(conn, token)
+    if previous:
+        conn.execute(
+            """
+            UPDATE reference_contracts
+               SET filename=?, content_type=?, path=?, size_bytes=?,
+                   uploaded_at=?, status='pending', status_updated_at=?, status_by=NULL
+             WHERE token=?
+            """,
+            (name, content_type, str(path), size, now, now, token),
+        )
+    else:
+        conn.execute(
+            """
+            INSERT INTO reference_contracts(token, tenant_id, filename, content_type, path, size_bytes,
+                                            status, status_updated_at, status_by, uploaded_at)
+            VALUES (?,?,?,?,?,?, 'pending', ?, NULL, ?)
+            """,
+            (token, tenant_id, name, content_type, str(path), size, now, now),
+        )
+    queue_contract_jobs(conn.cursor(), token)
+    conn.commit()
+    if previous and previous["path"]:
+        try:
+            os.remove(previous["path"])
+        except FileNotFoundError:
+            pass
+    return True, "Uploaded."
+
+
+def set_contract_status(conn: sqlite3.Connection, token: str, status: str, by_email: str) -> tuple[bool, str]:
+    """Review a contract; verifying it promotes the reference if the landlord has already answered."""
+    status = (status or "").lower().strip()
+    if status not in CONTRACT_STATUSES:
+        return False, "Invalid status."
+    if not get_contract(conn, token):
+        return False, "No contract uploaded for this request."
+
+    conn.execute(
+        "UPDATE reference_contracts SET status=?, status_updated_at=?, status_by=? WHERE token=?",
+        (status, datetime.utcnow().isoformat(), by_email, token),
+    )
+    conn.commit()
+    if status == "verified":
+        promote_reference_if_ready(conn, token)
+    return True, "Status updated."
+
+
+def load_contract_plaintext(conn: sqlite3.Connection, token: str) -> bytes | None:
+    """Return decrypted contract bytes if landlord has consented."""
+    contract = get_contract(conn, token)
+    if not contract:
+        return None
+    row = conn.execute("SELECT consent_status FROM reference_contracts WHERE token=?", (token,)).fetchone()
+    if (row[0] if row else "locked") != "consented":
+        return None
+    try:
+        with open(contract["path"], "rb") as f:
+            cipher = f.read()
+        from utils_vault import decrypt_bytes
+        return decrypt_bytes(cipher)
+    except Exception:
+        return None
+
+
+# ---------- Background work (job_worker.py) ----------
+PREVIEW_NAME = "preview.png"
+PREVIEW_MAX_PX = 480
+
+
+def queue_contract_jobs(cur: sqlite3.Cursor, token: str):
+    """Encrypt and preview a fresh upload off the request path. Does NOT commit."""
+    from utils_jobs import enqueue_job
+    enqueue_job(cur, "contracts.encrypt", {"token": token}, priority=10)
+    enqueue_job(cur, "contracts.preview", {"token": token}, priority=5)
+
+
+def _preview_paths(folder: Path) -> list[Path]:
+    return [folder / PREVIEW_NAME, folder / (PREVIEW_NAME + ".bin")]
+
+
+def make_contract_preview(conn: sqlite3.Connection, token: str, max_px: int = PREVIEW_MAX_PX) -> Path | None:
+    """Write a PNG thumbnail of an image contract next to it; None for PDFs or without Pillow.
+
+    The preview is encrypted (preview.png.bin) whenever FERNET_KEY is set.
+    """
+    contract = get_contract(conn, token)
+    if not contract or not contract["path"]:
+        return None
+    folder = Path(contract["path"]).parent
+    for stale in _preview_paths(folder):
+        # A replaced upload must not keep the old file's preview
+        if stale.exists():
+            stale.unlink()
+    if not (contract["content_type"] or "").startswith("image/"):
+        return None
+    try:
+        from PIL import Image
+    except ImportError:  # optional: no previews without Pillow
+        return None
+    import io
+
+    with Image.open(io.BytesIO(read_contract_file(contract["path"]))) as img:
+        img.thumbnail((max_px, max_px))
+        buf = io.BytesIO()
+        img.convert("RGB").save(buf, "PNG", optimize=True)
+    data = buf.getvalue()
+    try:
+        from utils_vault import encrypt_bytes
+        data, path = encrypt_bytes(data), folder / (PREVIEW_NAME + ".bin")
+    except RuntimeError:  # no FERNET_KEY: same as the contract itself
+        path = folder / PREVIEW_NAME
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+    return path
+
+
+def read_contract_preview(config: Config, token: str) -> bytes | None:
+    """PNG bytes of the preview made by make_contract_preview, if there is one."""
+    for path in _preview_paths(Path(config.upload_dir) / token):
+        if path.exists():
+            try:
+                return read_contract_file(str(path))
+            except Exception:
+                return None
+    return None
+
+
+def cleanup_old_contracts(conn: sqlite3.Connection, days_rejected: int = 30, days_cancelled: int = 90) -> int:
+    """Delete the files of rejected contracts, and of contracts on cancelled requests, past retention.
+
+    The row stays with path='' so the request keeps its contract status.
+    Returns the number of contracts whose files were removed.
+    """
+    now = datetime.utcnow()
+    rows = conn.execute(
+        """
+        SELECT rc.token, rc.path FROM reference_contracts rc
+          JOIN reference_requests rr ON rr.token = rc.token
+         WHERE rc.path != ''
+           AND ((rc.status = 'rejected' AND COALESCE(rc.status_updated_at, rc.uploaded_at) < ?)
+                OR (rr.status = 'cancelled' AND rc.uploaded_at < ?))
+        """,
+        ((now - timedelta(days=days_rejected)).isoformat(), (now - timedelta(days=days_cancelled)).isoformat()),
+    ).fetchall()
+    for token, path in rows:
+        folder = Path(path).parent
+        for p in [Path(path), *_preview_paths(folder)]:
+            try:
+                p.unlink()
+            except FileNotFoundError:
+                pass
+        conn.execute("UPDATE reference_contracts SET path='' WHERE token=? AND path=?", (token, path))
+    conn.commit()
+    return len(rows)
+
+
+def scrub_uploads(conn: sqlite3.Connection, config: Config, grace_seconds: float = 3600) -> int:
+    """Delete upload files no contract row points at (replaced uploads, deleted requests).
+
+    Files younger than `grace_seconds` are left alone: an upload writes its
+    file just before it commits the row. Returns the number of files removed.
+    """
+    root = Path(config.upload_dir)
+    if not root.is_dir():
+        return 0
+    keep = {Path(p).resolve() for (p,) in conn.execute("SELECT path FROM reference_contracts WHERE path != ''")}
+    live = {token for (token,) in conn.execute("SELECT token FROM reference_contracts WHERE path != ''")}
+    cutoff = time.time() - grace_seconds
+    removed = 0
+    for folder in root.iterdir():
+        if not folder.is_dir():
+            continue
+        for f in folder.iterdir():
+            if not f.is_file() or f.resolve() in keep or f.stat().st_mtime > cutoff:
+                continue
+            if folder.name in live and f.name in (PREVIEW_NAME, PREVIEW_NAME + ".bin"):
+                continue
+            f.unlink()
+            removed += 1
+        if not any(folder.iterdir()):
+            folder.rmdir()
+    return removed
@@ -0,0 +1,109 @@
+"""SQLite connection and core schema, shared by the app, the portal, the API and the workers."""
+import sqlite3
+
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        email TEXT UNIQUE NOT NULL,
+        name TEXT NOT NULL,
+        password_hash TEXT NOT NULL,
+        role TEXT CHECK(role IN ("tenant","landlord","admin")) NOT NULL,
+        created_at TEXT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS tenant_profiles (
+        tenant_id INTEGER UNIQUE NOT NULL,
+        future_landlord_email TEXT,
+        updated_at TEXT NOT NULL,
+        FOREIGN KEY (tenant_id) REFERENCES users(id) ON DELETE CASCADE
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS previous_landlords (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        tenant_id INTEGER NOT NULL,
+        email TEXT NOT NULL,
+        afm TEXT NOT NULL,
+        name TEXT NOT NULL,
+        address TEXT NOT NULL,
+        created_at TEXT NOT NULL,
+        FOREIGN KEY (tenant_id) REFERENCES users(id) ON DELETE CASCADE
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS reference_requests (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        token TEXT UNIQUE NOT NULL,
+        tenant_id INTEGER NOT NULL,
+        prev_landlord_id INTEGER NOT NULL,
+        landlord_email TEXT NOT NULL,
+        created_at TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'pending',
+        filled_at TEXT,
+        confirm_landlord INTEGER,
+        score INTEGER,
+        paid_on_time INTEGER,
+        utilities_unpaid INTEGER,
+        good_condition INTEGER,
+        comments TEXT,
+        FOREIGN KEY (tenant_id) REFERENCES users(id) ON DELETE CASCADE,
+        FOREIGN KEY (prev_landlord_id) REFERENCES previous_landlords(id) ON DELETE CASCADE
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS reference_contracts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        token TEXT UNIQUE NOT NULL,
+        tenant_id INTEGER NOT NULL,
+        filename TEXT NOT NULL,
+        content_type TEXT NOT NULL,
+        path TEXT NOT NULL,
+        size_bytes INTEGER NOT NULL,
+        status TEXT NOT NULL DEFAULT 'pending' CHECK(status IN ('pending','verified','rejected')),
+        status_updated_at TEXT,
+        status_by TEXT,
+        uploaded_at TEXT NOT NULL,
+        FOREIGN KEY (tenant_id) REFERENCES users(id) ON DELETE CASCADE,
+        FOREIGN KEY (token) REFERENCES reference_requests(token) ON DELETE CASCADE
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS future_landlord_contacts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        tenant_id INTEGER NOT NULL,
+        email TEXT NOT NULL,
+        created_at TEXT NOT NULL,
+        invited INTEGER NOT NULL DEFAULT 0,
+        invited_at TEXT,
+        UNIQUE(tenant_id, email),
+        FOREIGN KEY (tenant_id) REFERENCES users(id) ON DELETE CASCADE
+    )
+    """,
+]
+
+
+def connect(db_path: str) -> sqlite3.Connection:
+    """Shared app connection: usable from Streamlit's threads, WAL, waits on locks."""
+    conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL;")
+    conn.execute("PRAGMA busy_timeout=5000;")  # wait up to 5s if locked
+    return conn
+
+
+def ensure_schema(conn: sqlite3.Connection):
+    cur = conn.cursor()
+    for ddl in SCHEMA:
+        cur.execute(ddl)
+    conn.commit()
+
+
+def ensure_consent_column(conn: sqlite3.Connection):
+    cur = conn.cursor()
+    cur.execute("PRAGMA table_info(reference_contracts)")
+    cols = [r[1] for r in cur.fetchall()]
+    if "consent_status" not in cols:
+        cur.execute("ALTER TABLE reference_contracts ADD COLUMN consent_status TEXT NOT NULL DEFAULT 'locked'")
+        conn.commit()
@@ -0,0 +1,177 @@
+"""Reference requests and invitations, with their emails queued in the same transaction.
+
+email_worker.py delivers what is queued here. `lang` is the sender's UI
+language and only selects the email template.
+"""
+import sqlite3
+from datetime import datetime
+
+from utils_outbox import (
+    claim_idempotency_key, claim_refs, enqueue_email, enqueue_emails, get_scheduler, release,
+    release_idempotency_key, send_claimed,
+)
+from utils_templates import render as render_email
+
+from .config import Config
+from .references import build_reference_link, generate_token
+
+
+def reference_request_email(lang: str | None, tenant_name: str, tenant_email: str, link: str) -> tuple[str, str, str]:
+    """(subject, text, html) for a reference request."""
+    return render_email(
+        "reference_request", lang,
+        tenant_name=tenant_name, tenant_email=tenant_email, link=link,
+    )
+
+
+def _claim_request_key(cur: sqlite3.Cursor, tenant_id: int, prev_landlord_id: int, landlord_email: str,
+                       token: str) -> tuple[bool, str | None]:
+    """Idempotency key for one landlord; a key whose request was cancelled (or deleted) does not block a new one."""
+    key = f"{prev_landlord_id}:{landlord_email}"
+    first, existing = claim_idempotency_key(cur, "reference_request", tenant_id, key, ref=token)
+    if first:
+        return True, token
+    row = cur.execute("SELECT status FROM reference_requests WHERE token = ?", (existing,)).fetchone()
+    if row and row[0] != "cancelled":
+        return False, existing
+    release_idempotency_key(cur, "reference_request", tenant_id, key)
+    return claim_idempotency_key(cur, "reference_request", tenant_id, key, ref=token)
+
+
+def create_reference_request(conn: sqlite3.Connection, config: Config, tenant_id: int, prev_landlord_id: int,
+                             landlord_email: str, tenant_name: str | None = None, tenant_email: str | None = None,
+                             lang: str | None = None) -> dict:
+    """Create a request; with tenant_name/tenant_email the landlord email is queued in the same transaction.
+
+    Repeats for the same landlord within the idempotency window return the
+    existing token instead of creating (and emailing) a new one.
+    """
+    token = generate_token()
+    cur = conn.cursor()
+    first, existing = _claim_request_key(cur, tenant_id, prev_landlord_id, landlord_email, token)
+    if not first:
+        conn.commit()
+        return {"token": existing, "duplicate": True}
+    cur.execute(
+        "INSERT INTO reference_requests(token, tenant_id, prev_landlord_id, landlord_email, created_at, status) VALUES (?,?,?,?,?,?)",
+        (token, tenant_id, prev_landlord_id, landlord_email, datetime.utcnow().isoformat(), 'pending'),
+    )
+    if tenant_name:
+        subject, body, html = reference_request_email(lang, tenant_name, tenant_email, build_reference_link(config, token))
+        enqueue_email(cur, "reference_request", token, landlord_email, subject, body, html)
+    conn.commit()
+    return {"token": token}
+
+
+def request_references_from_all(conn: sqlite3.Connection, config: Config, tenant_id: int, tenant_name: str,
+                                tenant_email: str, lang: str | None = None, smtp: dict | None = None,
+                                max_workers: int = 8) -> dict:
+    """Create a reference request for every previous landlord without one pending, and email them all.
+
+    Requests and their outbox rows are inserted with one executemany each in a
+    single transaction. With `smtp` settings, what the per-domain limits allow
+    is then sent concurrently on a bounded pool; everything else stays queued
+    for email_worker.py.
+    """
+    cur = conn.cursor()
+    cur.execute(
+        """
+        SELECT pl.id, pl.email FROM previous_landlords pl
+         WHERE pl.tenant_id = ?
+           AND NOT EXISTS (
+               SELECT 1 FROM reference_requests rr
+                WHERE rr.prev_landlord_id = pl.id AND rr.tenant_id = pl.tenant_id AND rr.status = 'pending'
+           )
+         ORDER BY pl.id
+        """,
+        (tenant_id,),
+    )
+    landlords = cur.fetchall()
+    if not landlords:
+        conn.commit()
+        return {"created": 0, "sent": 0, "failed": 0, "queued": 0, "errors": {}}
+    # Keyed by the landlord set: a double click is dropped, a retry after adding a landlord is not.
+    first, _ = claim_idempotency_key(cur, "reference_fanout", tenant_id, ",".join(str(pid) for pid, _ in landlords))
+    if not first:
+        conn.commit()
+        return {"created": 0, "sent": 0, "failed": 0, "queued": 0, "errors": {}, "duplicate": True}
+
+    now = datetime.utcnow().isoformat()
+    rows = []
+    for pid, email in landlords:
+        # Same key as create_reference_request, so a single request and the fan-out never both send.
+        token = generate_token()
+        first, _ = _claim_request_key(cur, tenant_id, pid, email, token)
+        if first:
+            rows.append((token, tenant_id, pid, email, now, 'pending'))
+    if not rows:
+        conn.commit()
+        return {"created": 0, "sent": 0, "failed": 0, "queued": 0, "errors": {}}
+    cur.executemany(
+        "INSERT INTO reference_requests(token, tenant_id, prev_landlord_id, landlord_email, created_at, status) VALUES (?,?,?,?,?,?)",
+        rows,
+    )
+    messages = []
+    for token, _, _, email, _, _ in rows:
+        subject, body, html = reference_request_email(lang, tenant_name, tenant_email, build_reference_link(config, token))
+        messages.append((token, email, subject, body, html))
+    enqueue_emails(cur, "reference_request", messages)
+    conn.commit()
+
+    if not smtp:
+        return {"created": len(rows), "sent": 0, "failed": 0, "queued": len(rows), "errors": {}}
+
+    # Send what the per-domain limits allow right now; the rest stays queued for email_worker.py.
+    scheduler = get_scheduler(config.secrets)
+    claimed = claim_refs(conn, "reference_request", [r[0] for r in rows])
+    allowed, held = scheduler.admit(claimed)
+    for row in held:
+        release(conn, row)
+    summary = send_claimed(conn, allowed, smtp, max_workers=max_workers, scheduler=scheduler)
+    summary["created"] = len(rows)
+    # Held back by the rate limits, rescheduled after a transient error, or deferred by an open breaker:
+    # all still queued for email_worker.py.
+    summary["queued"] = len(held) + summary["retried"] + summary["deferred"]
+    return summary
+
+
+def email_reference_request(conn: sqlite3.Connection, tenant_id: int, tenant_name: str, tenant_email: str,
+                            landlord_email: str, link: str, token: str | None = None,
+                            lang: str | None = None) -> tuple[bool, str]:
+    """Queue the reference email; email_worker.py delivers it. Raises ValueError without a tenant id."""
+    if not tenant_id:
+        # The idempotency key is per tenant; a shared 0 would let one tenant's send suppress another's.
+        raise ValueError("email_reference_request needs the tenant's id")
+    subject, body, html = reference_request_email(lang, tenant_name, tenant_email, link)
+    cur = conn.cursor()
+    first, _ = claim_idempotency_key(cur, "reference_request_email", tenant_id, f"{token or link}:{landlord_email}")
+    if not first:
+        conn.commit()
+        return True, "duplicate"
+    enqueue_email(cur, "reference_request", token, landlord_email, subject, body, html)
+    conn.commit()
+    return True, "queued"
+
+
+def invite_future_landlord(conn: sqlite3.Connection, config: Config, tenant_id: int, email: str,
+                           tenant_name: str, tenant_email: str, lang: str | None = None) -> tuple[bool, str]:
+    """Mark the contact invited and queue the invitation, once per idempotency window."""
+    subject, body, html = render_email(
+        "invite", lang,
+        tenant_name=tenant_name, tenant_email=tenant_email, join_link=config.app_base_url or "",
+    )
+    cur = conn.cursor()
+    # Before the idempotency check: a contact removed and re-added within the window is still marked invited.
+    cur.execute(
+        "UPDATE future_landlord_contacts SET invited = 1, invited_at = ? "
+        "WHERE tenant_id = ? AND LOWER(email) = LOWER(?)",
+        (datetime.utcnow().isoformat(), tenant_id, email),
+    )
+    first, _ = claim_idempotency_key(cur, "invite", tenant_id, email)
+    if not first:
+        # Rerun or double click: already invited within the window.
+        conn.commit()
+        return True, "duplicate"
+    enqueue_email(cur, "invite", f"{tenant_id}:{email.strip().lower()}", email, subject, body, html)
+    conn.commit()
+    return True, "queued"
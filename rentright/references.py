@@ -0,0 +1,221 @@
+"""Reference requests: lookups, status rules, landlord answers and links."""
+import sqlite3
+from datetime import datetime
+from uuid import uuid4
+
+from utils_tokens import reference_link, unsign_reference_token
+
+from .config import Config
+
+
+REQUEST_FIELDS = [
+    "id", "token", "tenant_id", "prev_landlord_id", "landlord_email", "created_at", "status", "filled_at",
+    "confirm_landlord", "score", "paid_on_time", "utilities_unpaid", "good_condition", "comments",
+]
+
+# Same rule as effective_reference_status(), in SQL, so a status view needs one query.
+EFFECTIVE_STATUS_SQL = (
+    "CASE WHEN rr.status = 'cancelled' THEN 'cancelled' "
+    "WHEN rc.token IS NOT NULL AND rc.status != 'verified' THEN 'pending' "
+    "ELSE COALESCE(rr.status, 'pending') END"
+)
+
+
+def generate_token() -> str:
+    return uuid4().hex
+
+
+# ---------- Links ----------
+def build_reference_link(config: Config, token: str) -> str:
+    """Link with a signed, expiring ref; relative "?ref=..." when no base URL is configured."""
+    return reference_link(config.app_base_url, token, config.secret_key)
+
+
+def resolve_reference_link(config: Config, ref: str | None) -> str | None:
+    """Signature and age check only; None for forged, expired or (unless enabled) unsigned links."""
+    return unsign_reference_token(ref, config.secret_key, config.link_max_age, config.legacy_links_allowed())
+
+
+# ---------- Lookups ----------
+def get_reference_request(conn: sqlite3.Connection, token: str) -> dict | None:
+    row = conn.execute(
+        f"SELECT {', '.join(REQUEST_FIELDS)} FROM reference_requests WHERE token = ?", (token,)
+    ).fetchone()
+    return dict(zip(REQUEST_FIELDS, row)) if row else None
+
+
+def _contract_status(conn: sqlite3.Connection, token: str) -> str | None:
+    row = conn.execute("SELECT status FROM reference_contracts WHERE token = ?", (token,)).fetchone()
+    return row[0] if row else None
+
+
+def list_reference_requests_global(conn: sqlite3.Connection, status: str | None = None):
+    """List reference requests across all users. If status is given, filter by it."""
+    if status:
+        return conn.execute(
+            "SELECT token, tenant_id, landlord_email, created_at, status, score "
+            "FROM reference_requests WHERE status=? ORDER BY id DESC",
+            (status,),
+        ).fetchall()
+    return conn.execute(
+        "SELECT token, tenant_id, landlord_email, created_at, status, score "
+        "FROM reference_requests ORDER BY id DESC"
+    ).fetchall()
+
+
+def count_reference_requests_global(conn: sqlite3.Connection) -> dict:
+    """Counts per effective status across all tenants."""
+    rows = conn.execute(
+        f"SELECT {EFFECTIVE_STATUS_SQL} AS eff, COUNT(*) FROM reference_requests rr "
+        "LEFT JOIN reference_contracts rc ON rc.token = rr.token GROUP BY eff"
+    ).fetchall()
+    counts = {"pending": 0, "completed": 0, "cancelled": 0}
+    counts.update(dict(rows))
+    return counts
+
+
+def list_reference_requests_global_effective(conn: sqlite3.Connection, status: str):
+    """Requests whose effective status is `status`; rows as in list_reference_requests_global."""
+    return conn.execute(
+        "SELECT rr.token, rr.tenant_id, rr.landlord_email, rr.created_at, rr.status, rr.score "
+        "FROM reference_requests rr LEFT JOIN reference_contracts rc ON rc.token = rr.token "
+        f"WHERE {EFFECTIVE_STATUS_SQL} = ? ORDER BY rr.id DESC",
+        (status,),
+    ).fetchall()
+
+
+def list_reference_table_global(conn: sqlite3.Connection, status: str):
+    """Flat rows for the admin table view: one query, tenant and contract joined in."""
+    return conn.execute(
+        "SELECT rr.token, u.name, u.email, rr.landlord_email, rr.created_at, "
+        f"{EFFECTIVE_STATUS_SQL}, rr.score, rc.status "
+        "FROM reference_requests rr "
+        "LEFT JOIN reference_contracts rc ON rc.token = rr.token "
+        "LEFT JOIN users u ON u.id = rr.tenant_id "
+        f"WHERE {EFFECTIVE_STATUS_SQL} = ? ORDER BY rr.id DESC",
+        (status,),
+    ).fetchall()
+
+
+def list_reference_requests_for_tenant(conn: sqlite3.Connection, tenant_id: int):
+    return conn.execute(
+        """
+        SELECT rr.id, rr.token, rr.landlord_email, rr.created_at, rr.status, rr.score
+        FROM reference_requests rr
+        WHERE rr.tenant_id = ?
+        ORDER BY rr.id DESC
+        """,
+        (tenant_id,),
+    ).fetchall()
+
+
+def list_reference_requests_for_prev_landlord(conn: sqlite3.Connection, prev_landlord_id: int):
+    return conn.execute(
+        "SELECT token, status, created_at, score FROM reference_requests WHERE prev_landlord_id=? ORDER BY id DESC",
+        (prev_landlord_id,),
+    ).fetchall()
+
+
+def list_reference_requests_for_landlord(conn: sqlite3.Connection, landlord_email: str, status: str | None = None):
+    if status:
+        return conn.execute(
+            "SELECT token, tenant_id, created_at, status, score FROM reference_requests WHERE landlord_email = ? AND status = ? ORDER BY id DESC",
+            (landlord_email, status),
+        ).fetchall()
+    return conn.execute(
+        "SELECT token, tenant_id, created_at, status, score FROM reference_requests WHERE landlord_email = ? ORDER BY id DESC",
+        (landlord_email,),
+    ).fetchall()
+
+
+def count_reference_requests_for_landlord(conn: sqlite3.Connection, landlord_email: str) -> dict:
+    rows = conn.execute(
+        "SELECT status, COUNT(*) FROM reference_requests WHERE landlord_email = ? GROUP BY status",
+        (landlord_email,),
+    ).fetchall()
+    counts = {"pending": 0, "completed": 0, "cancelled": 0}
+    counts.update(dict(rows))
+    counts["all"] = sum(counts.values())
+    return counts
+
+
+def list_reference_table_for_landlord(conn: sqlite3.Connection, landlord_email: str, status: str | None = None):
+    """Flat rows for the landlord table view, tenant name joined in."""
+    sql = (
+        "SELECT rr.token, u.name, rr.created_at, rr.status, rr.score FROM reference_requests rr "
+        "LEFT JOIN users u ON u.id = rr.tenant_id WHERE rr.landlord_email = ?"
+    )
+    args = [landlord_email]
+    if status:
+        sql += " AND rr.status = ?"
+        args.append(status)
+    return conn.execute(sql + " ORDER BY rr.id DESC", args).fetchall()
+
+
+# ---------- Status rules ----------
+def effective_reference_status(conn: sqlite3.Connection, raw_status: str | None, token: str) -> str:
+    """
+    Returns the 'effective' status for showing in UI:
+      - 'cancelled' stays cancelled.
+      - If a contract exists but is not VERIFIED, treat the reference as 'pending'.
+      - Otherwise return the raw status, defaulting to 'pending' when None.
+    """
+    if raw_status == "cancelled":
+        return "cancelled"
+    contract_status = _contract_status(conn, token)
+    if contract_status is not None and contract_status != "verified":
+        return "pending"
+    return raw_status or "pending"
+
+
+def promote_reference_if_ready(conn: sqlite3.Connection, token: str) -> bool:
+    """
+    Promote a reference to 'completed' IFF:
+      - the reference exists,
+      - it's not already completed,
+      - the contract for this token is VERIFIED,
+      - and the landlord already submitted the reference (confirm_landlord=1).
+    Returns True if a promotion happened.
+    """
+    details = get_reference_request(conn, token)
+    if not details or details["status"] == "completed":
+        return False
+    if _contract_status(conn, token) != "verified":
+        return False
+    # Make sure the form was actually submitted by the landlord.
+    if not details.get("confirm_landlord"):
+        return False
+
+    conn.execute("UPDATE reference_requests SET status='completed' WHERE token=?", (token,))
+    conn.commit()
+    return True
+
+
+def submit_reference(conn: sqlite3.Connection, token: str, confirm_landlord: bool, score: int,
+                     paid_on_time: bool, utilities_unpaid: bool, good_condition: bool, comments: str | None):
+    """Store the landlord's answers. Completion is gated on a verified contract."""
+    new_status = "completed" if _contract_status(conn, token) == "verified" else "pending"
+    conn.execute(
+        """
+        UPDATE reference_requests
+        SET status=?, filled_at=?, confirm_landlord=?, score=?, paid_on_time=?, utilities_unpaid=?, good_condition=?, comments=?
+        WHERE token=?
+        """,
+        (
+            new_status,
+            datetime.utcnow().isoformat(),
+            1 if confirm_landlord else 0,
+            score,
+            1 if paid_on_time else 0,
+            1 if utilities_unpaid else 0,
+            1 if good_condition else 0,
+            comments.strip() if comments else None,
+            token,
+        ),
+    )
+    conn.commit()
+
+
+def cancel_reference_request(conn: sqlite3.Connection, token: str):
+    conn.execute("UPDATE reference_requests SET status='cancelled' WHERE token=? AND status='pending'", (token,))
+    conn.commit()
@@ -0,0 +1,153 @@
+"""Tenant profile, previous landlords and future-landlord contacts."""
+import re
+import sqlite3
+from datetime import datetime
+
+
+EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+
+# ---------- Profile ----------
+def load_tenant_profile(conn: sqlite3.Connection, tenant_id: int) -> dict | None:
+    row = conn.execute(
+        "SELECT future_landlord_email, updated_at FROM tenant_profiles WHERE tenant_id = ?", (tenant_id,)
+    ).fetchone()
+    return {"future_landlord_email": row[0], "updated_at": row[1]} if row else None
+
+
+def upsert_tenant_profile(conn: sqlite3.Connection, tenant_id: int, future_landlord_email: str | None):
+    now = datetime.utcnow().isoformat()
+    email = future_landlord_email.strip() if future_landlord_email else None
+    if load_tenant_profile(conn, tenant_id):
+        conn.execute(
+            "UPDATE tenant_profiles SET future_landlord_email = ?, updated_at = ? WHERE tenant_id = ?",
+            (email, now, tenant_id),
+        )
+    else:
+        conn.execute(
+            "INSERT INTO tenant_profiles(tenant_id, future_landlord_email, updated_at) VALUES (?,?,?)",
+            (tenant_id, email, now),
+        )
+    conn.commit()
+
+
+# ---------- Previous landlords ----------
+def add_previous_landlord(conn: sqlite3.Connection, tenant_id: int, email: str, afm: str, name: str, address: str):
+    conn.execute(
+        "INSERT INTO previous_landlords(tenant_id, email, afm, name, address, created_at) VALUES (?,?,?,?,?,?)",
+        (tenant_id, email.strip(), afm.strip(), name.strip(), address.strip(), datetime.utcnow().isoformat()),
+    )
+    conn.commit()
+
+
+def list_previous_landlords(conn: sqlite3.Connection, tenant_id: int):
+    return conn.execute(
+        "SELECT id, email, afm, name, address, created_at FROM previous_landlords WHERE tenant_id = ? ORDER BY id DESC",
+        (tenant_id,),
+    ).fetchall()
+
+
+def delete_previous_landlord(conn: sqlite3.Connection, entry_id: int, tenant_id: int):
+    conn.execute("DELETE FROM previous_landlords WHERE id = ? AND tenant_id = ?", (entry_id, tenant_id))
+    conn.commit()
+
+
+def list_latest_references_for_tenant(conn: sqlite3.Connection, tenant_id: int):
+    """Each previous landlord with its latest reference request, if any, and the answers."""
+    return conn.execute(
+        """
+        SELECT pl.id AS prev_id,
+               pl.name AS prev_name,
+               pl.email AS prev_email,
+               pl.afm AS prev_afm,
+               pl.address AS prev_address,
+               rr.token,
+               rr.status,
+               rr.score,
+               rr.paid_on_time,
+               rr.utilities_unpaid,
+               rr.good_condition,
+               rr.comments,
+               rr.created_at,
+               rr.filled_at
+        FROM previous_landlords pl
+        LEFT JOIN reference_requests rr
+          ON rr.prev_landlord_id = pl.id
+         AND rr.tenant_id = pl.tenant_id
+         AND rr.id = (
+              SELECT MAX(id) FROM reference_requests
+               WHERE prev_landlord_id = pl.id AND tenant_id = pl.tenant_id
+           )
+        WHERE pl.tenant_id = ?
+        ORDER BY pl.id DESC
+        """,
+        (tenant_id,),
+    ).fetchall()
+
+
+def get_latest_reference_for_pair(conn: sqlite3.Connection, tenant_id: int, prev_landlord_id: int) -> dict | None:
+    row = conn.execute(
+        """
+        SELECT token, status, created_at
+        FROM reference_requests
+        WHERE tenant_id=? AND prev_landlord_id=?
+        ORDER BY id DESC
+        LIMIT 1
+        """,
+        (tenant_id, prev_landlord_id),
+    ).fetchone()
+    return {"token": row[0], "status": row[1], "created_at": row[2]} if row else None
+
+
+# ---------- Future-landlord contacts ----------
+def add_future_landlord_contact(conn: sqlite3.Connection, tenant_id: int, email: str):
+    email = (email or "").strip().lower()
+    if not EMAIL_RE.match(email):
+        raise ValueError("Invalid email")
+    conn.execute(
+        "INSERT OR IGNORE INTO future_landlord_contacts(tenant_id, email, created_at) VALUES (?,?,?)",
+        (tenant_id, email, datetime.utcnow().isoformat()),
+    )
+    conn.commit()
+
+
+def list_future_landlord_contacts(conn: sqlite3.Connection, tenant_id: int):
+    return conn.execute(
+        "SELECT id, email, created_at, invited, invited_at FROM future_landlord_contacts WHERE tenant_id = ? ORDER BY id DESC",
+        (tenant_id,),
+    ).fetchall()
+
+
+def get_future_landlord_contact(conn: sqlite3.Connection, contact_id: int, tenant_id: int) -> dict | None:
+    row = conn.execute(
+        "SELECT id, email, created_at, invited, invited_at FROM future_landlord_contacts WHERE id = ? AND tenant_id = ?",
+        (contact_id, tenant_id),
+    ).fetchone()
+    return dict(zip(["id", "email", "created_at", "invited", "invited_at"], row)) if row else None
+
+
+def remove_future_landlord_contact(conn: sqlite3.Connection, contact_id: int, tenant_id: int):
+    conn.execute("DELETE FROM future_landlord_contacts WHERE id = ? AND tenant_id = ?", (contact_id, tenant_id))
+    conn.commit()
+
+
+def list_prospective_tenants(conn: sqlite3.Connection, landlord_email: str):
+    """Unique tenants who listed this landlord (single field or multi list)."""
+    return conn.execute(
+        """
+        SELECT u.id, u.name, u.email, MAX(src.updated_at) AS last_update
+        FROM (
+            SELECT tp.tenant_id AS tenant_id, tp.updated_at AS updated_at
+            FROM tenant_profiles tp
+            WHERE LOWER(tp.future_landlord_email) = LOWER(?)
+            UNION ALL
+            SELECT flc.tenant_id AS tenant_id, COALESCE(flc.invited_at, flc.created_at) AS updated_at
+            FROM future_landlord_contacts flc
+            WHERE LOWER(flc.email) = LOWER(?)
+        ) src
+        JOIN users u ON u.id = src.tenant_id
+        GROUP BY u.id, u.name, u.email
+        ORDER BY last_update DESC
+        """,
+        (landlord_email, landlord_email),
+    ).fetchall()
@@ -0,0 +1,31 @@
+"""User accounts."""
+import sqlite3
+from datetime import datetime
+
+from utils_auth import hash_password_bounded
+
+
+def create_user(conn: sqlite3.Connection, email: str, name: str, password: str, role: str):
+    """Insert a user; the password is hashed on the bounded pool (may raise utils_auth.AuthBusy)."""
+    conn.execute(
+        "INSERT INTO users(email, name, password_hash, role, created_at) VALUES (?,?,?,?,?)",
+        (email.lower().strip(), name.strip(), hash_password_bounded(password), role, datetime.utcnow().isoformat()),
+    )
+    conn.commit()
+
+
+def get_user_by_email(conn: sqlite3.Connection, email: str) -> dict | None:
+    row = conn.execute(
+        "SELECT id, email, name, password_hash, role FROM users WHERE email = ?", (email.lower().strip(),)
+    ).fetchone()
+    return dict(zip(["id", "email", "name", "password_hash", "role"], row)) if row else None
+
+
+def get_user_by_id(conn: sqlite3.Connection, uid: int) -> dict | None:
+    row = conn.execute("SELECT id, email, name, role FROM users WHERE id = ?", (uid,)).fetchone()
+    return dict(zip(["id", "email", "name", "role"], row)) if row else None
+
+
+def update_password_hash(conn: sqlite3.Connection, user_id: int, password_hash: str):
+    conn.execute("UPDATE users SET password_hash = ? WHERE id = ?", (password_hash, user_id))
+    conn.commit()
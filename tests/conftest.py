@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The repo is a flat set of modules; make them importable when pytest runs from anywhere.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,63 @@
+import asyncio
+import json
+
+import pytest
+
+import api_app
+import utils_ratelimit
+from rentright.db import ensure_consent_column, ensure_schema
+from rentright import Config, open_db, outreach, references, users
+from utils_outbox import ensure_outbox_table
+
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    monkeypatch.setattr(utils_ratelimit, "_limiter", None)
+    config = Config(db_path=str(tmp_path / "t.db"), upload_dir=tmp_path / "up", secret_key="k",
+                    secrets={"RATE_LIMITS": {"portal_anonymous": {"limit": 3, "window": 60}}})
+    conn = open_db(config)
+    ensure_schema(conn)
+    ensure_consent_column(conn)
+    ensure_outbox_table(conn)
+    users.create_user(conn, "t@example.com", "T", "pw123456", "tenant")
+    conn.execute("INSERT INTO previous_landlords(tenant_id, email, afm, name, address, created_at) "
+                 "VALUES (1, 'l@example.com', '123456789', 'L', 'A', 'now')")
+    conn.commit()
+    token = outreach.create_reference_request(conn, config, 1, 1, "l@example.com")["token"]
+    conn.close()
+    app = api_app.ReferenceAPI(config)
+    yield app, config, token
+    asyncio.run(app.shutdown())
+
+
+def call(app, method, path, body=b"", client=("1.2.3.4", 1)):
+    out = {}
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            out["status"] = message["status"]
+        else:
+            out["body"] = json.loads(message["body"])
+
+    scope = {"type": "http", "method": method, "path": path, "headers": [], "query_string": b"", "client": client}
+    asyncio.run(app(scope, receive, send))
+    return out["status"], out["body"]
+
+
+def test_reference_form_and_submit(api):
+    app, config, token = api
+    ref = references.build_reference_link(config, token).split("ref=", 1)[1]
+    status, body = call(app, "GET", f"/api/references/{ref}")
+    assert status == 200 and body["status"] == "pending"
+    assert call(app, "POST", f"/api/references/{ref}", b'{"score": 11}')[0] == 422
+    assert call(app, "POST", f"/api/references/{ref}", b'{"score": 9, "confirm_landlord": true}')[0] == 200
+    assert call(app, "GET", "/api/references/garbage")[0] == 404
+
+
+def test_new_refs_do_not_escape_the_anonymous_bucket(api):
+    app, _, _ = api
+    statuses = [call(app, "GET", f"/api/references/garbage{i}", client=None)[0] for i in range(4)]
+    assert statuses == [404, 404, 404, 429]
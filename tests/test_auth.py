@@ -0,0 +1,57 @@
+import pytest
+
+import utils_auth
+from utils_auth import LoginThrottle, hash_password, legacy_hash, needs_rehash, verify_password
+from utils_ratelimit import DEFAULT_LIMITS, MemoryStore, RateLimiter
+
+# Cheap cost for the tests; the default n=2**14 takes tens of milliseconds per hash.
+FAST = {"n": 2 ** 4, "r": 8, "p": 1}
+
+
+@pytest.fixture
+def cost(monkeypatch):
+    monkeypatch.setattr(utils_auth, "SCRYPT_N", FAST["n"])
+    monkeypatch.setattr(utils_auth, "SCRYPT_R", FAST["r"])
+    monkeypatch.setattr(utils_auth, "SCRYPT_P", FAST["p"])
+
+
+def test_scrypt_hash_verifies_and_is_salted(cost):
+    stored = hash_password("s3cret")
+    assert stored.startswith(f"scrypt${FAST['n']}$8$1$")
+    assert stored != hash_password("s3cret")
+    assert verify_password("s3cret", stored) == (True, False)
+    assert verify_password("wrong", stored) == (False, False)
+    assert verify_password("s3cret", "scrypt$x$8$1$salt$hash") == (False, False)
+
+
+def test_legacy_hash_verifies_and_asks_for_a_rehash(cost):
+    assert verify_password("s3cret", legacy_hash("s3cret")) == (True, True)
+    assert verify_password("wrong", legacy_hash("s3cret")) == (False, False)
+
+
+def test_needs_rehash_checks_each_parameter(cost):
+    assert not needs_rehash(hash_password("pw"))
+    # Larger n but smaller r: a tuple comparison would call this current.
+    assert needs_rehash(hash_password("pw", n=FAST["n"] * 2, r=4))
+    assert needs_rehash(hash_password("pw", n=FAST["n"] // 2))
+    assert not needs_rehash(hash_password("pw", n=FAST["n"] * 2, p=2))
+    assert needs_rehash("scrypt$16$eight$1$salt$hash")
+    assert needs_rehash(legacy_hash("pw"))
+
+
+def test_raised_cost_upgrades_on_login(cost, monkeypatch):
+    stored = hash_password("pw")
+    monkeypatch.setattr(utils_auth, "SCRYPT_P", 2)
+    assert verify_password("pw", stored) == (True, True)
+
+
+def test_login_throttle_locks_the_account_and_clears_on_success():
+    throttle = LoginThrottle(RateLimiter(MemoryStore(), DEFAULT_LIMITS))
+    for _ in range(DEFAULT_LIMITS["login_account"]["limit"]):
+        assert throttle.retry_after("A@Example.com ", "1.2.3.4") == 0
+        throttle.record_failure("A@Example.com ", "1.2.3.4")
+    assert throttle.retry_after("a@example.com") > 0
+    assert throttle.retry_after("b@example.com", "1.2.3.4") == 0
+
+    throttle.record_success("a@example.com")
+    assert throttle.retry_after("a@example.com") == 0
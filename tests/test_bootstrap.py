@@ -0,0 +1,45 @@
+import sqlite3
+
+import pytest
+
+import utils_auth
+from bootstrap import ADMIN_EMAIL, run_bootstrap
+from rentright.config import MissingSecretKey
+
+
+@pytest.fixture
+def auth_settings(monkeypatch):
+    """run_bootstrap reconfigures utils_auth; put its globals back afterwards."""
+    for name in ("SCRYPT_N", "SCRYPT_R", "SCRYPT_P", "HASH_WORKERS", "MAX_PENDING", "_executor", "_slots"):
+        monkeypatch.setattr(utils_auth, name, getattr(utils_auth, name))
+    monkeypatch.delenv("SECRET_KEY", raising=False)
+    monkeypatch.setattr(utils_auth, "SCRYPT_N", 2 ** 4)
+
+
+def test_bootstrap_creates_tables_dirs_and_admin(tmp_path, auth_settings):
+    conn = sqlite3.connect(":memory:")
+    upload_dir = tmp_path / "uploads" / "contracts"
+    snapshot = run_bootstrap(conn, [upload_dir], {"SECRET_KEY": "k"})
+
+    assert snapshot == {"secrets": {"SECRET_KEY": "k"}}
+    assert upload_dir.is_dir()
+    tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    assert {"users", "reference_requests", "email_outbox", "jobs", "session_revocations"} <= tables
+    assert conn.execute("SELECT role FROM users WHERE email=?", (ADMIN_EMAIL,)).fetchone() == ("admin",)
+
+    run_bootstrap(conn, [upload_dir], {"SECRET_KEY": "k"})  # idempotent
+    assert conn.execute("SELECT COUNT(*) FROM users").fetchone() == (1,)
+
+
+def test_bootstrap_applies_known_auth_settings_and_logs_the_rest(tmp_path, auth_settings, capsys):
+    conn = sqlite3.connect(":memory:")
+    run_bootstrap(conn, [], {"SECRET_KEY": "k", "AUTH": {"SCRYPT_N": 32, "WORKERS": 3, "pepper": "x"}})
+
+    assert (utils_auth.SCRYPT_N, utils_auth.HASH_WORKERS) == (32, 3)
+    assert "ignoring unknown AUTH settings: pepper" in capsys.readouterr().err
+
+
+def test_bootstrap_refuses_to_start_without_a_secret_key(tmp_path, auth_settings):
+    with pytest.raises(MissingSecretKey):
+        run_bootstrap(sqlite3.connect(":memory:"), [tmp_path / "never"], {})
+    assert not (tmp_path / "never").exists()
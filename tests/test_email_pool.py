@@ -0,0 +1,101 @@
+import smtplib
+
+import pytest
+
+import utils_email
+from utils_email import SMTPPool
+
+
+class FakeSMTP:
+    instances = []
+
+    def __init__(self, host, port, timeout=None):
+        self.closed = False
+        self.resets = 0
+        FakeSMTP.instances.append(self)
+
+    def starttls(self):
+        pass
+
+    def login(self, user, pwd):
+        if pwd == "bad":
+            raise smtplib.SMTPAuthenticationError(535, b"nope")
+
+    def sendmail(self, from_email, to_addrs, msg):
+        raise smtplib.SMTPRecipientsRefused({to_addrs[0]: (550, b"no such user")})
+
+    def rset(self):
+        self.resets += 1
+
+    def noop(self):
+        return (250, b"ok")
+
+    def quit(self):
+        self.closed = True
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture(autouse=True)
+def fake_smtp(monkeypatch):
+    FakeSMTP.instances = []
+    monkeypatch.setattr(utils_email.smtplib, "SMTP", FakeSMTP)
+
+
+def test_refused_recipient_keeps_the_session():
+    pool = SMTPPool("h", 25, "u", "p")
+    for _ in range(2):
+        with pytest.raises(smtplib.SMTPRecipientsRefused):
+            pool.sendmail("a@x", ["b@y"], "msg")
+    assert len(FakeSMTP.instances) == 1
+    assert FakeSMTP.instances[0].resets == 2
+    assert pool.stats["discarded"] == 0
+
+
+def test_failed_login_closes_the_socket():
+    pool = SMTPPool("h", 25, "u", "bad")
+    with pytest.raises(smtplib.SMTPAuthenticationError):
+        pool.sendmail("a@x", ["b@y"], "msg")
+    assert FakeSMTP.instances[0].closed
+
+
+def test_send_email_smtp_reports_errors_instead_of_raising():
+    smtp = {"host": "h", "port": 25, "user": "u", "pwd": "p", "from_email": "a@x", "use_tls": False}
+    try:
+        ok, msg = utils_email.send_email_smtp(smtp, "b@y", "s", "b")
+    finally:
+        utils_email.close_all_pools()
+    assert not ok and msg.startswith("SMTPRecipientsRefused")
+    assert utils_email.send_email_smtp({}, "b@y", "s", "b")[0] is False
+
+
+def test_async_session_closes_the_socket_on_failed_login():
+    from utils_email_async import AsyncSMTPSender
+
+    sender = AsyncSMTPSender("h", 25, "u", "bad", use_tls=False, backend="thread").start()
+    try:
+        ok, msg = sender.send("b@y", "s", "b")
+    finally:
+        sender.close()
+    assert not ok and msg.startswith("SMTPAuthenticationError")
+    assert FakeSMTP.instances[0].closed
+
+
+def test_outbox_delivers_through_the_async_engine_when_configured(monkeypatch):
+    import utils_email_async
+    from utils_outbox import deliver
+
+    # smtplib sessions on the engine's loop, so the fake server is used
+    monkeypatch.setattr(utils_email_async, "aiosmtplib", None)
+
+    smtp = {"host": "h", "port": 25, "user": "u", "pwd": "p", "from_email": "a@x", "use_tls": False,
+            "backend": "async"}
+    row = {"to_email": "b@y", "subject": "s", "body": "b"}
+    try:
+        outcome, msg = deliver(row, smtp)
+    finally:
+        utils_email_async.close_all_senders()
+    # The fake server refuses the recipient with a 550: permanent, as on the pooled path.
+    assert outcome == "dead" and msg.startswith("SMTPRecipientsRefused")
+    assert not utils_email._pools
@@ -0,0 +1,53 @@
+import sqlite3
+
+from utils_jobs import claim_jobs, complete_job, enqueue_job, ensure_jobs_table, extend_leases, fail_job
+
+
+def make_conn():
+    conn = sqlite3.connect(":memory:")
+    ensure_jobs_table(conn)
+    return conn
+
+
+def test_stale_worker_cannot_touch_a_reclaimed_job():
+    conn = make_conn()
+    enqueue_job(conn.cursor(), "k")
+    conn.commit()
+    (stale,) = claim_jobs(conn, "a", 1)
+    conn.execute("UPDATE jobs SET lease_until='2000-01-01'")
+    conn.commit()
+    (fresh,) = claim_jobs(conn, "b", 1)
+    assert fresh["id"] == stale["id"]
+
+    assert extend_leases(conn, [stale]) == 0
+    assert fail_job(conn, stale, "boom") is None
+    assert not complete_job(conn, stale)
+    assert conn.execute("SELECT status, claimed_by FROM jobs").fetchone() == ("running", fresh["claimed_by"])
+
+    assert extend_leases(conn, [fresh]) == 1
+    assert complete_job(conn, fresh)
+
+
+def test_claim_order_and_dedupe():
+    conn = make_conn()
+    cur = conn.cursor()
+    enqueue_job(cur, "low", priority=0)
+    enqueue_job(cur, "high", priority=10)
+    assert enqueue_job(cur, "once", dedupe_key="x")
+    assert enqueue_job(cur, "once", dedupe_key="x") is None
+    conn.commit()
+    assert [j["kind"] for j in claim_jobs(conn, "w", 3)] == ["high", "low", "once"]
+
+
+def test_email_drain_is_scheduled_only_when_enabled():
+    import job_worker
+    from rentright import Config
+
+    conn = make_conn()
+    job_worker.schedule_periodic(conn, periodic=job_worker.periodic_jobs(Config()))
+    kinds = {k for (k,) in conn.execute("SELECT kind FROM jobs")}
+    assert kinds == set(job_worker.PERIODIC) and set(kinds) <= set(job_worker.HANDLERS)
+
+    config = Config(secrets={"JOB_WORKER_SENDS_EMAIL": "true"})
+    assert job_worker.schedule_periodic(conn, periodic=job_worker.periodic_jobs(config)) == 1
+    assert conn.execute("SELECT COUNT(*) FROM jobs WHERE kind='email.drain'").fetchone() == (1,)
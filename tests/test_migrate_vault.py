@@ -0,0 +1,35 @@
+import sqlite3
+
+from cryptography.fernet import Fernet
+
+import migrate_vault
+
+
+def test_missing_files_are_reported_not_failed(tmp_path, monkeypatch):
+    monkeypatch.setenv("FERNET_KEY", Fernet.generate_key().decode())
+    present = tmp_path / "c.pdf"
+    present.write_bytes(b"%PDF-1")
+    db = str(tmp_path / "t.db")
+    conn = sqlite3.connect(db)
+    conn.execute("CREATE TABLE reference_contracts(id INTEGER PRIMARY KEY, token TEXT, path TEXT)")
+    conn.executemany("INSERT INTO reference_contracts(token, path) VALUES (?,?)",
+                     [("a", str(present)), ("b", str(tmp_path / "gone.pdf"))])
+    conn.commit()
+    conn.close()
+
+    stats = migrate_vault.migrate(db, workers=1, batch_size=10)
+    assert (stats["migrated"], stats["missing"], stats["failed"]) == (1, 1, 0)
+    assert not present.exists()
+    assert migrate_vault.migrate(db, workers=1, batch_size=10)["failed"] == 0
+
+
+def test_undecryptable_fernet_blob_is_failed_not_wrapped_again(tmp_path, monkeypatch):
+    monkeypatch.setenv("FERNET_KEY", Fernet.generate_key().decode())
+    blob = Fernet(Fernet.generate_key()).encrypt(b"%PDF-1")  # another key
+    path = tmp_path / "c.pdf"
+    path.write_bytes(blob)
+
+    result = migrate_vault.encrypt_file(1, str(path))
+    assert not result["ok"] and "does not decrypt" in result["error"]
+    assert path.read_bytes() == blob
+    assert not (tmp_path / "c.pdf.bin").exists()
@@ -0,0 +1,99 @@
+import sqlite3
+from datetime import datetime, timedelta
+
+from utils_outbox import (
+    DomainScheduler, claim_batch, claim_idempotency_key, email_domain, enqueue_email, ensure_outbox_table, mark_sent, queue_depth,
+    record_failure, send_claimed,
+)
+
+
+def _outbox():
+    conn = sqlite3.connect(":memory:")
+    ensure_outbox_table(conn)
+    return conn
+
+
+def test_transient_failures_are_reported_as_retries_not_failures():
+    conn = sqlite3.connect(":memory:")
+    ensure_outbox_table(conn)
+    enqueue_email(conn.cursor(), "reference_request", "tok", "l@example.com", "s", "b")
+    conn.commit()
+    # No SMTP host configured: a transient error, so the row stays queued for the worker.
+    summary = send_claimed(conn, claim_batch(conn, 10), {"host": "", "port": 587, "from_email": ""})
+    assert summary["failed"] == 0 and summary["errors"] == {}
+    assert summary["retried"] == 1 and "tok" in summary["retries"]
+    assert conn.execute("SELECT status FROM email_outbox").fetchone() == ("queued",)
+
+
+def test_idempotency_window_slides_from_the_first_call():
+    conn = _outbox()
+    cur = conn.cursor()
+    assert claim_idempotency_key(cur, "invite", 1, "l@example.com", ref="a", window_seconds=60) == (True, "a")
+    # Age the key to just inside the window, in an earlier fixed bucket than "now".
+    earlier = datetime.utcnow() - timedelta(seconds=59)
+    cur.execute("UPDATE email_idempotency SET created_at=?, window_start=?",
+                (earlier.isoformat(), int(earlier.timestamp()) // 60 * 60 - 60))
+    assert claim_idempotency_key(cur, "invite", 1, "L@example.com", ref="b", window_seconds=60) == (False, "a")
+
+    cur.execute("UPDATE email_idempotency SET created_at=?", ((earlier - timedelta(seconds=2)).isoformat(),))
+    assert claim_idempotency_key(cur, "invite", 1, "l@example.com", ref="c", window_seconds=60) == (True, "c")
+
+
+def test_sql_and_python_agree_on_the_recipient_domain():
+    conn = _outbox()
+    for address in ['"a@b"@Example.COM', "x@y.org", "nodomain"]:
+        enqueue_email(conn.cursor(), "invite", address, address, "s", "b")
+    conn.commit()
+    assert set(queue_depth(conn)) == {email_domain(a) for a in ['"a@b"@Example.COM', "x@y.org", "nodomain"]}
+
+
+def test_stale_claim_cannot_mark_a_reclaimed_row():
+    conn = _outbox()
+    enqueue_email(conn.cursor(), "invite", "r", "l@example.com", "s", "b")
+    conn.commit()
+    (stale,) = claim_batch(conn, 10)
+    (fresh,) = claim_batch(conn, 10, lease_seconds=-1)  # stale's lease has run out
+    assert fresh["id"] == stale["id"] and fresh["attempts"] == 2
+
+    assert not mark_sent(conn, stale)
+    assert record_failure(conn, stale, "boom") is None
+    assert record_failure(conn, stale, "boom", permanent=True) is None
+    assert conn.execute("SELECT status, attempts FROM email_outbox").fetchone() == ("sending", 2)
+    assert conn.execute("SELECT COUNT(*) FROM email_dead_letter").fetchone() == (0,)
+    assert mark_sent(conn, fresh)
+
+
+def test_scheduler_claims_only_what_each_domain_bucket_allows(monkeypatch):
+    clock = [1_000.0]
+    monkeypatch.setattr("utils_ratelimit.time.monotonic", lambda: clock[0])
+    conn = _outbox()
+    cur = conn.cursor()
+    for i in range(7):
+        enqueue_email(cur, "invite", f"g{i}", f"u{i}@gmail.com", "s", "b")
+    for i in range(3):
+        enqueue_email(cur, "invite", f"e{i}", f"u{i}@example.org", "s", "b")
+    conn.commit()
+    scheduler = DomainScheduler({"global": {"rate": 10, "burst": 20}, "default": {"rate": 2, "burst": 5}})
+
+    rows = scheduler.claim(conn, 100)
+    assert sorted(email_domain(r["to_email"]) for r in rows) == ["example.org"] * 3 + ["gmail.com"] * 5
+    assert scheduler.claim(conn, 100) == []  # gmail is out of tokens; its two rows stay queued
+
+    clock[0] += 1.0  # 2 tokens/s
+    assert [email_domain(r["to_email"]) for r in scheduler.claim(conn, 100)] == ["gmail.com"] * 2
+
+
+def test_scheduler_respects_the_global_bucket_and_max_rows(monkeypatch):
+    monkeypatch.setattr("utils_ratelimit.time.monotonic", lambda: 1_000.0)
+    conn = _outbox()
+    cur = conn.cursor()
+    for domain in ("a.com", "b.com", "c.com"):
+        for i in range(3):
+            enqueue_email(cur, "invite", f"{domain}{i}", f"u{i}@{domain}", "s", "b")
+    conn.commit()
+    scheduler = DomainScheduler({"global": {"rate": 1, "burst": 4}, "default": {"rate": 5, "burst": 5}})
+
+    assert len(scheduler.claim(conn, 2)) == 2
+    assert len(scheduler.claim(conn, 100)) == 2  # the global burst of 4 is spent
+    assert scheduler.claim(conn, 100) == []
+    assert sum(queue_depth(conn).values()) == 5
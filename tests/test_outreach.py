@@ -0,0 +1,62 @@
+import pytest
+
+from rentright.db import ensure_consent_column, ensure_schema
+from rentright import Config, open_db, outreach
+from utils_outbox import ensure_outbox_table
+
+
+@pytest.fixture
+def db(tmp_path):
+    config = Config(db_path=str(tmp_path / "t.db"), upload_dir=tmp_path / "up", secret_key="k")
+    conn = open_db(config)
+    ensure_schema(conn)
+    ensure_consent_column(conn)
+    ensure_outbox_table(conn)
+    conn.execute("INSERT INTO users(email, name, password_hash, role, created_at) "
+                 "VALUES ('t@example.com', 'T', 'x', 'tenant', 'now')")
+    conn.commit()
+    yield config, conn
+    conn.close()
+
+
+def add_landlord(conn, email):
+    conn.execute("INSERT INTO previous_landlords(tenant_id, email, afm, name, address, created_at) "
+                 "VALUES (1, ?, '123456789', 'L', 'A', 'now')", (email,))
+    conn.commit()
+
+
+def test_repeat_request_returns_the_pending_one_but_not_a_cancelled_one(db):
+    config, conn = db
+    add_landlord(conn, "l@example.com")
+    first = outreach.create_reference_request(conn, config, 1, 1, "l@example.com", "T", "t@example.com")
+    assert outreach.create_reference_request(conn, config, 1, 1, "l@example.com") == {
+        "token": first["token"], "duplicate": True}
+
+    conn.execute("UPDATE reference_requests SET status='cancelled' WHERE token=?", (first["token"],))
+    conn.commit()
+    again = outreach.create_reference_request(conn, config, 1, 1, "l@example.com", "T", "t@example.com")
+    assert "duplicate" not in again and again["token"] != first["token"]
+
+
+def test_fanout_drops_double_clicks_but_not_new_landlords(db):
+    config, conn = db
+    add_landlord(conn, "a@example.com")
+    assert outreach.request_references_from_all(conn, config, 1, "T", "t@example.com")["created"] == 1
+    assert outreach.request_references_from_all(conn, config, 1, "T", "t@example.com")["created"] == 0
+
+    add_landlord(conn, "b@example.com")
+    assert outreach.request_references_from_all(conn, config, 1, "T", "t@example.com")["created"] == 1
+    assert conn.execute("SELECT COUNT(*) FROM email_outbox").fetchone() == (2,)
+
+
+def test_reference_email_is_keyed_per_tenant_and_needs_one(db):
+    _, conn = db
+    conn.execute("INSERT INTO users(email, name, password_hash, role, created_at) "
+                 "VALUES ('u@example.com', 'U', 'x', 'tenant', 'now')")
+    args = ("T", "t@example.com", "l@example.com", "https://x/?ref=abc", "abc")
+    assert outreach.email_reference_request(conn, 1, *args) == (True, "queued")
+    assert outreach.email_reference_request(conn, 1, *args) == (True, "duplicate")
+    assert outreach.email_reference_request(conn, 2, *args) == (True, "queued")
+    with pytest.raises(ValueError):
+        outreach.email_reference_request(conn, 0, *args)
+    assert conn.execute("SELECT COUNT(*) FROM email_outbox").fetchone() == (2,)
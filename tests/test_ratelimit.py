@@ -0,0 +1,60 @@
+from utils_ratelimit import DEFAULT_LIMITS, MemoryStore, RateLimiter, TokenBucket, client_address, throttle_key
+
+
+def test_short_window_hit_does_not_prune_longer_windows(monkeypatch):
+    clock = [1_000_000.0]
+    monkeypatch.setattr("utils_ratelimit.time.time", lambda: clock[0])
+    limiter = RateLimiter(MemoryStore(), DEFAULT_LIMITS)
+
+    for _ in range(DEFAULT_LIMITS["login_account"]["limit"]):
+        assert limiter.hit("login_account", "a@example.com")[0]
+    assert limiter.check("login_account", "a@example.com") > 0
+
+    # A portal hit (60 s window) well past the prune interval must not clear the 900 s lockout.
+    clock[0] += 200
+    limiter.hit("portal", "1.2.3.4")
+    assert limiter.check("login_account", "a@example.com") > 0
+
+
+def test_counters_expire_after_their_own_window(monkeypatch):
+    clock = [1_000_000.0]
+    monkeypatch.setattr("utils_ratelimit.time.time", lambda: clock[0])
+    store = MemoryStore()
+    limiter = RateLimiter(store, DEFAULT_LIMITS)
+    limiter.hit("portal", "1.2.3.4")
+    clock[0] += 3 * DEFAULT_LIMITS["portal"]["window"]
+    limiter.hit("upload", "user:1")
+    assert not any(k[0] == "portal" for k in store._counts)
+
+
+def test_rate_change_credits_accrued_tokens_at_the_old_rate(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr("utils_ratelimit.time.monotonic", lambda: clock[0])
+    bucket = TokenBucket(rate=1, burst=10)
+    assert bucket.try_acquire(10)
+
+    clock[0] += 2
+    bucket.set_rate(0.5)
+    assert bucket.available() == 2
+
+
+def test_forwarded_for_is_ignored_without_trusted_proxies():
+    headers = {"X-Forwarded-For": "6.6.6.6"}
+    assert client_address(headers, "9.9.9.9") == "9.9.9.9"
+    assert client_address({}, None) is None
+
+
+def test_spoofed_forwarded_hops_are_skipped_behind_a_proxy():
+    # The client sent "6.6.6.6"; the proxy appended the address it saw.
+    headers = {"X-Forwarded-For": "6.6.6.6, 1.2.3.4"}
+    assert client_address(headers, "10.0.0.1", trusted_proxies=1) == "1.2.3.4"
+    headers = {"X-Forwarded-For": "6.6.6.6, 1.2.3.4, 10.0.0.2"}
+    assert client_address(headers, "10.0.0.1", trusted_proxies=2) == "1.2.3.4"
+    assert client_address({}, "10.0.0.1", trusted_proxies=1) == "10.0.0.1"
+
+
+def test_clients_without_an_address_share_the_higher_anonymous_limit():
+    limiter = RateLimiter(MemoryStore(), DEFAULT_LIMITS)
+    for _ in range(DEFAULT_LIMITS["portal"]["limit"] + 1):
+        assert limiter.hit(*throttle_key("portal", None))[0]
+    assert throttle_key("portal", "1.2.3.4") == ("portal", "1.2.3.4")
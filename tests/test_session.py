@@ -0,0 +1,12 @@
+import pytest
+
+from rentright.config import MissingSecretKey, signing_key
+
+
+def test_signing_key_requires_secret_key(monkeypatch):
+    monkeypatch.delenv("SECRET_KEY", raising=False)
+    with pytest.raises(MissingSecretKey):
+        signing_key({})
+    assert signing_key({"SECRET_KEY": "k"}) == "k"
+    monkeypatch.setenv("SECRET_KEY", "env")
+    assert signing_key({"SECRET_KEY": "k"}) == "env"
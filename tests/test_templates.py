@@ -0,0 +1,42 @@
+import pytest
+
+from utils_templates import TEMPLATES, _parse, lang_code, render
+
+
+def test_every_template_parses_in_every_language():
+    for name, variants in TEMPLATES.items():
+        for lang in variants:
+            subject, text, html = render(name, lang, tenant_name="T", count=1, items=[])
+            assert subject and text and html, (name, lang)
+
+
+def test_variables_are_escaped_only_in_html():
+    subject, text, html = render("invite", "en", tenant_name="<b>Ann</b>", tenant_email="a@x", join_link="")
+    assert subject.startswith("<b>Ann</b>")
+    assert "<b>Ann</b>" in text
+    assert "&lt;b&gt;Ann&lt;/b&gt;" in html and "<b>Ann</b>" not in html
+
+
+def test_sections_skip_when_falsy_and_repeat_for_lists():
+    _, text, _ = render("invite", "en", tenant_name="T", tenant_email="t@x", join_link="")
+    assert "sign in" not in text
+    _, text, _ = render("invite", "en", tenant_name="T", tenant_email="t@x", join_link="https://app")
+    assert "https://app" in text
+
+    items = [{"tenant_name": n, "tenant_email": f"{n}@x", "requested_on": "2026-01-01", "link": f"https://r/{n}"}
+             for n in ("a", "b")]
+    _, text, _ = render("reference_digest", "en", count=2, items=items)
+    assert text.count("- ") == 2 and "https://r/a" in text and "https://r/b" in text
+
+
+def test_language_labels_codes_and_fallback():
+    assert lang_code("Ελληνικά") == "el" and lang_code("el") == "el"
+    assert lang_code("fr") == lang_code(None) == "en"
+    assert render("invite", "Ελληνικά", tenant_name="T")[0] != render("invite", "en", tenant_name="T")[0]
+
+
+def test_unbalanced_sections_are_rejected():
+    with pytest.raises(ValueError):
+        _parse("{#a}x{/b}")
+    with pytest.raises(ValueError):
+        _parse("{#a}x")
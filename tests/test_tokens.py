@@ -0,0 +1,39 @@
+from datetime import date, timedelta
+
+import pytest
+
+from rentright import Config, references
+from utils_tokens import legacy_tokens_allowed, sign_reference_token, unsign_reference_token
+
+TOKEN = "0123456789abcdef0123456789abcdef"
+
+
+def test_bare_token_rejected_by_default():
+    assert unsign_reference_token(TOKEN, "k") is None
+    assert unsign_reference_token(sign_reference_token(TOKEN, "k"), "k") == TOKEN
+
+
+def test_legacy_tokens_need_flag_and_end_date():
+    today = date(2026, 10, 1)
+    assert not legacy_tokens_allowed({}, today)
+    assert not legacy_tokens_allowed({"ALLOW_LEGACY_TOKENS": True}, today)
+    assert legacy_tokens_allowed({"ALLOW_LEGACY_TOKENS": True, "LEGACY_TOKENS_UNTIL": "2026-12-31"}, today)
+    assert not legacy_tokens_allowed({"ALLOW_LEGACY_TOKENS": True, "LEGACY_TOKENS_UNTIL": "2026-09-30"}, today)
+    assert unsign_reference_token(TOKEN, "k", allow_legacy=True) == TOKEN
+
+
+def test_legacy_cutoff_is_checked_on_every_link(monkeypatch):
+    monkeypatch.delenv("SECRET_KEY", raising=False)
+    config = Config.from_secrets({"SECRET_KEY": "k", "ALLOW_LEGACY_TOKENS": "true",
+                                  "LEGACY_TOKENS_UNTIL": date.today().isoformat()})
+    assert references.resolve_reference_link(config, TOKEN) == TOKEN
+    # The same long-lived config, a day later
+    assert config.legacy_links_allowed(date.today())
+    assert not config.legacy_links_allowed(date.today() + timedelta(days=1))
+
+
+def test_plain_config_needs_no_secret_key_until_it_signs(monkeypatch):
+    monkeypatch.delenv("SECRET_KEY", raising=False)
+    config = Config()
+    with pytest.raises(ValueError):
+        references.build_reference_link(config, TOKEN)
@@ -0,0 +1,206 @@
+"""Password hashing service and login throttling.
+
+Hashes are scrypt with a random per-user salt. Cost parameters travel with the
+hash, so they can be raised later without breaking existing accounts:
+
+    scrypt$<n>$<r>$<p>$<salt b64>$<hash b64>
+
+`verify_password` also accepts the legacy unsalted SHA-256 hex digests and
+reports them (and scrypt hashes with outdated parameters) as needing a rehash,
+so the app can upgrade them transparently on the next successful login.
+
+scrypt is deliberately expensive, so every hash/verify runs on a small
+process-wide executor. At most `workers` run at once and at most `max_pending`
+may wait; beyond that AuthBusy is raised instead of queueing more CPU work.
+LoginThrottle rejects attempts per account and per client IP *before* any
+hashing happens, so a login flood costs almost nothing.
+"""
+import base64
+import hashlib
+import hmac
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from utils_ratelimit import RateLimiter
+
+
+LEGACY_SALT = "static_salt_change_me"
+
+# Current cost; raise these and old hashes are upgraded at login.
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+SALT_BYTES = 16
+KEY_BYTES = 32
+
+HASH_WORKERS = 2
+MAX_PENDING = 16
+HASH_TIMEOUT_SECONDS = 10.0
+
+
+class AuthBusy(RuntimeError):
+    """Too many password hashes are already running or waiting."""
+
+
+# ---------- Hashing ----------
+def _b64(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _unb64(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int, dklen: int = KEY_BYTES) -> bytes:
+    # OpenSSL needs ~128*n*r bytes; leave headroom over its 32 MiB default.
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, dklen=dklen, maxmem=256 * n * r + 2 ** 20)
+
+
+def legacy_hash(password: str, salt: str = LEGACY_SALT) -> str:
+    return hashlib.sha256((salt + password).encode()).hexdigest()
+
+
+def hash_password(password: str, n: int | None = None, r: int | None = None, p: int | None = None) -> str:
+    n, r, p = n or SCRYPT_N, r or SCRYPT_R, p or SCRYPT_P
+    salt = os.urandom(SALT_BYTES)
+    return f"scrypt${n}${r}${p}${_b64(salt)}${_b64(_scrypt(password, salt, n, r, p))}"
+
+
+def needs_rehash(stored: str) -> bool:
+    if not stored or not stored.startswith("scrypt$"):
+        return True
+    try:
+        _, n, r, p, _, _ = stored.split("$")
+        n, r, p = int(n), int(r), int(p)
+    except ValueError:
+        return True
+    # Each parameter on its own: a tuple comparison would let a larger n hide a smaller r or p.
+    return n < SCRYPT_N or r < SCRYPT_R or p < SCRYPT_P
+
+
+def verify_password(password: str, stored: str | None) -> tuple[bool, bool]:
+    """Return (ok, needs_rehash). Constant-time comparison for both formats."""
+    if not stored:
+        return False, False
+    if stored.startswith("scrypt$"):
+        try:
+            _, n, r, p, salt, digest = stored.split("$")
+            expected = _unb64(digest)
+            actual = _scrypt(password, _unb64(salt), int(n), int(r), int(p), len(expected))
+        except (ValueError, TypeError):
+            return False, False
+        ok = hmac.compare_digest(actual, expected)
+        return ok, ok and needs_rehash(stored)
+    ok = hmac.compare_digest(legacy_hash(password), stored)
+    return ok, ok
+
+
+# Verified against for unknown accounts, so a miss costs the same as a wrong password.
+_DUMMY_HASH = None
+
+
+def _dummy_hash() -> str:
+    global _DUMMY_HASH
+    if _DUMMY_HASH is None:
+        _DUMMY_HASH = hash_password("not-a-real-password")
+    return _DUMMY_HASH
+
+
+# ---------- Bounded executor ----------
+_executor = None
+_slots = None
+_executor_lock = threading.Lock()
+
+
+# The keyword arguments `configure` accepts, i.e. the keys honoured in secrets["AUTH"].
+CONFIGURE_KEYS = ("scrypt_n", "scrypt_r", "scrypt_p", "workers", "max_pending")
+
+
+def configure(scrypt_n: int | None = None, scrypt_r: int | None = None, scrypt_p: int | None = None,
+              workers: int | None = None, max_pending: int | None = None):
+    """Override cost and concurrency (e.g. from st.secrets["AUTH"]). Call before first use."""
+    global SCRYPT_N, SCRYPT_R, SCRYPT_P, HASH_WORKERS, MAX_PENDING, _executor, _slots
+    with _executor_lock:
+        SCRYPT_N = int(scrypt_n or SCRYPT_N)
+        SCRYPT_R = int(scrypt_r or SCRYPT_R)
+        SCRYPT_P = int(scrypt_p or SCRYPT_P)
+        HASH_WORKERS = int(workers or HASH_WORKERS)
+        MAX_PENDING = int(max_pending or MAX_PENDING)
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+        _executor = _slots = None
+
+
+def _submit(fn, *args):
+    global _executor, _slots
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="auth-hash")
+            _slots = threading.BoundedSemaphore(HASH_WORKERS + MAX_PENDING)
+        executor, slots = _executor, _slots
+    if not slots.acquire(blocking=False):
+        raise AuthBusy("Too many sign-in attempts are being processed. Please try again shortly.")
+    try:
+        future = executor.submit(fn, *args)
+    except Exception:
+        slots.release()
+        raise
+    future.add_done_callback(lambda _: slots.release())
+    return future.result(timeout=HASH_TIMEOUT_SECONDS)
+
+
+def hash_password_bounded(password: str) -> str:
+    """hash_password on the shared executor; raises AuthBusy when saturated."""
+    return _submit(hash_password, password)
+
+
+def verify_password_bounded(password: str, stored: str | None) -> tuple[bool, bool]:
+    """verify_password on the shared executor; unknown users are checked against a dummy hash."""
+    if not stored:
+        _submit(verify_password, password, _dummy_hash())
+        return False, False
+    return _submit(verify_password, password, stored)
+
+
+# ---------- Throttling ----------
+class LoginThrottle:
+    """Failed sign-ins per account and per client IP, on the shared RateLimiter.
+
+    Only failures are counted (actions "login_account" and "login_ip"), and a
+    success clears the account's count. With a SQLite-backed limiter the
+    lockout holds across every app process.
+    """
+
+    def __init__(self, limiter: RateLimiter | None = None):
+        self.limiter = limiter or RateLimiter()
+
+    @staticmethod
+    def _account(email: str) -> str:
+        return (email or "").strip().lower()
+
+    def retry_after(self, email: str, ip: str | None = None) -> float:
+        """Seconds until another attempt is allowed (0 if it is allowed now)."""
+        wait = self.limiter.check("login_account", self._account(email))
+        if ip:
+            wait = max(wait, self.limiter.check("login_ip", ip))
+        return wait
+
+    def record_failure(self, email: str, ip: str | None = None):
+        self.limiter.hit("login_account", self._account(email))
+        if ip:
+            self.limiter.hit("login_ip", ip)
+
+    def record_success(self, email: str):
+        self.limiter.reset("login_account", self._account(email))
+
+
+_throttle = None
+
+
+def get_login_throttle(limiter: RateLimiter | None = None) -> LoginThrottle:
+    """Process-wide throttle; pass the app's limiter on first use to share its store."""
+    global _throttle
+    if _throttle is None:
+        _throttle = LoginThrottle(limiter)
+    return _throttle
@@ -0,0 +1,327 @@
+"""Process-wide pool of authenticated SMTP sessions.
+
+Streamlit re-executes the app script on every interaction, but imported modules
+stay in sys.modules, so the pools kept here live for the whole server process
+and are shared by every session (and by worker threads).
+"""
+import atexit
+import os
+import smtplib
+import threading
+import time
+from contextlib import contextmanager
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from pathlib import Path
+
+
+# Replies that refuse one message but leave the session usable. smtplib's
+# exceptions subclass OSError, so these must be caught before _DEAD_SESSION_ERRORS.
+_RESPONSE_ERRORS = (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused)
+# Errors that mean the session itself is unusable and should be dropped.
+_DEAD_SESSION_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError, OSError)
+
+
+class SMTPPool:
+    """A small pool of logged-in SMTP sessions for one (host, port, user).
+
+    - at most `size` sessions are open at once; callers block for a free one;
+    - sessions older than `max_age` seconds are closed and replaced;
+    - a session idle for more than `check_after` seconds is probed with NOOP
+      before reuse, so a server-side timeout costs a reconnect, not a failure.
+    """
+
+    def __init__(self, host: str, port: int, user: str, pwd: str, use_tls: bool = True,
+                 size: int = 4, max_age: float = 300.0, check_after: float = 10.0, timeout: float = 15.0):
+        self.host = host
+        self.port = int(port)
+        self.user = user
+        self.pwd = pwd
+        self.use_tls = use_tls
+        self.size = size
+        self.max_age = max_age
+        self.check_after = check_after
+        self.timeout = timeout
+
+        self._idle = []  # [(server, created_at, last_used)]
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(size)
+        self.stats = {"connects": 0, "reuses": 0, "reconnects": 0, "discarded": 0}
+
+    # ---------- session lifecycle ----------
+    def _connect(self):
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.use_tls:
+                server.starttls()
+            if self.user:
+                server.login(self.user, self.pwd)
+        except BaseException:
+            # Don't leak the socket when TLS or authentication fails.
+            server.close()
+            raise
+        with self._lock:
+            self.stats["connects"] += 1
+        now = time.monotonic()
+        return server, now, now
+
+    def _close(self, server):
+        try:
+            server.quit()
+        except Exception:
+            try:
+                server.close()
+            except Exception:
+                pass
+
+    def _usable(self, server, created_at: float, last_used: float) -> bool:
+        now = time.monotonic()
+        if now - created_at > self.max_age:
+            return False
+        if now - last_used <= self.check_after:
+            return True
+        try:
+            return server.noop()[0] == 250
+        except Exception:
+            return False
+
+    def _checkout(self):
+        while True:
+            with self._lock:
+                entry = self._idle.pop() if self._idle else None
+            if entry is None:
+                return self._connect()
+            if self._usable(*entry):
+                with self._lock:
+                    self.stats["reuses"] += 1
+                return entry
+            self._discard(entry[0])
+
+    def _reset_or_discard(self, server, created_at: float):
+        try:
+            server.rset()
+        except Exception:
+            self._discard(server)
+        else:
+            with self._lock:
+                self._idle.append((server, created_at, time.monotonic()))
+
+    def _discard(self, server):
+        with self._lock:
+            self.stats["discarded"] += 1
+        self._close(server)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a live session; it goes back to the pool unless it died."""
+        self._slots.acquire()
+        try:
+            server, created_at, _ = self._checkout()
+            try:
+                yield server
+            except _RESPONSE_ERRORS:
+                # Refused sender/recipient/data: reset the transaction and keep the session.
+                self._reset_or_discard(server, created_at)
+                raise
+            except _DEAD_SESSION_ERRORS:
+                self._discard(server)
+                raise
+            except Exception:
+                # Not from the socket (e.g. a message that cannot be encoded); the session may still be fine.
+                self._reset_or_discard(server, created_at)
+                raise
+            else:
+                with self._lock:
+                    self._idle.append((server, created_at, time.monotonic()))
+        finally:
+            self._slots.release()
+
+    def sendmail(self, from_email: str, to_addrs: list, msg: str):
+        """Send one message, reconnecting once if the pooled session went stale."""
+        try:
+            with self.connection() as server:
+                return server.sendmail(from_email, to_addrs, msg)
+        except smtplib.SMTPServerDisconnected:
+            with self._lock:
+                self.stats["reconnects"] += 1
+            with self.connection() as server:
+                return server.sendmail(from_email, to_addrs, msg)
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for server, _, _ in idle:
+            self._close(server)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(host: str, port: int, user: str, pwd: str, use_tls: bool = True, **kwargs) -> SMTPPool:
+    """Return the shared pool for these credentials, creating it on first use."""
+    key = (host, int(port), user, pwd, bool(use_tls))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = SMTPPool(host, port, user, pwd, use_tls, **kwargs)
+            _pools[key] = pool
+        return pool
+
+
+def close_all_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+
+
+atexit.register(close_all_pools)
+
+
+class CircuitBreaker:
+    """Per-host breaker: stop calling a server that keeps failing.
+
+    closed    -> calls go through; `failure_threshold` consecutive failures open it.
+    open      -> calls are refused until `reset_timeout` seconds have passed.
+    half-open -> a single probe call is let through; success closes, failure re-opens.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 60.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """True if the caller may attempt a call now (claims the probe when half-open)."""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = "half-open"
+                self._probing = False
+            if self.state == "half-open" and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def is_open(self) -> bool:
+        with self._lock:
+            return self.state == "open" and time.monotonic() - self.opened_at < self.reset_timeout
+
+    def seconds_until_retry(self) -> float:
+        with self._lock:
+            if self.state != "open":
+                return 0.0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half-open" or self.failures >= self.failure_threshold:
+                self.state = "open"
+                self.opened_at = time.monotonic()
+                self._probing = False
+
+
+_breakers = {}
+
+
+def get_breaker(host: str, **kwargs) -> CircuitBreaker:
+    """Return the shared breaker for an SMTP host, creating it on first use."""
+    with _pools_lock:
+        breaker = _breakers.get(host)
+        if breaker is None:
+            breaker = CircuitBreaker(**kwargs)
+            _breakers[host] = breaker
+        return breaker
+
+
+def is_permanent_error(exc: Exception) -> bool:
+    """5xx replies about this message/recipient will not succeed on retry."""
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in exc.recipients.values())
+    if isinstance(exc, (smtplib.SMTPSenderRefused, smtplib.SMTPDataError)):
+        return exc.smtp_code >= 500
+    return False
+
+
+def build_message(from_email: str, to_email: str, subject: str, body: str, html: str | None = None):
+    """Plain-text message, or multipart/alternative (text + HTML) when html is given."""
+    if html:
+        msg = MIMEMultipart("alternative")
+        msg.attach(MIMEText(body, "plain", "utf-8"))
+        msg.attach(MIMEText(html, "html", "utf-8"))
+    else:
+        msg = MIMEText(body, "plain")
+    msg["Subject"] = subject
+    msg["From"] = from_email
+    msg["To"] = to_email
+    return msg
+
+
+def send_email_smtp(smtp: dict, to_email: str, subject: str, body: str, html: str | None = None,
+                    backend: str | None = None) -> tuple[bool, str]:
+    """Send one message now with `smtp` settings (see load_smtp_config); returns (ok, message).
+
+    Uses the shared pool for these credentials, or the event-loop sender
+    (utils_email_async) when backend (default: smtp["backend"]) is "async".
+    """
+    host, port, user, pwd = smtp.get("host"), smtp.get("port"), smtp.get("user"), smtp.get("pwd")
+    from_email, use_tls = smtp.get("from_email"), smtp.get("use_tls", True)
+    if not all([host, port, user, pwd, from_email, to_email]):
+        return False, "Missing SMTP details: host, port, username, password, sender, or recipient."
+
+    if str(backend or smtp.get("backend") or "").lower() == "async":
+        # Event-loop engine: many sends in flight on a few reused sessions
+        from utils_email_async import get_async_sender
+        return get_async_sender(host, port, user, pwd, use_tls, from_email).send(to_email, subject, body, html)
+
+    try:
+        msg = build_message(from_email, to_email, subject, body, html)
+        # Reuse a pooled, already-authenticated session instead of a fresh handshake per message
+        get_pool(host, port, user, pwd, use_tls).sendmail(from_email, [to_email], msg.as_string())
+        return True, "sent"
+    except Exception as e:
+        return False, f"{type(e).__name__}: {e}"
+
+
+def load_secrets(path: str = ".streamlit/secrets.toml") -> dict:
+    """Read Streamlit's secrets file for processes that run without Streamlit."""
+    p = Path(os.environ.get("STREAMLIT_SECRETS", path))
+    if not p.exists():
+        return {}
+    import tomllib
+    with open(p, "rb") as f:
+        return tomllib.load(f)
+
+
+def load_smtp_config(secrets: dict | None = None) -> dict:
+    """SMTP settings from the environment, falling back to secrets.toml."""
+    sec = load_secrets() if secrets is None else secrets
+
+    def get(key, default=""):
+        return os.environ.get(key) or sec.get(key, default)
+
+    user = get("SMTP_USER")
+    return {
+        "host": get("SMTP_HOST"),
+        "port": int(get("SMTP_PORT", 587)),
+        "user": user,
+        "pwd": get("SMTP_PASS"),
+        "from_email": get("SMTP_FROM", user),
+        "use_tls": str(get("SMTP_TLS", True)).lower() not in ("0", "false", "no"),
+        # "async" delivers through utils_email_async instead of the SMTPPool
+        "backend": str(get("EMAIL_BACKEND", "")).lower(),
+    }
@@ -0,0 +1,311 @@
+"""Asyncio SMTP delivery engine.
+
+AsyncSMTPSender runs its own event loop on a daemon thread, so Streamlit (or
+any other synchronous caller) can hand it messages without blocking on the
+network for longer than its own send. Inside the loop:
+
+- at most `concurrency` sends are in flight, bounded by an asyncio.Semaphore;
+- every in-flight send holds one SMTP session, and sessions are reused across
+  sends (NOOP-probed after `check_after` idle seconds, replaced after `max_age`).
+
+Sessions use aiosmtplib when it is installed; otherwise blocking smtplib
+sessions are driven from the loop through a private thread pool of the same
+size, so the engine works with the stdlib alone.
+
+`send(to_email, subject, body, html=None) -> (ok, msg)` has the same shape as
+`send_email_smtp` in the app; `send_many` delivers a batch concurrently.
+With EMAIL_BACKEND = "async" the outbox (email_worker.py, the fan-out) and
+send_email_smtp deliver through it instead of utils_email.SMTPPool.
+"""
+import asyncio
+import atexit
+import smtplib
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from utils_email import build_message
+
+try:
+    import aiosmtplib
+except ImportError:  # optional: fall back to smtplib on a thread pool
+    aiosmtplib = None
+
+
+# Replies that refuse this message but leave the session usable.
+_RESPONSE_ERRORS = (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused)
+_DISCONNECTED_ERRORS = (smtplib.SMTPServerDisconnected,)
+if aiosmtplib is not None:
+    _RESPONSE_ERRORS += (aiosmtplib.SMTPResponseException, aiosmtplib.SMTPRecipientsRefused)
+    _DISCONNECTED_ERRORS += (aiosmtplib.SMTPServerDisconnected,)
+
+
+# ---------- Sessions ----------
+class _AioSession:
+    """Native asyncio session (aiosmtplib)."""
+
+    def __init__(self, sender: "AsyncSMTPSender"):
+        self.client = aiosmtplib.SMTP(
+            hostname=sender.host, port=sender.port, timeout=sender.timeout,
+            start_tls=bool(sender.use_tls),
+            username=sender.user or None, password=sender.pwd or None,
+        )
+
+    async def connect(self):
+        await self.client.connect()
+
+    async def sendmail(self, from_email: str, to_addrs: list, msg: str):
+        try:
+            await self.client.sendmail(from_email, to_addrs, msg)
+        except aiosmtplib.SMTPRecipientsRefused as e:
+            # smtplib's types, so utils_email.is_permanent_error can classify them
+            raise smtplib.SMTPRecipientsRefused({r.recipient: (r.code, r.message) for r in e.recipients}) from e
+        except aiosmtplib.SMTPSenderRefused as e:
+            raise smtplib.SMTPSenderRefused(e.code, e.message, e.sender) from e
+        except aiosmtplib.SMTPDataError as e:
+            raise smtplib.SMTPDataError(e.code, e.message) from e
+
+    async def noop(self) -> bool:
+        return (await self.client.noop()).code == 250
+
+    async def rset(self):
+        await self.client.rset()
+
+    async def close(self):
+        try:
+            await self.client.quit()
+        except Exception:
+            self.client.close()
+
+
+class _ThreadSession:
+    """Blocking smtplib session, each call run on the sender's executor."""
+
+    def __init__(self, sender: "AsyncSMTPSender"):
+        self.sender = sender
+        self.server = None
+
+    async def _call(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.sender._executor, fn, *args)
+
+    def _connect(self):
+        s = self.sender
+        server = smtplib.SMTP(s.host, s.port, timeout=s.timeout)
+        try:
+            if s.use_tls:
+                server.starttls()
+            if s.user:
+                server.login(s.user, s.pwd)
+        except BaseException:
+            # Don't leak the socket when TLS or authentication fails.
+            server.close()
+            raise
+        self.server = server
+
+    async def connect(self):
+        await self._call(self._connect)
+
+    async def sendmail(self, from_email: str, to_addrs: list, msg: str):
+        await self._call(self.server.sendmail, from_email, to_addrs, msg)
+
+    async def noop(self) -> bool:
+        return (await self._call(self.server.noop))[0] == 250
+
+    async def rset(self):
+        await self._call(self.server.rset)
+
+    async def close(self):
+        try:
+            await self._call(self.server.quit)
+        except Exception:
+            try:
+                self.server.close()
+            except Exception:
+                pass
+
+
+# ---------- Sender ----------
+class AsyncSMTPSender:
+    """Concurrent SMTP delivery on a background event loop for one (host, port, user)."""
+
+    def __init__(self, host: str, port: int, user: str, pwd: str, use_tls: bool = True,
+                 from_email: str | None = None, concurrency: int = 32, max_age: float = 300.0,
+                 check_after: float = 10.0, timeout: float = 15.0, backend: str | None = None):
+        self.host = host
+        self.port = int(port)
+        self.user = user
+        self.pwd = pwd
+        self.use_tls = use_tls
+        self.from_email = from_email or user
+        self.concurrency = concurrency
+        self.max_age = max_age
+        self.check_after = check_after
+        self.timeout = timeout
+        self.backend = backend or ("aiosmtplib" if aiosmtplib is not None else "thread")
+        if self.backend == "aiosmtplib" and aiosmtplib is None:
+            raise RuntimeError("aiosmtplib is not installed")
+
+        self._session_cls = _AioSession if self.backend == "aiosmtplib" else _ThreadSession
+        self._executor = ThreadPoolExecutor(max_workers=concurrency) if self.backend == "thread" else None
+        self._idle = []  # [(session, created_at, last_used)], only touched on the loop thread
+        self._loop = None
+        self._sem = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self.stats = {"connects": 0, "reuses": 0, "reconnects": 0, "discarded": 0, "in_flight": 0}
+
+    # ---------- loop lifecycle ----------
+    def start(self) -> "AsyncSMTPSender":
+        with self._start_lock:
+            if self._loop is not None:
+                return self
+            ready = threading.Event()
+
+            def run():
+                self._loop = asyncio.new_event_loop()
+                asyncio.set_event_loop(self._loop)
+                self._sem = asyncio.Semaphore(self.concurrency)
+                ready.set()
+                self._loop.run_forever()
+
+            self._thread = threading.Thread(target=run, name="smtp-async", daemon=True)
+            self._thread.start()
+            ready.wait()
+        return self
+
+    def close(self):
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._close_idle(), self._loop).result(timeout=self.timeout)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=self.timeout)
+        self._loop = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+    # ---------- sessions ----------
+    async def _checkout(self):
+        now = time.monotonic()
+        while self._idle:
+            session, created_at, last_used = self._idle.pop()
+            if now - created_at <= self.max_age:
+                if now - last_used <= self.check_after:
+                    self.stats["reuses"] += 1
+                    return session, created_at
+                try:
+                    if await session.noop():
+                        self.stats["reuses"] += 1
+                        return session, created_at
+                except Exception:
+                    pass
+            await self._discard(session)
+        session = self._session_cls(self)
+        await session.connect()
+        self.stats["connects"] += 1
+        return session, time.monotonic()
+
+    async def _discard(self, session):
+        self.stats["discarded"] += 1
+        await session.close()
+
+    async def _close_idle(self):
+        idle, self._idle = self._idle, []
+        for session, _, _ in idle:
+            await session.close()
+
+    async def _deliver(self, from_email: str, to_email: str, msg: str):
+        session, created_at = await self._checkout()
+        try:
+            await session.sendmail(from_email, [to_email], msg)
+        except _RESPONSE_ERRORS:
+            try:
+                await session.rset()
+            except Exception:
+                await self._discard(session)
+            else:
+                self._idle.append((session, created_at, time.monotonic()))
+            raise
+        except BaseException:
+            await self._discard(session)
+            raise
+        self._idle.append((session, created_at, time.monotonic()))
+
+    # ---------- sending ----------
+    async def _send(self, from_email: str, to_email: str, msg: str):
+        async with self._sem:
+            self.stats["in_flight"] += 1
+            try:
+                try:
+                    await self._deliver(from_email, to_email, msg)
+                except _DISCONNECTED_ERRORS:
+                    # Pooled session went stale between the probe and the send.
+                    self.stats["reconnects"] += 1
+                    await self._deliver(from_email, to_email, msg)
+            finally:
+                self.stats["in_flight"] -= 1
+
+    async def asend(self, to_email: str, subject: str, body: str, html: str | None = None) -> tuple[bool, str]:
+        """Send one message from inside the loop; waits for a free slot."""
+        if not all([self.host, self.port, self.from_email, to_email]):
+            return False, "Missing SMTP details: host, port, sender, or recipient."
+        msg = build_message(self.from_email, to_email, subject, body, html).as_string()
+        try:
+            await self._send(self.from_email, to_email, msg)
+            return True, "sent"
+        except Exception as e:
+            return False, f"{type(e).__name__}: {e}"
+
+    def sendmail(self, from_email: str, to_email: str, msg: str) -> Future:
+        """Queue a built message from any thread. The Future raises the SMTP error on failure.
+
+        For utils_outbox.deliver, which sorts failures into retry and dead.
+        """
+        self.start()
+        return asyncio.run_coroutine_threadsafe(self._send(from_email, to_email, msg), self._loop)
+
+    def submit(self, to_email: str, subject: str, body: str, html: str | None = None) -> Future:
+        """Queue a send from any thread; the Future resolves to (ok, msg)."""
+        self.start()
+        return asyncio.run_coroutine_threadsafe(self.asend(to_email, subject, body, html), self._loop)
+
+    def send(self, to_email: str, subject: str, body: str, html: str | None = None) -> tuple[bool, str]:
+        """Blocking send with the same call shape as send_email_smtp."""
+        if self._thread is not None and threading.current_thread() is self._thread:
+            raise RuntimeError("send() would deadlock on the sender's own loop; use asend()")
+        return self.submit(to_email, subject, body, html).result()
+
+    def send_many(self, messages: list[tuple]) -> list[tuple[bool, str]]:
+        """Deliver (to, subject, body[, html]) tuples concurrently; results keep input order."""
+        self.start()
+
+        async def run():
+            return await asyncio.gather(*(self.asend(*m) for m in messages))
+
+        return asyncio.run_coroutine_threadsafe(run(), self._loop).result()
+
+
+_senders = {}
+_senders_lock = threading.Lock()
+
+
+def get_async_sender(host: str, port: int, user: str, pwd: str, use_tls: bool = True,
+                     from_email: str | None = None, **kwargs) -> AsyncSMTPSender:
+    """Return the shared, started sender for these credentials, creating it on first use."""
+    key = (host, int(port), user, pwd, bool(use_tls), from_email or user)
+    with _senders_lock:
+        sender = _senders.get(key)
+        if sender is None:
+            sender = AsyncSMTPSender(host, port, user, pwd, use_tls, from_email, **kwargs).start()
+            _senders[key] = sender
+        return sender
+
+
+def close_all_senders():
+    with _senders_lock:
+        senders = list(_senders.values())
+        _senders.clear()
+    for sender in senders:
+        sender.close()
+
+
+atexit.register(close_all_senders)
@@ -0,0 +1,180 @@
+"""UI translations.
+
+GREEK maps the app's English UI strings to Greek. It is built once at import,
+so a lookup is a single dict access. Kept free of Streamlit so the standalone
+reference portal (portal_app.py) can use it without loading the main app.
+"""
+
+GREEK_LANG = "Ελληνικά"
+
+GREEK = {
+    # Auth & common
+    "Sign In": "Σύνδεση",
+    "Create Account": "Δημιουργία Λογαριασμού",
+    "Sign Out": "Αποσύνδεση",
+    "Incorrect email or password. Please try again.": "Λάθος email ή κωδικός. Παρακαλώ δοκιμάστε ξανά.",
+    "Your account has been created. Please sign in to continue.": "Ο λογαριασμός σας δημιουργήθηκε. Συνδεθείτε για να συνεχίσετε.",
+    "Your account has been created — please sign in.": "Ο λογαριασμός σας δημιουργήθηκε — συνδεθείτε.",
+    "Welcome, ": "Καλώς ορίσατε, ",
+    "Please enter your full name.": "Παρακαλώ εισαγάγετε το πλήρες όνομά σας.",
+    "Please enter a valid email address.": "Παρακαλώ εισαγάγετε έγκυρη διεύθυνση email.",
+    "Passwords do not match. Please try again.": "Οι κωδικοί δεν ταιριάζουν. Δοκιμάστε ξανά.",
+    "This email is already registered.": "Αυτό το email έχει ήδη καταχωρηθεί.",
+    "Unknown role:": "Άγνωστος ρόλος:",
+    "Logged in as": "Συνδεθήκατε ως",
+    # SMTP
+    "Missing SMTP details: host, port, username, password, sender, or recipient.": "Λείπουν στοιχεία SMTP: host, port, όνομα χρήστη, κωδικός, αποστολέας ή παραλήπτης.",
+    "Send Test Email": "Αποστολή Δοκιμαστικού Email",
+    "Send test to": "Αποστολή δοκιμής σε",
+    "If you received this email, your SMTP configuration is working. ✅": "Αν λάβατε αυτό το email, η ρύθμιση SMTP λειτουργεί. ✅",
+    "Test email sent successfully.": "Το δοκιμαστικό email στάλθηκε με επιτυχία.",
+    "Failed to send email:": "Αποτυχία αποστολής email:",
+    # Sections
+    "Tenant Dashboard": "Πίνακας Ενοικιαστή",
+    "Landlord Dashboard": "Πίνακας Ιδιοκτήτη",
+    "Administrator Dashboard": "Πίνακας Διαχειριστή",
+    # Future Landlords
+    "Future Landlords (Contacts)": "Μελλοντικοί Ιδιοκτήτες (Επαφές)",
+    "Enter a landlord’s email address": "Εισάγετε το email του ιδιοκτήτη",
+    "Add Contact": "Προσθήκη Επαφής",
+    "Contact added and invitation sent successfully.": "Η επαφή προστέθηκε και η πρόσκληση στάλθηκε με επιτυχία.",
+    "Contact added, but the email could not be sent:": "Η επαφή προστέθηκε, αλλά δεν ήταν δυνατή η αποστολή email:",
+    "Unable to add contact:": "Αδυναμία προσθήκης επαφής:",
+    "Send Invitation": "Αποστολή Πρόσκλησης",
+    "Invited": "Προσκλήθηκε",
+    "Invitation sent successfully.": "Η πρόσκληση στάλθηκε με επιτυχία.",
+    "Unable to send invitation:": "Αδυναμία αποστολής πρόσκλησης:",
+    "Contact removed.": "Η επαφή αφαιρέθηκε.",
+    "Name": "Ονοματεπώνυμο",
+    "Address": "Διεύθυνση",
+    "No future landlord contacts yet.": "Δεν υπάρχουν ακόμα επαφές μελλοντικών ιδιοκτητών.",
+    # Previous Landlords & References
+    "Previous Landlords and References": "Προηγούμενοι Ιδιοκτήτες και Συστάσεις",
+    "Tax ID (9 digits)": "ΑΦΜ (9 ψηφία)",
+    "Add Previous Landlord": "Προσθήκη Προηγούμενου Ιδιοκτήτη",
+    "Please enter the landlord’s name.": "Παρακαλώ εισαγάγετε το όνομα του ιδιοκτήτη.",
+    "Please enter the landlord’s address.": "Παρακαλώ εισαγάγετε τη διεύθυνση του ιδιοκτήτη.",
+    "Previous landlord added successfully.": "Ο προηγούμενος ιδιοκτήτης προστέθηκε με επιτυχία.",
+    "Request Reference": "Αίτημα Σύστασης",
+    "Reference request sent successfully by email.": "Το αίτημα σύστασης στάλθηκε με επιτυχία μέσω email.",
+    "Email delivery failed (": "Η αποστολή email απέτυχε (",
+    "Please share this link manually:": "Παρακαλώ κοινοποιήστε αυτόν τον σύνδεσμο χειροκίνητα:",
+    # Contract
+    "Contract Status:": "Κατάσταση Συμβολαίου:",
+    "Download Contract": "Λήψη Συμβολαίου",
+    "Replace Tenancy Contract (PDF or Image)": "Συμβολαίου Μίσθωσης (PDF ή Εικόνα)",
+    "Upload Tenancy Contract (PDF or Image)": "Ανέβασε Συμβόλαιο Μίσθωσης (PDF ή Εικόνα)",
+    "Contract uploaded. Status reset to Pending Review.": "Το συμβόλαιο μεταφορτώθηκε. Η κατάσταση επαναφέρθηκε σε Αναμονή Ελέγχου.",
+    "Contract uploaded. Status set to Pending Review.": "Το συμβόλαιο μεταφορτώθηκε. Η κατάσταση ορίστηκε σε Αναμονή Ελέγχου.",
+    "Unable to read the saved file:": "Δεν είναι δυνατή η ανάγνωση του αποθηκευμένου αρχείου:",
+    "⏳ Pending Review": "⏳ Αναμονή Ελέγχου",
+    "✅ Verified Contract": "✅ Επικυρωμένο Συμβόλαιο",
+    "❌ Rejected Contract": "❌ Απορριφθέν Συμβόλαιο",
+    # Admin
+    "Pending References (All Tenants)": "Εκκρεμείς Συστάσεις (Όλοι οι Ενοικιαστές)",
+    "No requests available.": "Δεν υπάρχουν διαθέσιμα αιτήματα.",
+    "Reference Link": "Σύνδεσμος Σύστασης",
+    "✅ Verify Contract": "✅ Επικύρωση Συμβολαίου",
+    "Contract verified successfully.": "Το συμβόλαιο επικυρώθηκε με επιτυχία.",
+    "Cancel Reference": "Ακύρωση Σύστασης",
+    "Reference cancelled.": "Η σύσταση ακυρώθηκε.",
+    # Landlord dashboard
+    "Prospective Tenants (Listed You as Future Landlord)": "Υποψήφιοι Ενοικιαστές (Σας έχουν δηλώσει ως μελλοντικό ιδιοκτήτη)",
+    "No tenants have listed you as a future landlord yet.": "Κανένας ενοικιαστής δεν σας έχει δηλώσει ακόμα ως μελλοντικό ιδιοκτήτη.",
+    "Respond Now": "Απάντηση Τώρα",
+    "Submit Reference": "Υποβολή Σύστασης",
+    "Not My Tenant / Cancel": "Δεν είναι ο ενοικιαστής μου / Ακύρωση",
+    "Please confirm you were the landlord.": "Παρακαλώ επιβεβαιώστε ότι ήσασταν ο ιδιοκτήτης.",
+    "Reference submitted successfully.": "Η σύσταση υποβλήθηκε με επιτυχία.",
+    "Request cancelled.": "Το αίτημα ακυρώθηκε.",
+    "View Submitted Reference": "Προβολή Υποβληθείσας Σύστασης",
+    # Public portal
+    "🏠 RentRight — Landlord Reference Portal": "🏠 RentRight — Πύλη Σύστασης Ιδιοκτήτη",
+    "Invalid or expired reference token.": "Μη έγκυρο ή ληγμένο διακριτικό σύστασης.",
+    "This reference has already been submitted. Thank you!": "Αυτή η σύσταση έχει ήδη υποβληθεί. Ευχαριστούμε!",
+    "Reference for Tenant ID #": "Σύσταση για Ενοικιαστή ID #",
+    "I confirm I was the landlord for this tenant.": "Επιβεβαιώνω ότι ήμουν ο ιδιοκτήτης αυτού του ενοικιαστή.",
+    "Overall tenant score": "Συνολική αξιολόγηση ενοικιαστή",
+    "Did the tenant pay on time?": "Πλήρωνε ο ενοικιαστής στην ώρα του;",
+    "Did the tenant leave utilities unpaid?": "Άφησε απλήρωτους λογαριασμούς;",
+    "Did the tenant leave the apartment in good condition?": "Παραδόθηκε το διαμέρισμα σε καλή κατάσταση;",
+    "Optional comments": "Προαιρετικά σχόλια",
+    "All Reference Requests": "Όλα τα Αιτήματα Σύστασης",
+    "No reference requests have been created yet.": "Δεν έχουν δημιουργηθεί ακόμα αιτήματα σύστασης.",
+    # Settings
+    "Email & App Settings": "Ρυθμίσεις Email & Εφαρμογής",
+    "Email Settings (SMTP)": "Ρυθμίσεις Email (SMTP)",
+    "App Base URL": "Βασικό URL Εφαρμογής",
+    "Base URL for Links": "Βασικό URL για Συνδέσμους",
+    # Misc labels
+    "Email": "Email",
+    "Password": "Κωδικός",
+    "Confirm password": "Επιβεβαίωση κωδικού",
+    "Full name": "Πλήρες όνομα",
+    "Role": "Ρόλος",
+    "Tenant": "Ενοικιαστής",
+    "Landlord": "Ιδιοκτήτης",
+    "Admin": "Διαχειριστής",
+    "completed": "Ολοκληρώθηκε",
+    # Email outbox
+    "Contact added and invitation queued.": "Η επαφή προστέθηκε και η πρόσκληση μπήκε στην ουρά αποστολής.",
+    "Invitation queued.": "Η πρόσκληση μπήκε στην ουρά αποστολής.",
+    "Reference request created. The email is queued for delivery.": "Το αίτημα σύστασης δημιουργήθηκε. Το email βρίσκεται στην ουρά αποστολής.",
+    "📧 Email sent": "📧 Το email στάλθηκε",
+    "⚠️ Email failed": "⚠️ Αποτυχία αποστολής email",
+    "🕓 Email queued": "🕓 Email σε αναμονή",
+    "Request References from All Previous Landlords": "Αίτημα Σύστασης από Όλους τους Προηγούμενους Ιδιοκτήτες",
+    "Sending reference requests…": "Αποστολή αιτημάτων σύστασης…",
+    "Every previous landlord already has a pending request.": "Όλοι οι προηγούμενοι ιδιοκτήτες έχουν ήδη εκκρεμές αίτημα.",
+    "requests created": "αιτήματα δημιουργήθηκαν",
+    "emailed": "στάλθηκαν",
+    "failed — please share these links manually:": "απέτυχαν — μοιραστείτε αυτούς τους συνδέσμους χειροκίνητα:",
+    "requests created and emailed.": "αιτήματα δημιουργήθηκαν και στάλθηκαν.",
+    "queued for delivery shortly.": "σε αναμονή για αποστολή σύντομα.",
+    "Background Jobs": "Εργασίες Παρασκηνίου",
+    "No background jobs yet.": "Δεν υπάρχουν ακόμη εργασίες παρασκηνίου.",
+    "Retry failed jobs": "Επανάληψη αποτυχημένων εργασιών",
+    "jobs requeued.": "εργασίες μπήκαν ξανά στην ουρά.",
+    "Open the reference link from your email to continue.": "Ανοίξτε τον σύνδεσμο σύστασης από το email σας για να συνεχίσετε.",
+    "Layout": "Διάταξη",
+    "Cards": "Κάρτες",
+    "Table": "Πίνακας",
+    "Select a row to open the request.": "Επιλέξτε μια γραμμή για να ανοίξετε το αίτημα.",
+    "Show": "Εμφάνιση",
+    "All": "Όλα",
+    "Pending": "Σε εκκρεμότητα",
+    "Completed": "Ολοκληρωμένα",
+    "Cancelled": "Ακυρωμένα",
+    "Startup Timing": "Χρόνοι Εκκίνησης",
+    "Cold start (ms)": "Ψυχρή εκκίνηση (ms)",
+    "Warm setup p50 (ms)": "Προετοιμασία p50 (ms)",
+    "Warm rerun p50 (ms)": "Επανεκτέλεση p50 (ms)",
+    "first run": "πρώτη εκτέλεση",
+    "Too many requests. Please try again in": "Πάρα πολλά αιτήματα. Δοκιμάστε ξανά σε",
+    "seconds.": "δευτερόλεπτα.",
+    "Rate Limits": "Όρια Αιτημάτων",
+    "No rate-limited actions yet.": "Δεν υπάρχουν ακόμη ενέργειες με όριο.",
+    "Counts are for this app process since it started.": "Οι μετρήσεις αφορούν αυτή τη διεργασία από την εκκίνησή της.",
+    "Too many sign-in attempts. Try again in": "Πάρα πολλές προσπάθειες σύνδεσης. Δοκιμάστε ξανά σε",
+    "minutes.": "λεπτά.",
+    "The server is busy. Please try again in a moment.": "Ο διακομιστής είναι απασχολημένος. Δοκιμάστε ξανά σε λίγο.",
+    "A reference request was just sent to this landlord.": "Μόλις στάλθηκε αίτημα σύστασης σε αυτόν τον ιδιοκτήτη.",
+    "Reference requests were just sent. Please wait a few minutes before trying again.": "Τα αιτήματα σύστασης μόλις στάλθηκαν. Περιμένετε λίγα λεπτά πριν δοκιμάσετε ξανά.",
+    "Email Delivery": "Αποστολή Email",
+    "Queued": "Σε αναμονή",
+    "Sending": "Αποστέλλονται",
+    "Sent": "Στάλθηκαν",
+    "Failed": "Απέτυχαν",
+    "No undeliverable emails.": "Δεν υπάρχουν email που απέτυχαν οριστικά.",
+    "Replay all failed emails": "Επαναποστολή όλων των αποτυχημένων email",
+    "emails requeued.": "email μπήκαν ξανά στην ουρά.",
+    "Replay": "Επαναποστολή",
+    "Queue depth by recipient domain": "Μέγεθος ουράς ανά τομέα παραλήπτη",
+}
+
+
+def translate(text: str, lang: str | None) -> str:
+    """Greek for `text` when `lang` is Greek; otherwise (or if missing) the English text."""
+    if lang != GREEK_LANG:
+        return text
+    return GREEK.get(text, text)
@@ -0,0 +1,264 @@
+"""Durable background job queue in SQLite.
+
+Slow work (contract encryption and previews, retention, scrubbing, outbox
+draining) is queued as a `jobs` row and run by job_worker.py, off the request
+path. Like the email outbox, `enqueue_job` writes on the caller's cursor, so
+a job commits or rolls back together with the business write that needs it.
+
+- Workers claim due jobs highest `priority` first, then by `run_at`, with a
+  lease (`lease_until`). A worker that dies mid-job loses its lease and the
+  job is queued again. Long jobs keep their lease alive with extend_leases.
+- Failures are retried with the outbox's jittered exponential backoff until
+  `max_attempts`. After that, or on PermanentJobError, the job is marked
+  failed, with the error kept in `last_error`, until an admin retries it.
+- `dedupe_key` allows one queued-or-running job per key. A second enqueue
+  with the same key is dropped, e.g. a preview requested twice or a periodic
+  sweep that is already waiting.
+"""
+import json
+import sqlite3
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from utils_outbox import backoff_delay
+
+
+JOB_STATUSES = ("queued", "running", "done", "failed")
+JOB_FIELDS = ["id", "kind", "payload", "priority", "attempts", "max_attempts", "run_at", "created_at"]
+
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_LEASE_SECONDS = 300
+
+
+class PermanentJobError(Exception):
+    """Raised by a handler when retrying cannot help (bad payload, row gone, ...)."""
+
+
+def ensure_jobs_table(conn: sqlite3.Connection):
+    cur = conn.cursor()
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            payload TEXT NOT NULL DEFAULT '{}',
+            priority INTEGER NOT NULL DEFAULT 0,
+            status TEXT NOT NULL DEFAULT 'queued' CHECK(status IN ('queued','running','done','failed')),
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_attempts INTEGER NOT NULL DEFAULT 5,
+            run_at TEXT NOT NULL,
+            lease_until TEXT,
+            claimed_by TEXT,
+            dedupe_key TEXT,
+            last_error TEXT,
+            created_at TEXT NOT NULL,
+            started_at TEXT,
+            finished_at TEXT
+        )
+        """
+    )
+    # Claim order: the partial index holds only waiting rows, so it stays small.
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_jobs_due ON jobs(priority DESC, run_at, id) WHERE status='queued'"
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_jobs_lease ON jobs(lease_until) WHERE status='running'")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_jobs_finished ON jobs(status, finished_at)")
+    cur.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_dedupe ON jobs(dedupe_key) "
+        "WHERE dedupe_key IS NOT NULL AND status IN ('queued','running')"
+    )
+    conn.commit()
+
+
+def enqueue_job(cur: sqlite3.Cursor, kind: str, payload: dict | None = None, priority: int = 0,
+                run_at: datetime | None = None, max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+                dedupe_key: str | None = None) -> int | None:
+    """Queue a job on the caller's cursor. Does NOT commit.
+
+    Returns the job id, or None when a job with the same dedupe_key is
+    already queued or running.
+    """
+    cur.execute(
+        "INSERT OR IGNORE INTO jobs(kind, payload, priority, status, max_attempts, run_at, dedupe_key, created_at) "
+        "VALUES (?,?,?, 'queued', ?,?,?,?)",
+        (
+            kind, json.dumps(payload or {}), int(priority), int(max_attempts),
+            (run_at or datetime.utcnow()).isoformat(), dedupe_key, datetime.utcnow().isoformat(),
+        ),
+    )
+    return cur.lastrowid if cur.rowcount else None
+
+
+def claim_jobs(conn: sqlite3.Connection, worker_id: str, limit: int, lease_seconds: int = DEFAULT_LEASE_SECONDS,
+               kinds: list[str] | None = None) -> list[dict]:
+    """Atomically lease up to `limit` due jobs to `worker_id`.
+
+    Jobs whose lease ran out (their worker died) are queued again first;
+    that counts as an attempt. One BEGIN IMMEDIATE transaction, so two
+    workers never claim the same row.
+    """
+    now = datetime.utcnow()
+    claim_id = f"{worker_id}:{uuid4().hex[:8]}"
+    kind_filter = f" AND kind IN ({','.join('?' * len(kinds))})" if kinds else ""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # A job that keeps killing its worker must not be retried forever.
+        conn.execute(
+            "UPDATE jobs SET status=CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'queued' END, "
+            "finished_at=CASE WHEN attempts >= max_attempts THEN ? END, "
+            "claimed_by=NULL, lease_until=NULL, last_error='lease expired' "
+            "WHERE status='running' AND lease_until < ?",
+            (now.isoformat(), now.isoformat()),
+        )
+        conn.execute(
+            f"""
+            UPDATE jobs
+               SET status='running', claimed_by=?, lease_until=?, started_at=?, attempts=attempts+1
+             WHERE id IN (
+                   SELECT id FROM jobs
+                    WHERE status='queued' AND run_at <= ?{kind_filter}
+                    ORDER BY priority DESC, run_at, id LIMIT ?
+             )
+            """,
+            (claim_id, (now + timedelta(seconds=lease_seconds)).isoformat(), now.isoformat(), now.isoformat(),
+             *(kinds or []), limit),
+        )
+        rows = conn.execute(
+            f"SELECT {', '.join(JOB_FIELDS)} FROM jobs WHERE claimed_by=? AND status='running' "
+            "ORDER BY priority DESC, run_at, id",
+            (claim_id,),
+        ).fetchall()
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    jobs = []
+    for row in rows:
+        job = dict(zip(JOB_FIELDS, row))
+        job["payload"] = json.loads(job["payload"] or "{}")
+        job["claimed_by"] = claim_id
+        jobs.append(job)
+    return jobs
+
+
+def extend_leases(conn: sqlite3.Connection, jobs: list[dict], lease_seconds: int = DEFAULT_LEASE_SECONDS) -> int:
+    """Heartbeat for jobs still running in this worker; a job re-claimed elsewhere is left alone."""
+    if not jobs:
+        return 0
+    lease_until = (datetime.utcnow() + timedelta(seconds=lease_seconds)).isoformat()
+    cur = conn.executemany(
+        "UPDATE jobs SET lease_until=? WHERE status='running' AND id=? AND claimed_by=?",
+        [(lease_until, job["id"], job["claimed_by"]) for job in jobs],
+    )
+    conn.commit()
+    return cur.rowcount
+
+
+def complete_job(conn: sqlite3.Connection, job: dict) -> bool:
+    """Mark the job done. False if its lease expired and it was re-claimed elsewhere."""
+    cur = conn.execute(
+        "UPDATE jobs SET status='done', finished_at=?, lease_until=NULL, last_error=NULL WHERE id=? AND claimed_by=?",
+        (datetime.utcnow().isoformat(), job["id"], job["claimed_by"]),
+    )
+    conn.commit()
+    return cur.rowcount == 1
+
+
+def fail_job(conn: sqlite3.Connection, job: dict, error: str, permanent: bool = False) -> str | None:
+    """Schedule a retry, or mark the job failed when it is permanent or out of attempts.
+
+    Returns the new status, or None when the job is no longer ours (lease
+    expired and re-claimed), in which case nothing is written.
+    """
+    now = datetime.utcnow()
+    if permanent or job["attempts"] >= job["max_attempts"]:
+        status, run_at = "failed", job["run_at"]
+    else:
+        status, run_at = "queued", (now + timedelta(seconds=backoff_delay(job["attempts"]))).isoformat()
+    cur = conn.execute(
+        "UPDATE jobs SET status=?, run_at=?, last_error=?, lease_until=NULL, claimed_by=NULL, "
+        "finished_at=CASE WHEN ?='failed' THEN ? END WHERE id=? AND claimed_by=?",
+        (status, run_at, error[:2000], status, now.isoformat(), job["id"], job["claimed_by"]),
+    )
+    conn.commit()
+    return status if cur.rowcount == 1 else None
+
+
+def retry_failed_jobs(conn: sqlite3.Connection, job_id: int | None = None) -> int:
+    """Requeue one failed job (or all of them when job_id is None). Returns rows requeued."""
+    where, args = (" AND id=?", (job_id,)) if job_id is not None else ("", ())
+    cur = conn.execute(
+        "UPDATE OR IGNORE jobs SET status='queued', attempts=0, run_at=?, finished_at=NULL "
+        f"WHERE status='failed'{where}",
+        (datetime.utcnow().isoformat(), *args),
+    )
+    conn.commit()
+    return cur.rowcount
+
+
+def prune_jobs(conn: sqlite3.Connection, older_than_seconds: int = 7 * 24 * 3600) -> int:
+    """Delete finished jobs; failed ones are kept until retried or pruned by hand."""
+    cutoff = (datetime.utcnow() - timedelta(seconds=older_than_seconds)).isoformat()
+    cur = conn.execute("DELETE FROM jobs WHERE status='done' AND finished_at < ?", (cutoff,))
+    conn.commit()
+    return cur.rowcount
+
+
+def seconds_until_due(conn: sqlite3.Connection) -> float | None:
+    """Seconds until the next queued job is due (0 if one is due now), None if nothing is queued."""
+    row = conn.execute("SELECT MIN(run_at) FROM jobs WHERE status='queued'").fetchone()
+    if not row or not row[0]:
+        return None
+    return max(0.0, (datetime.fromisoformat(row[0]) - datetime.utcnow()).total_seconds())
+
+
+# ---------- Metrics ----------
+def job_stats(conn: sqlite3.Connection, window_seconds: int = 3600) -> dict:
+    """Queue depth and latency per kind.
+
+    depth    queued jobs that are due now / scheduled for later / running / failed
+    oldest   age in seconds of the oldest due job (how far behind the workers are)
+    wait     mean seconds from run_at to start, for jobs finished in the window
+    run      mean and max seconds from start to finish, same jobs
+    """
+    now = datetime.utcnow()
+    since = (now - timedelta(seconds=window_seconds)).isoformat()
+    stats = {}
+
+    def entry(kind):
+        return stats.setdefault(kind, {
+            "due": 0, "scheduled": 0, "running": 0, "failed": 0, "done": 0,
+            "oldest_due_s": 0.0, "wait_avg_s": None, "run_avg_s": None, "run_max_s": None,
+        })
+
+    for kind, due, scheduled, running, failed, oldest in conn.execute(
+        """
+        SELECT kind,
+               SUM(status='queued' AND run_at <= ?),
+               SUM(status='queued' AND run_at > ?),
+               SUM(status='running'),
+               SUM(status='failed'),
+               MIN(CASE WHEN status='queued' AND run_at <= ? THEN run_at END)
+          FROM jobs WHERE status IN ('queued','running','failed') GROUP BY kind
+        """,
+        (now.isoformat(),) * 3,
+    ):
+        e = entry(kind)
+        e.update(due=due or 0, scheduled=scheduled or 0, running=running or 0, failed=failed or 0)
+        if oldest:
+            e["oldest_due_s"] = round((now - datetime.fromisoformat(oldest)).total_seconds(), 3)
+
+    # julianday differences are in days
+    for kind, done, wait, run, run_max in conn.execute(
+        """
+        SELECT kind, COUNT(*),
+               AVG(MAX(0, julianday(started_at) - julianday(run_at))) * 86400,
+               AVG(julianday(finished_at) - julianday(started_at)) * 86400,
+               MAX(julianday(finished_at) - julianday(started_at)) * 86400
+          FROM jobs WHERE status='done' AND finished_at >= ? GROUP BY kind
+        """,
+        (since,),
+    ):
+        e = entry(kind)
+        e.update(done=done, wait_avg_s=round(wait, 3), run_avg_s=round(run, 3), run_max_s=round(run_max, 3))
+    return stats
@@ -0,0 +1,578 @@
+"""Durable email outbox.
+
+The app never talks to SMTP on the request path: it inserts an `email_outbox`
+row in the same transaction as the business write (new reference request,
+invited flag, ...) and email_worker.py delivers it later. The UI reads the
+row's status (queued / sending / sent / failed) back from the table.
+
+Transient failures are retried with jittered exponential backoff
+(`next_attempt_at`); permanent ones, or rows that run out of attempts, are
+copied to `email_dead_letter` and marked failed until an admin replays them.
+
+DomainScheduler sits in front of delivery and paces it with one token bucket
+per recipient domain plus a global one, configured by EMAIL_RATE_LIMITS.
+
+Sends triggered from the UI are keyed by (action, tenant, recipient) in
+`email_idempotency`; a repeat within the action's window (sliding, from the
+first call) is dropped before anything is written or sent, so Streamlit
+reruns and double clicks do nothing.
+"""
+import random
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from utils_ratelimit import TokenBucket
+
+
+OUTBOX_STATUSES = ("queued", "sending", "sent", "failed")
+
+MAX_ATTEMPTS = 6
+BACKOFF_BASE_SECONDS = 30
+BACKOFF_CAP_SECONDS = 3600
+
+# Recipient domain of email_outbox.to_email, computed in SQL: everything after
+# the last '@', like email_domain(). RTRIM strips the non-'@' tail, so its
+# length is the position of the last '@'.
+DOMAIN_SQL = "LOWER(TRIM(SUBSTR(to_email, LENGTH(RTRIM(to_email, REPLACE(to_email, '@', ''))) + 1)))"
+
+# Columns of a claimed row; claimed_by guards every later write to it.
+CLAIMED_FIELDS = ["id", "kind", "ref", "to_email", "subject", "body", "html_body", "attempts", "claimed_by"]
+
+# Idempotency window per action, in seconds.
+IDEMPOTENCY_WINDOWS = {
+    "invite": 24 * 3600,
+    "reference_request": 3600,
+    "reference_fanout": 300,
+}
+DEFAULT_IDEMPOTENCY_WINDOW = 600
+
+# Messages per second (rate) and burst size, overridable via EMAIL_RATE_LIMITS in secrets.
+DEFAULT_RATE_LIMITS = {
+    "global": {"rate": 10, "burst": 20},
+    "default": {"rate": 2, "burst": 5},
+}
+
+
+def ensure_outbox_table(conn: sqlite3.Connection):
+    cur = conn.cursor()
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS email_outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            ref TEXT,
+            to_email TEXT NOT NULL,
+            subject TEXT NOT NULL,
+            body TEXT NOT NULL,
+            html_body TEXT,
+            status TEXT NOT NULL DEFAULT 'queued' CHECK(status IN ('queued','sending','sent','failed')),
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT,
+            claimed_by TEXT,
+            claimed_at TEXT,
+            created_at TEXT NOT NULL,
+            sent_at TEXT
+        )
+        """
+    )
+    cur.execute("PRAGMA table_info(email_outbox)")
+    cols = [r[1] for r in cur.fetchall()]
+    if "next_attempt_at" not in cols:
+        cur.execute("ALTER TABLE email_outbox ADD COLUMN next_attempt_at TEXT")
+    if "html_body" not in cols:
+        cur.execute("ALTER TABLE email_outbox ADD COLUMN html_body TEXT")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_email_outbox_status ON email_outbox(status, id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_email_outbox_due ON email_outbox(status, next_attempt_at)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_email_outbox_ref ON email_outbox(kind, ref)")
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS email_idempotency (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            action TEXT NOT NULL,
+            tenant_id INTEGER NOT NULL,
+            recipient TEXT NOT NULL,
+            window_start INTEGER NOT NULL,
+            ref TEXT,
+            created_at TEXT NOT NULL,
+            UNIQUE(action, tenant_id, recipient, window_start)
+        )
+        """
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_email_idempotency_created ON email_idempotency(created_at)")
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS email_dead_letter (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            outbox_id INTEGER NOT NULL,
+            kind TEXT NOT NULL,
+            ref TEXT,
+            to_email TEXT NOT NULL,
+            subject TEXT NOT NULL,
+            attempts INTEGER NOT NULL,
+            last_error TEXT,
+            dead_at TEXT NOT NULL,
+            FOREIGN KEY (outbox_id) REFERENCES email_outbox(id) ON DELETE CASCADE
+        )
+        """
+    )
+    conn.commit()
+
+
+def enqueue_email(cur: sqlite3.Cursor, kind: str, ref: str | None, to_email: str, subject: str, body: str,
+                  html_body: str | None = None) -> int:
+    """Queue a message on the caller's cursor. Does NOT commit.
+
+    The caller commits together with its own write, so either both the
+    business row and the email exist, or neither does.
+    """
+    cur.execute(
+        "INSERT INTO email_outbox(kind, ref, to_email, subject, body, html_body, status, created_at) VALUES (?,?,?,?,?,?, 'queued', ?)",
+        (kind, None if ref is None else str(ref), to_email, subject, body, html_body, datetime.utcnow().isoformat()),
+    )
+    return cur.lastrowid
+
+
+def enqueue_emails(cur: sqlite3.Cursor, kind: str, messages: list[tuple]) -> None:
+    """Queue many (ref, to_email, subject, body, html_body) messages with one executemany. Does NOT commit."""
+    now = datetime.utcnow().isoformat()
+    cur.executemany(
+        "INSERT INTO email_outbox(kind, ref, to_email, subject, body, html_body, status, created_at) VALUES (?,?,?,?,?,?, 'queued', ?)",
+        [(kind, None if ref is None else str(ref), to_email, subject, body, html_body, now)
+         for ref, to_email, subject, body, html_body in messages],
+    )
+
+
+def claim_idempotency_key(cur: sqlite3.Cursor, action: str, tenant_id: int, recipient: str,
+                          ref: str | None = None, window_seconds: int | None = None) -> tuple[bool, str | None]:
+    """Reserve (action, tenant, recipient) on the caller's cursor. Does NOT commit.
+
+    Returns (True, ref) the first time, and (False, ref_of_the_first_call)
+    for every repeat within `window_seconds` of it. Call it before the business write so
+    the reservation and the write commit (or roll back) together.
+    """
+    window = window_seconds or IDEMPOTENCY_WINDOWS.get(action, DEFAULT_IDEMPOTENCY_WINDOW)
+    now = datetime.utcnow()
+    since = (now - timedelta(seconds=window)).isoformat()
+    recipient = (recipient or "").strip().lower()
+    # One statement, so the check and the reservation happen under the same write lock.
+    # window_start is the claim second; the unique index also folds same-second repeats.
+    cur.execute(
+        "INSERT OR IGNORE INTO email_idempotency(action, tenant_id, recipient, window_start, ref, created_at) "
+        "SELECT ?,?,?,?,?,? WHERE NOT EXISTS ("
+        "    SELECT 1 FROM email_idempotency WHERE action=? AND tenant_id=? AND recipient=? AND created_at >= ?)",
+        (action, tenant_id, recipient, int(now.timestamp()), ref, now.isoformat(),
+         action, tenant_id, recipient, since),
+    )
+    if cur.rowcount == 1:
+        return True, ref
+    cur.execute(
+        "SELECT ref FROM email_idempotency WHERE action=? AND tenant_id=? AND recipient=? "
+        "ORDER BY created_at DESC LIMIT 1",
+        (action, tenant_id, recipient),
+    )
+    row = cur.fetchone()
+    return False, (row[0] if row else None)
+
+
+def release_idempotency_key(cur: sqlite3.Cursor, action: str, tenant_id: int, recipient: str):
+    """Drop the reservation so the next claim goes through (its work was undone). Does NOT commit."""
+    cur.execute(
+        "DELETE FROM email_idempotency WHERE action=? AND tenant_id=? AND recipient=?",
+        (action, tenant_id, (recipient or "").strip().lower()),
+    )
+
+
+def prune_idempotency_keys(conn: sqlite3.Connection, older_than_seconds: int = 2 * 24 * 3600) -> int:
+    cutoff = (datetime.utcnow() - timedelta(seconds=older_than_seconds)).isoformat()
+    cur = conn.execute("DELETE FROM email_idempotency WHERE created_at < ?", (cutoff,))
+    conn.commit()
+    return cur.rowcount
+
+
+def claim_batch(conn: sqlite3.Connection, limit: int, lease_seconds: int = 300,
+                domain: str | None = None) -> list[dict]:
+    """Atomically move up to `limit` queued rows to 'sending' for this caller.
+
+    Only rows whose backoff has elapsed (and, if given, addressed to
+    `domain`) are eligible. Rows stuck in 'sending' longer than the lease
+    (a worker died mid-send) are put back in the queue first.
+    """
+    now = datetime.utcnow()
+    claim_id = uuid4().hex
+    cur = conn.cursor()
+    cur.execute(
+        "UPDATE email_outbox SET status='queued', claimed_by=NULL WHERE status='sending' AND claimed_at < ?",
+        ((now - timedelta(seconds=lease_seconds)).isoformat(),),
+    )
+    cur.execute(
+        f"""
+        UPDATE email_outbox
+           SET status='sending', claimed_by=?, claimed_at=?, attempts=attempts+1
+         WHERE id IN (
+               SELECT id FROM email_outbox
+                WHERE status='queued' AND (next_attempt_at IS NULL OR next_attempt_at <= ?)
+                  AND (? IS NULL OR {DOMAIN_SQL} = ?)
+                ORDER BY id LIMIT ?
+         )
+        """,
+        (claim_id, now.isoformat(), now.isoformat(), domain, domain, limit),
+    )
+    conn.commit()
+    cur.execute(
+        f"SELECT {', '.join(CLAIMED_FIELDS)} FROM email_outbox WHERE claimed_by=? ORDER BY id",
+        (claim_id,),
+    )
+    return [dict(zip(CLAIMED_FIELDS, row)) for row in cur.fetchall()]
+
+
+def claim_refs(conn: sqlite3.Connection, kind: str, refs: list[str]) -> list[dict]:
+    """Claim the queued rows for specific business keys (e.g. tokens just created).
+
+    Rows a worker already picked up are skipped; the worker will finish them.
+    """
+    if not refs:
+        return []
+    claim_id = uuid4().hex
+    marks = ",".join("?" * len(refs))
+    cur = conn.cursor()
+    cur.execute(
+        f"""
+        UPDATE email_outbox
+           SET status='sending', claimed_by=?, claimed_at=?, attempts=attempts+1
+         WHERE kind=? AND status='queued' AND ref IN ({marks})
+        """,
+        (claim_id, datetime.utcnow().isoformat(), kind, *[str(r) for r in refs]),
+    )
+    conn.commit()
+    cur.execute(
+        f"SELECT {', '.join(CLAIMED_FIELDS)} FROM email_outbox WHERE claimed_by=? ORDER BY id",
+        (claim_id,),
+    )
+    return [dict(zip(CLAIMED_FIELDS, row)) for row in cur.fetchall()]
+
+
+def send_claimed(conn: sqlite3.Connection, rows: list[dict], smtp: dict, max_workers: int = 8,
+                 scheduler: "DomainScheduler | None" = None) -> dict:
+    """Deliver claimed rows concurrently and record each result.
+
+    SMTP runs on a bounded thread pool; SQLite is only touched from the
+    calling thread. Outcomes are fed back to `scheduler` so it can adapt
+    per-domain rates. Returns {"sent", "failed", "retried", "deferred", "lost", "errors", "retries"}.
+
+    `failed`/`errors` are rows that will not be sent again (dead-lettered);
+    `retried`/`retries` were rescheduled and are still queued, like the
+    `deferred` rows given back while the host's breaker is open. `lost` rows
+    were re-claimed by another worker after this claim's lease ran out; their
+    result is not recorded here (a send still counts in `sent`).
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    summary = {"sent": 0, "failed": 0, "retried": 0, "deferred": 0, "lost": 0, "errors": {}, "retries": {}}
+    if not rows:
+        return summary
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(rows))) as pool:
+        results = list(pool.map(lambda r: deliver(r, smtp), rows))
+    for row, (outcome, msg) in zip(rows, results):
+        if scheduler is not None:
+            scheduler.record(row["to_email"], outcome)
+        if outcome == "sent":
+            recorded = mark_sent(conn, row)
+            summary["sent"] += 1
+        elif outcome == "deferred":
+            recorded = release(conn, row)
+            summary["deferred"] += 1
+        else:
+            dead = record_failure(conn, row, msg, permanent=(outcome == "dead"))
+            recorded = dead is not None
+            if dead:
+                summary["failed"] += 1
+                summary["errors"][row["ref"]] = msg
+            elif recorded:
+                summary["retried"] += 1
+                summary["retries"][row["ref"]] = msg
+        if not recorded:
+            summary["lost"] += 1
+    return summary
+
+
+def backoff_delay(attempt: int, base: float = BACKOFF_BASE_SECONDS, cap: float = BACKOFF_CAP_SECONDS) -> float:
+    """Full-jitter exponential backoff: uniform(0, min(cap, base * 2**(attempt-1)))."""
+    return random.uniform(0, min(cap, base * (2 ** max(0, attempt - 1))))
+
+
+def release(conn: sqlite3.Connection, row: dict) -> bool:
+    """Give a claimed row back without counting an attempt (breaker was open). False if no longer ours."""
+    cur = conn.execute(
+        "UPDATE email_outbox SET status='queued', claimed_by=NULL, attempts=MAX(0, attempts-1) "
+        "WHERE id=? AND claimed_by=?",
+        (row["id"], row["claimed_by"]),
+    )
+    conn.commit()
+    return cur.rowcount == 1
+
+
+def record_failure(conn: sqlite3.Connection, row: dict, error: str, permanent: bool = False,
+                   max_attempts: int = MAX_ATTEMPTS) -> bool | None:
+    """Schedule a retry, or dead-letter the row when it is permanent or out of attempts.
+
+    True if dead-lettered, False if rescheduled, None when the row was
+    re-claimed after this claim's lease ran out (nothing is written).
+    """
+    if permanent or row["attempts"] >= max_attempts:
+        return True if mark_failed(conn, row, error) else None
+    retry_at = datetime.utcnow() + timedelta(seconds=backoff_delay(row["attempts"]))
+    cur = conn.execute(
+        "UPDATE email_outbox SET status='queued', claimed_by=NULL, last_error=?, next_attempt_at=? "
+        "WHERE id=? AND claimed_by=?",
+        (error, retry_at.isoformat(), row["id"], row["claimed_by"]),
+    )
+    conn.commit()
+    return False if cur.rowcount == 1 else None
+
+
+def mark_sent(conn: sqlite3.Connection, row: dict) -> bool:
+    """False if the row was re-claimed after this claim's lease ran out."""
+    cur = conn.execute(
+        "UPDATE email_outbox SET status='sent', sent_at=?, last_error=NULL WHERE id=? AND claimed_by=?",
+        (datetime.utcnow().isoformat(), row["id"], row["claimed_by"]),
+    )
+    conn.commit()
+    return cur.rowcount == 1
+
+
+def mark_failed(conn: sqlite3.Connection, row: dict, error: str) -> bool:
+    """Mark the row failed and copy it to the dead-letter table in one transaction. False if no longer ours."""
+    now = datetime.utcnow().isoformat()
+    cur = conn.cursor()
+    cur.execute(
+        "UPDATE email_outbox SET status='failed', last_error=?, claimed_by=NULL WHERE id=? AND claimed_by=?",
+        (error, row["id"], row["claimed_by"]),
+    )
+    if cur.rowcount != 1:
+        conn.commit()
+        return False
+    cur.execute(
+        """
+        INSERT INTO email_dead_letter(outbox_id, kind, ref, to_email, subject, attempts, last_error, dead_at)
+        SELECT id, kind, ref, to_email, subject, attempts, ?, ? FROM email_outbox WHERE id=?
+        """,
+        (error, now, row["id"]),
+    )
+    conn.commit()
+    return True
+
+
+def list_dead_letters(conn: sqlite3.Connection, limit: int = 200):
+    return conn.execute(
+        "SELECT id, outbox_id, kind, ref, to_email, subject, attempts, last_error, dead_at "
+        "FROM email_dead_letter ORDER BY id DESC LIMIT ?",
+        (limit,),
+    ).fetchall()
+
+
+def replay_dead_letter(conn: sqlite3.Connection, dead_id: int | None = None) -> int:
+    """Requeue one dead letter (or all of them when dead_id is None). Returns rows requeued."""
+    where, args = ("WHERE id=?", (dead_id,)) if dead_id is not None else ("", ())
+    cur = conn.cursor()
+    cur.execute(
+        f"""
+        UPDATE email_outbox
+           SET status='queued', attempts=0, next_attempt_at=NULL, claimed_by=NULL
+         WHERE status='failed' AND id IN (SELECT outbox_id FROM email_dead_letter {where})
+        """,
+        args,
+    )
+    n = cur.rowcount
+    cur.execute(f"DELETE FROM email_dead_letter {where}", args)
+    conn.commit()
+    return n
+
+
+def get_email_status(conn: sqlite3.Connection, kind: str, ref: str) -> dict | None:
+    """Latest outbox row for a business key, e.g. ('reference_request', token)."""
+    row = conn.execute(
+        "SELECT id, status, attempts, last_error, created_at, sent_at FROM email_outbox "
+        "WHERE kind=? AND ref=? ORDER BY id DESC LIMIT 1",
+        (kind, str(ref)),
+    ).fetchone()
+    if not row:
+        return None
+    keys = ["id", "status", "attempts", "last_error", "created_at", "sent_at"]
+    return dict(zip(keys, row))
+
+
+def queue_depth(conn: sqlite3.Connection, due_only: bool = False) -> dict:
+    """Queued rows per recipient domain, largest first."""
+    due = " AND (next_attempt_at IS NULL OR next_attempt_at <= ?)" if due_only else ""
+    args = (datetime.utcnow().isoformat(),) if due_only else ()
+    rows = conn.execute(
+        f"SELECT {DOMAIN_SQL} AS domain, COUNT(*) AS n FROM email_outbox "
+        f"WHERE status='queued'{due} GROUP BY domain ORDER BY n DESC",
+        args,
+    ).fetchall()
+    return {domain: n for domain, n in rows}
+
+
+def outbox_counts(conn: sqlite3.Connection) -> dict:
+    counts = {s: 0 for s in OUTBOX_STATUSES}
+    for status, n in conn.execute("SELECT status, COUNT(*) FROM email_outbox GROUP BY status"):
+        counts[status] = n
+    return counts
+
+
+def deliver(row: dict, smtp: dict) -> tuple[str, str]:
+    """Send one claimed outbox row through the shared SMTP pool (or the async engine, see EMAIL_BACKEND).
+
+    Returns (outcome, message) where outcome is 'sent', 'retry' (transient
+    failure), 'dead' (permanent failure) or 'deferred' (host circuit open,
+    nothing attempted).
+    """
+    from utils_email import get_pool, get_breaker, build_message, is_permanent_error
+
+    if not all([smtp.get("host"), smtp.get("port"), smtp.get("from_email"), row.get("to_email")]):
+        return "retry", "Missing SMTP details: host, port, sender, or recipient."
+
+    breaker = get_breaker(smtp["host"])
+    if not breaker.allow():
+        return "deferred", "circuit open"
+    try:
+        msg = build_message(smtp["from_email"], row["to_email"], row["subject"], row["body"], row.get("html_body"))
+        if str(smtp.get("backend") or "").lower() == "async":
+            from utils_email_async import get_async_sender
+            sender = get_async_sender(smtp["host"], smtp["port"], smtp.get("user", ""), smtp.get("pwd", ""),
+                                      smtp.get("use_tls", True), smtp["from_email"])
+            sender.sendmail(smtp["from_email"], row["to_email"], msg.as_string()).result()
+        else:
+            pool = get_pool(smtp["host"], smtp["port"], smtp.get("user", ""), smtp.get("pwd", ""), smtp.get("use_tls", True))
+            pool.sendmail(smtp["from_email"], [row["to_email"]], msg.as_string())
+    except Exception as e:
+        if is_permanent_error(e):
+            # The server answered; it just won't take this message.
+            breaker.record_success()
+            return "dead", f"{type(e).__name__}: {e}"
+        breaker.record_failure()
+        return "retry", f"{type(e).__name__}: {e}"
+    breaker.record_success()
+    return "sent", "sent"
+
+
+# ---------- Per-domain pacing ----------
+def email_domain(address: str) -> str:
+    return (address or "").rsplit("@", 1)[-1].strip().lower()
+
+
+def load_rate_limits(secrets: dict | None) -> dict:
+    """Merge EMAIL_RATE_LIMITS from secrets over the defaults.
+
+    [EMAIL_RATE_LIMITS]
+    global = { rate = 10, burst = 20 }
+    default = { rate = 2, burst = 5 }
+    "gmail.com" = { rate = 5, burst = 10 }
+    """
+    limits = {k: dict(v) for k, v in DEFAULT_RATE_LIMITS.items()}
+    for key, cfg in dict((secrets or {}).get("EMAIL_RATE_LIMITS", {}) or {}).items():
+        limits[str(key).lower()] = {"rate": float(cfg["rate"]), "burst": float(cfg.get("burst", cfg["rate"]))}
+    return limits
+
+
+class DomainScheduler:
+    """Token buckets per recipient domain plus a global bucket.
+
+    claim() only takes rows off the queue that every relevant bucket can pay
+    for, so anything over budget simply stays queued. Transient failures
+    halve a domain's rate (greylisting / 4xx throttling); each success wins
+    back 5% of the configured rate, so every provider is driven close to
+    what it actually accepts.
+    """
+
+    def __init__(self, limits: dict | None = None):
+        self.limits = limits or load_rate_limits(None)
+        g = self.limits["global"]
+        self.global_bucket = TokenBucket(g["rate"], g["burst"])
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._offset = 0
+
+    def _configured(self, domain: str) -> dict:
+        return self.limits.get(domain) or self.limits["default"]
+
+    def bucket(self, domain: str) -> TokenBucket:
+        with self._lock:
+            b = self._buckets.get(domain)
+            if b is None:
+                cfg = self._configured(domain)
+                b = TokenBucket(cfg["rate"], cfg["burst"])
+                self._buckets[domain] = b
+            return b
+
+    def admit(self, rows: list[dict]) -> tuple[list[dict], list[dict]]:
+        """Split already-claimed rows into (send now, hold back), spending tokens for the first."""
+        allowed, held = [], []
+        for row in rows:
+            b = self.bucket(email_domain(row["to_email"]))
+            if b.available() >= 1 and self.global_bucket.try_acquire():
+                b.try_acquire()
+                allowed.append(row)
+            else:
+                held.append(row)
+        return allowed, held
+
+    def claim(self, conn: sqlite3.Connection, max_rows: int) -> list[dict]:
+        """Claim up to max_rows due rows, never more than the buckets allow."""
+        due = list(queue_depth(conn, due_only=True).items())
+        if not due:
+            return []
+        # Rotate the starting domain so a deep queue cannot starve the others of global tokens.
+        self._offset = (self._offset + 1) % len(due)
+        due = due[self._offset:] + due[:self._offset]
+
+        rows = []
+        for domain, depth in due:
+            budget = min(depth, self.bucket(domain).available(), self.global_bucket.available(), max_rows - len(rows))
+            if budget <= 0:
+                continue
+            claimed = claim_batch(conn, budget, domain=domain)
+            for row in claimed:
+                self.bucket(domain).try_acquire()
+                self.global_bucket.try_acquire()
+            rows.extend(claimed)
+            if len(rows) >= max_rows:
+                break
+        return rows
+
+    def seconds_until_next(self, conn: sqlite3.Connection) -> float:
+        """How long until some domain with due mail has a token again."""
+        waits = [
+            max(self.bucket(domain).seconds_until(), self.global_bucket.seconds_until())
+            for domain in queue_depth(conn, due_only=True)
+        ]
+        return min(waits) if waits else 0.0
+
+    def record(self, to_email: str, outcome: str):
+        domain = email_domain(to_email)
+        b = self.bucket(domain)
+        configured = self._configured(domain)["rate"]
+        with self._lock:
+            if outcome == "retry":
+                b.set_rate(max(configured * 0.05, b.rate * 0.5))
+            elif outcome == "sent" and b.rate < configured:
+                b.set_rate(min(configured, b.rate + configured * 0.05))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {domain: round(b.rate, 3) for domain, b in self._buckets.items()}
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler(secrets: dict | None = None) -> DomainScheduler:
+    """Process-wide scheduler, so all sessions share the same buckets."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = DomainScheduler(load_rate_limits(secrets))
+        return _scheduler
@@ -0,0 +1,300 @@
+"""Rate limiting primitives.
+
+TokenBucket paces outgoing mail (utils_outbox.DomainScheduler).
+
+RateLimiter guards user-facing actions (the reference portal, sign-in,
+uploads, invitation emails) with per-action sliding-window limits. Its
+counters live in a MemoryStore (one process) or a SQLiteStore (shared by
+every app process). Allowed and blocked hits are counted per action for the
+admin dashboard.
+"""
+import os
+import sqlite3
+import threading
+import time
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, holding at most `burst`.
+
+    Thread-safe. The rate may be lowered and raised at runtime with set_rate
+    (see utils_outbox.DomainScheduler) without losing the current fill level.
+    """
+
+    def __init__(self, rate: float, burst: float | None = None):
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1.0, rate))
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def set_rate(self, rate: float):
+        """Change the rate; tokens accrued so far are credited at the old one."""
+        with self._lock:
+            self._refill()
+            self.rate = float(rate)
+
+    def available(self) -> int:
+        with self._lock:
+            self._refill()
+            return int(self._tokens)
+
+    def try_acquire(self, n: float = 1) -> bool:
+        with self._lock:
+            self._refill()
+            if self._tokens >= n:
+                self._tokens -= n
+                return True
+            return False
+
+    def seconds_until(self, n: float = 1) -> float:
+        """How long until `n` tokens are available (0 if they already are)."""
+        with self._lock:
+            self._refill()
+            missing = n - self._tokens
+            if missing <= 0:
+                return 0.0
+            return missing / self.rate if self.rate > 0 else float("inf")
+
+
+# ---------- Sliding-window limits per action ----------
+# action -> {"limit": hits, "window": seconds}; override with [RATE_LIMITS] in secrets.
+DEFAULT_LIMITS = {
+    "portal": {"limit": 30, "window": 60},            # ?ref= page loads per client IP
+    "portal_anonymous": {"limit": 600, "window": 60}, # ?ref= page loads from clients with no address, all together
+    "login_account": {"limit": 5, "window": 900},     # failed sign-ins per account
+    "login_ip": {"limit": 20, "window": 900},         # failed sign-ins per client IP
+    "upload": {"limit": 10, "window": 3600},          # contract uploads per user
+    "invite": {"limit": 20, "window": 3600},          # invitation emails per tenant
+    "reference_request": {"limit": 20, "window": 3600},
+}
+
+
+def load_limits(secrets: dict | None) -> dict:
+    """Merge RATE_LIMITS from secrets over the defaults.
+
+    [RATE_LIMITS]
+    portal = { limit = 60, window = 60 }
+    """
+    limits = {k: dict(v) for k, v in DEFAULT_LIMITS.items()}
+    for action, cfg in dict((secrets or {}).get("RATE_LIMITS", {}) or {}).items():
+        limits[str(action)] = {"limit": int(cfg["limit"]), "window": float(cfg.get("window", 60))}
+    return limits
+
+
+class MemoryStore:
+    """Per-process counters: (action, key, window_start) -> hits."""
+
+    prune_interval = 60.0
+
+    def __init__(self):
+        self._counts = {}
+        self._windows = {}  # action -> window; each counter ages out by its own action's window
+        self._lock = threading.Lock()
+        self._pruned_at = time.time()
+
+    def _prune(self, now: float):
+        if now - self._pruned_at < self.prune_interval:
+            return
+        self._counts = {k: v for k, v in self._counts.items() if now - k[2] < 2 * self._windows[k[0]]}
+        self._pruned_at = now
+
+    def add(self, action: str, key: str, window: float, limit: int, cost: int, now: float,
+            record: bool = True) -> tuple[bool, float, float]:
+        start = now - now % window
+        with self._lock:
+            self._windows[action] = max(window, self._windows.get(action, 0))
+            self._prune(now)
+            curr = self._counts.get((action, key, start), 0)
+            prev = self._counts.get((action, key, start - window), 0)
+            allowed, estimate, retry = _decide(curr, prev, now - start, window, limit, cost)
+            if allowed and record:
+                self._counts[(action, key, start)] = curr + cost
+            return allowed, estimate, retry
+
+    def reset(self, action: str, key: str):
+        with self._lock:
+            for k in [k for k in self._counts if k[0] == action and k[1] == key]:
+                del self._counts[k]
+
+
+class SQLiteStore:
+    """Counters shared by every app process through one SQLite file.
+
+    Each decision is one BEGIN IMMEDIATE transaction, so concurrent processes
+    cannot both take the last slot.
+    """
+
+    def __init__(self, path: str, timeout: float = 5.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL;")
+            conn.execute("PRAGMA synchronous=NORMAL;")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS rate_limit_counters (
+                    action TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    window_start REAL NOT NULL,
+                    hits INTEGER NOT NULL,
+                    PRIMARY KEY (action, key, window_start)
+                ) WITHOUT ROWID
+                """
+            )
+            self._local.conn = conn
+            self.prune()
+        return conn
+
+    def add(self, action: str, key: str, window: float, limit: int, cost: int, now: float,
+            record: bool = True) -> tuple[bool, float, float]:
+        start = now - now % window
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = dict(conn.execute(
+                "SELECT window_start, hits FROM rate_limit_counters WHERE action=? AND key=? AND window_start IN (?, ?)",
+                (action, key, start, start - window),
+            ).fetchall())
+            allowed, estimate, retry = _decide(rows.get(start, 0), rows.get(start - window, 0),
+                                               now - start, window, limit, cost)
+            if allowed and record:
+                conn.execute(
+                    "INSERT INTO rate_limit_counters(action, key, window_start, hits) VALUES (?,?,?,?) "
+                    "ON CONFLICT(action, key, window_start) DO UPDATE SET hits = hits + excluded.hits",
+                    (action, key, start, cost),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return allowed, estimate, retry
+
+    def reset(self, action: str, key: str):
+        self._conn().execute("DELETE FROM rate_limit_counters WHERE action=? AND key=?", (action, key))
+
+    def prune(self, older_than_seconds: float = 2 * 86400) -> int:
+        cur = self._conn().execute("DELETE FROM rate_limit_counters WHERE window_start < ?",
+                                   (time.time() - older_than_seconds,))
+        return cur.rowcount
+
+
+def _decide(curr: int, prev: int, elapsed: float, window: float, limit: int, cost: int) -> tuple[bool, float, float]:
+    """Sliding-window counter: the previous window counts in proportion to its overlap.
+
+    Returns (allowed, estimated hits in the last `window` seconds, seconds until allowed).
+    """
+    weight = 1.0 - elapsed / window
+    estimate = prev * weight + curr
+    if estimate + cost <= limit:
+        return True, estimate, 0.0
+    if curr + cost > limit or prev == 0:
+        # Even with the previous window fully aged out this one is full.
+        return False, estimate, window - elapsed
+    # Time until the previous window's share has decayed enough.
+    return False, estimate, min(window - elapsed, (estimate + cost - limit) * window / prev)
+
+
+class RateLimiter:
+    """Per-action sliding-window limits over a MemoryStore or SQLiteStore, with hit metrics."""
+
+    def __init__(self, store=None, limits: dict | None = None):
+        self.store = store or MemoryStore()
+        self.limits = limits or {k: dict(v) for k, v in DEFAULT_LIMITS.items()}
+        self.metrics = {}  # action -> {"allowed": n, "blocked": n}
+        self._lock = threading.Lock()
+
+    def _count(self, action: str, outcome: str):
+        with self._lock:
+            m = self.metrics.setdefault(action, {"allowed": 0, "blocked": 0})
+            m[outcome] += 1
+
+    def hit(self, action: str, key: str, cost: int = 1) -> tuple[bool, float]:
+        """Record one hit. Returns (allowed, retry_after_seconds); blocked hits are not counted."""
+        cfg = self.limits.get(action)
+        if not cfg:
+            return True, 0.0
+        allowed, _, retry = self.store.add(action, str(key), cfg["window"], cfg["limit"], cost, time.time())
+        self._count(action, "allowed" if allowed else "blocked")
+        return allowed, retry
+
+    def check(self, action: str, key: str) -> float:
+        """Seconds until `action` is allowed for `key` (0 if it is allowed now). Records nothing."""
+        cfg = self.limits.get(action)
+        if not cfg:
+            return 0.0
+        allowed, _, retry = self.store.add(action, str(key), cfg["window"], cfg["limit"], 1, time.time(), record=False)
+        return 0.0 if allowed else retry
+
+    def reset(self, action: str, key: str):
+        self.store.reset(action, str(key))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {action: dict(m) for action, m in self.metrics.items()}
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def trusted_proxy_count(secrets: dict | None) -> int:
+    """TRUSTED_PROXIES: how many reverse proxies in front of the app add an X-Forwarded-For hop (default 0)."""
+    try:
+        return max(0, int((secrets or {}).get("TRUSTED_PROXIES", 0)))
+    except (TypeError, ValueError):
+        return 0
+
+
+def throttle_key(action: str, address: str | None) -> tuple[str, str]:
+    """(action, key) for a per-address limit.
+
+    Clients with no address share one fixed `<action>_anonymous` bucket with
+    its own, higher limit, instead of the per-client one.
+    """
+    return (action, address) if address else (f"{action}_anonymous", "anonymous")
+
+
+def client_address(headers, peer: str | None = None, trusted_proxies: int = 0) -> str | None:
+    """Client address for throttling.
+
+    The socket peer, unless `trusted_proxies` reverse proxies sit in front of
+    the app: then the rightmost X-Forwarded-For hop they did not add. Hops to
+    the left of it come from the client and are never used as a key.
+    """
+    if trusted_proxies <= 0:
+        return peer or None
+    try:
+        forwarded = headers.get("X-Forwarded-For") or ""
+    except Exception:
+        forwarded = ""
+    hops = [h.strip() for h in forwarded.split(",") if h.strip()]
+    if not hops:
+        return peer or None
+    return hops[-min(trusted_proxies, len(hops))]
+
+
+def get_rate_limiter(secrets: dict | None = None) -> RateLimiter:
+    """Process-wide limiter. RATE_LIMIT_STORE = "sqlite" shares counters via RATE_LIMIT_DB."""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            sec = secrets or {}
+            if str(sec.get("RATE_LIMIT_STORE", "memory")).lower() == "sqlite":
+                store = SQLiteStore(str(sec.get("RATE_LIMIT_DB", "data/ratelimit.db")))
+            else:
+                store = MemoryStore()
+            _limiter = RateLimiter(store, load_limits(sec))
+        return _limiter
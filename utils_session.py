@@ -0,0 +1,123 @@
+"""Signed, expiring session cookies.
+
+A sign-in issues a token that carries the user's id, email, name and role plus
+a random session id (sid), signed with itsdangerous. A new tab or a reload
+restores the session from the cookie by checking the signature and age alone,
+with no users lookup and no password hash.
+
+Sign-out revokes the sid. Revoked sids live in the `session_revocations` table
+so every app process sees them. Each process keeps an in-memory copy that is
+re-read at most every `refresh_seconds`, so verifying stays off the database.
+"""
+import json
+import secrets as _secrets
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+
+from rentright.config import signing_key
+
+
+SESSION_COOKIE = "rr_session"
+SESSION_MAX_AGE = 14 * 24 * 3600
+
+
+def ensure_session_table(conn: sqlite3.Connection):
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS session_revocations (
+            sid TEXT PRIMARY KEY,
+            revoked_at TEXT NOT NULL,
+            expires_at TEXT NOT NULL
+        )
+        """
+    )
+    conn.commit()
+
+
+class SessionManager:
+    def __init__(self, secret_key: str, max_age: int = SESSION_MAX_AGE, refresh_seconds: float = 30.0):
+        self.max_age = max_age
+        self.refresh_seconds = refresh_seconds
+        self._serializer = URLSafeTimedSerializer(secret_key, salt="rentright-session")
+        self._revoked = set()
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def issue(self, user: dict) -> str:
+        payload = {k: user[k] for k in ("id", "email", "name", "role")}
+        payload["sid"] = _secrets.token_urlsafe(12)
+        return self._serializer.dumps(payload)
+
+    def verify(self, token: str | None, conn: sqlite3.Connection | None = None) -> dict | None:
+        """Return the session payload, or None if the token is forged, expired or revoked."""
+        if not token:
+            return None
+        try:
+            payload = self._serializer.loads(token, max_age=self.max_age)
+        except (SignatureExpired, BadSignature):
+            return None
+        if conn is not None:
+            self._refresh(conn)
+        if payload.get("sid") in self._revoked:
+            return None
+        return payload
+
+    def revoke(self, sid: str, conn: sqlite3.Connection | None = None):
+        with self._lock:
+            self._revoked.add(sid)
+        if conn is not None:
+            now = datetime.utcnow()
+            conn.execute(
+                "INSERT OR IGNORE INTO session_revocations(sid, revoked_at, expires_at) VALUES (?,?,?)",
+                (sid, now.isoformat(), (now + timedelta(seconds=self.max_age)).isoformat()),
+            )
+            conn.commit()
+
+    def _refresh(self, conn: sqlite3.Connection):
+        if time.monotonic() - self._loaded_at < self.refresh_seconds:
+            return
+        now = datetime.utcnow().isoformat()
+        try:
+            conn.execute("DELETE FROM session_revocations WHERE expires_at < ?", (now,))
+            conn.commit()
+            sids = {row[0] for row in conn.execute("SELECT sid FROM session_revocations")}
+        except sqlite3.Error:
+            return
+        with self._lock:
+            self._revoked |= sids
+            self._loaded_at = time.monotonic()
+
+
+_managers = {}
+
+
+def get_session_manager(secrets: dict | None = None, max_age: int = SESSION_MAX_AGE) -> SessionManager:
+    key = signing_key(secrets)
+    manager = _managers.get((key, max_age))
+    if manager is None:
+        manager = _managers[(key, max_age)] = SessionManager(key, max_age)
+    return manager
+
+
+def cookie_script(name: str, value: str | None, max_age: int = SESSION_MAX_AGE) -> str:
+    """JS that sets (or, with value=None, clears) a cookie on the app's top-level page.
+
+    Runs inside a components.html iframe, which shares the app's origin.
+    Cookies set from JS cannot be HttpOnly; they are signed, not secret.
+    """
+    if value is None:
+        attrs = "Max-Age=0"
+        value = ""
+    else:
+        attrs = f"Max-Age={int(max_age)}"
+    return (
+        "<script>"
+        "const secure = window.parent.location.protocol === 'https:' ? '; Secure' : '';"
+        f"window.parent.document.cookie = {json.dumps(name)} + '=' + {json.dumps(value)}"
+        f" + '; Path=/; SameSite=Lax; {attrs}' + secure;"
+        "</script>"
+    )
@@ -0,0 +1,210 @@
+"""Precompiled, multilingual email templates.
+
+Each template has a subject, a plain-text body and an HTML body per language.
+They use a tiny mustache-like syntax:
+
+    {name}              value of `name` (HTML-escaped in the html part)
+    {#name}...{/name}   section: skipped if falsy, repeated for each item if
+                        `name` is a list of dicts, rendered once otherwise
+
+A (template, language) pair is parsed once per process (lru_cache); rendering
+only walks the pre-split static/variable segments, so fan-out sends of
+thousands of messages never re-parse anything.
+"""
+import html
+import re
+from functools import lru_cache
+
+
+LANG_CODES = {"English": "en", "Ελληνικά": "el"}
+DEFAULT_LANG = "en"
+
+_TOKEN = re.compile(r"\{([#/]?)(\w+)\}")
+
+
+TEMPLATES = {
+    "invite": {
+        "en": {
+            "subject": "{tenant_name} would like to connect with you on RentRight",
+            "text": (
+                "Hello,\n\n"
+                "{tenant_name} ({tenant_email}) has added you as a future landlord on RentRight.\n"
+                "{#join_link}You can sign in or create an account here: {join_link}\n\n{/join_link}"
+                "Thank you."
+            ),
+            "html": (
+                "<p>Hello,</p>"
+                "<p><strong>{tenant_name}</strong> ({tenant_email}) has added you as a future landlord on RentRight.</p>"
+                "{#join_link}<p><a href=\"{join_link}\">Sign in or create an account</a></p>{/join_link}"
+                "<p>Thank you.</p>"
+            ),
+        },
+        "el": {
+            "subject": "Ο/Η {tenant_name} θέλει να συνδεθεί μαζί σας στο RentRight",
+            "text": (
+                "Γεια σας,\n\n"
+                "Ο/Η {tenant_name} ({tenant_email}) σας πρόσθεσε ως μελλοντικό ιδιοκτήτη στο RentRight.\n"
+                "{#join_link}Μπορείτε να συνδεθείτε ή να δημιουργήσετε λογαριασμό εδώ: {join_link}\n\n{/join_link}"
+                "Ευχαριστούμε."
+            ),
+            "html": (
+                "<p>Γεια σας,</p>"
+                "<p>Ο/Η <strong>{tenant_name}</strong> ({tenant_email}) σας πρόσθεσε ως μελλοντικό ιδιοκτήτη στο RentRight.</p>"
+                "{#join_link}<p><a href=\"{join_link}\">Σύνδεση ή δημιουργία λογαριασμού</a></p>{/join_link}"
+                "<p>Ευχαριστούμε.</p>"
+            ),
+        },
+    },
+    "reference_request": {
+        "en": {
+            "subject": "Reference Request for Tenant {tenant_name}",
+            "text": (
+                "Hello,\n\n"
+                "{tenant_name} ({tenant_email}) listed you as a previous landlord and is requesting a short reference.\n"
+                "Please confirm and complete the form here: {link}\n\n"
+                "Thank you!"
+            ),
+            "html": (
+                "<p>Hello,</p>"
+                "<p><strong>{tenant_name}</strong> ({tenant_email}) listed you as a previous landlord "
+                "and is requesting a short reference.</p>"
+                "<p><a href=\"{link}\">Confirm and complete the form</a></p>"
+                "<p>Thank you!</p>"
+            ),
+        },
+        "el": {
+            "subject": "Αίτημα Σύστασης για τον Ενοικιαστή {tenant_name}",
+            "text": (
+                "Γεια σας,\n\n"
+                "Ο/Η {tenant_name} ({tenant_email}) σας δήλωσε ως προηγούμενο ιδιοκτήτη και ζητά μια σύντομη σύσταση.\n"
+                "Παρακαλούμε επιβεβαιώστε και συμπληρώστε τη φόρμα εδώ: {link}\n\n"
+                "Ευχαριστούμε!"
+            ),
+            "html": (
+                "<p>Γεια σας,</p>"
+                "<p>Ο/Η <strong>{tenant_name}</strong> ({tenant_email}) σας δήλωσε ως προηγούμενο ιδιοκτήτη "
+                "και ζητά μια σύντομη σύσταση.</p>"
+                "<p><a href=\"{link}\">Επιβεβαίωση και συμπλήρωση φόρμας</a></p>"
+                "<p>Ευχαριστούμε!</p>"
+            ),
+        },
+    },
+    "reference_digest": {
+        "en": {
+            "subject": "Reminder: {count} tenant reference request(s) waiting for you",
+            "text": (
+                "Hello,\n\n"
+                "The following tenants are still waiting for your reference on RentRight:\n\n"
+                "{#items}- {tenant_name} ({tenant_email}), requested {requested_on}: {link}\n{/items}\n"
+                "Each form takes about a minute. Thank you!"
+            ),
+            "html": (
+                "<p>Hello,</p>"
+                "<p>The following tenants are still waiting for your reference on RentRight:</p>"
+                "<ul>{#items}<li><strong>{tenant_name}</strong> ({tenant_email}), requested {requested_on}: "
+                "<a href=\"{link}\">complete the form</a></li>{/items}</ul>"
+                "<p>Each form takes about a minute. Thank you!</p>"
+            ),
+        },
+        "el": {
+            "subject": "Υπενθύμιση: {count} αιτήματα σύστασης σας περιμένουν",
+            "text": (
+                "Γεια σας,\n\n"
+                "Οι παρακάτω ενοικιαστές περιμένουν ακόμα τη σύστασή σας στο RentRight:\n\n"
+                "{#items}- {tenant_name} ({tenant_email}), αίτημα από {requested_on}: {link}\n{/items}\n"
+                "Κάθε φόρμα χρειάζεται περίπου ένα λεπτό. Ευχαριστούμε!"
+            ),
+            "html": (
+                "<p>Γεια σας,</p>"
+                "<p>Οι παρακάτω ενοικιαστές περιμένουν ακόμα τη σύστασή σας στο RentRight:</p>"
+                "<ul>{#items}<li><strong>{tenant_name}</strong> ({tenant_email}), αίτημα από {requested_on}: "
+                "<a href=\"{link}\">συμπλήρωση φόρμας</a></li>{/items}</ul>"
+                "<p>Κάθε φόρμα χρειάζεται περίπου ένα λεπτό. Ευχαριστούμε!</p>"
+            ),
+        },
+    },
+}
+
+
+def lang_code(lang: str | None) -> str:
+    """Accept either the UI language label ('Ελληνικά') or a code ('el')."""
+    if not lang:
+        return DEFAULT_LANG
+    return LANG_CODES.get(lang, lang if lang in LANG_CODES.values() else DEFAULT_LANG)
+
+
+def _parse(source: str) -> tuple:
+    """Split a template into a tree of static strings, ('var', name) and ('section', name, children)."""
+    root = []
+    stack = [(None, root)]
+    pos = 0
+    for m in _TOKEN.finditer(source):
+        if m.start() > pos:
+            stack[-1][1].append(source[pos:m.start()])
+        kind, name = m.group(1), m.group(2)
+        if kind == "#":
+            children = []
+            stack[-1][1].append(("section", name, children))
+            stack.append((name, children))
+        elif kind == "/":
+            if stack[-1][0] != name:
+                raise ValueError(f"Unbalanced section {{/{name}}}")
+            stack.pop()
+        else:
+            stack[-1][1].append(("var", name))
+        pos = m.end()
+    if len(stack) != 1:
+        raise ValueError(f"Unclosed section {{#{stack[-1][0]}}}")
+    if pos < len(source):
+        root.append(source[pos:])
+    return _freeze(root)
+
+
+def _freeze(nodes: list) -> tuple:
+    """Merge adjacent static strings and make the tree immutable (safe to share between threads)."""
+    out = []
+    for node in nodes:
+        if isinstance(node, tuple) and node[0] == "section":
+            node = ("section", node[1], _freeze(node[2]))
+        if isinstance(node, str) and out and isinstance(out[-1], str):
+            out[-1] += node
+        else:
+            out.append(node)
+    return tuple(out)
+
+
+def _render(nodes: tuple, ctx: dict, escape, out: list):
+    for node in nodes:
+        if isinstance(node, str):
+            out.append(node)
+        elif node[0] == "var":
+            value = ctx.get(node[1], "")
+            out.append(escape(str(value if value is not None else "")))
+        else:
+            value = ctx.get(node[1])
+            if not value:
+                continue
+            if isinstance(value, (list, tuple)):
+                for item in value:
+                    _render(node[2], {**ctx, **item} if isinstance(item, dict) else ctx, escape, out)
+            else:
+                _render(node[2], ctx, escape, out)
+
+
+@lru_cache(maxsize=None)
+def compile_template(name: str, lang: str) -> dict:
+    """Parse one template/language once per process; falls back to English."""
+    variants = TEMPLATES[name]
+    source = variants.get(lang) or variants[DEFAULT_LANG]
+    return {part: _parse(text) for part, text in source.items()}
+
+
+def render(name: str, lang: str | None, **ctx) -> tuple[str, str, str]:
+    """Return (subject, text, html) for a template in the given language."""
+    compiled = compile_template(name, lang_code(lang))
+    parts = {}
+    for part, nodes in compiled.items():
+        out = []
+        _render(nodes, ctx, html.escape if part == "html" else str, out)
+        parts[part] = "".join(out)
+    return parts["subject"], parts["text"], parts["html"]
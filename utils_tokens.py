@@ -0,0 +1,76 @@
+"""Signed, expiring reference links.
+
+The `?ref=` value in a reference link is the request's token, signed and
+timestamped with itsdangerous. The public portal checks the signature and age
+before it touches SQLite, so forged, mangled and expired links are rejected
+with pure CPU.
+
+Links mailed before signing was introduced carry the bare 32-hex token. Those
+skip the signature and age check, so they are rejected unless secrets turn
+them on explicitly, with an end date, for the transition:
+
+    ALLOW_LEGACY_TOKENS = true
+    LEGACY_TOKENS_UNTIL = "2026-12-31"
+"""
+import re
+from datetime import date
+
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+
+
+REFERENCE_LINK_MAX_AGE = 30 * 24 * 3600
+
+_LEGACY_TOKEN = re.compile(r"[0-9a-f]{32}")
+
+
+def _serializer(secret_key: str) -> URLSafeTimedSerializer:
+    if not secret_key:
+        # An empty key would let anyone sign links.
+        raise ValueError("Reference links need a SECRET_KEY.")
+    return URLSafeTimedSerializer(secret_key, salt="rentright-reference")
+
+
+def sign_reference_token(token: str, secret_key: str) -> str:
+    return _serializer(secret_key).dumps(token)
+
+
+def unsign_reference_token(value: str | None, secret_key: str, max_age: int = REFERENCE_LINK_MAX_AGE,
+                           allow_legacy: bool = False) -> str | None:
+    """Return the request token inside a signed `?ref=` value, or None if it is not valid."""
+    if not value or len(value) > 256:
+        return None
+    if allow_legacy and _LEGACY_TOKEN.fullmatch(value):
+        return value
+    try:
+        token = _serializer(secret_key).loads(value, max_age=max_age)
+    except (SignatureExpired, BadSignature):
+        return None
+    return token if isinstance(token, str) else None
+
+
+def reference_link(base_url: str, token: str, secret_key: str) -> str:
+    ref = sign_reference_token(token, secret_key)
+    base = (base_url or "").strip().rstrip("/")
+    return f"{base}/?ref={ref}" if base else f"?ref={ref}"
+
+
+def link_max_age(secrets: dict | None = None) -> int:
+    """REFERENCE_LINK_DAYS from secrets in seconds, else REFERENCE_LINK_MAX_AGE."""
+    return int(float((secrets or {}).get("REFERENCE_LINK_DAYS", 0)) * 86400) or REFERENCE_LINK_MAX_AGE
+
+
+def legacy_tokens_until(secrets: dict | None = None) -> date | None:
+    """Last day bare tokens are accepted: LEGACY_TOKENS_UNTIL (required, ISO date) when ALLOW_LEGACY_TOKENS is on."""
+    sec = secrets or {}
+    if str(sec.get("ALLOW_LEGACY_TOKENS", "")).lower() not in ("1", "true", "yes"):
+        return None
+    try:
+        return date.fromisoformat(str(sec.get("LEGACY_TOKENS_UNTIL", "")))
+    except ValueError:
+        return None
+
+
+def legacy_tokens_allowed(secrets: dict | None = None, today: date | None = None) -> bool:
+    """ALLOW_LEGACY_TOKENS from secrets, only until LEGACY_TOKENS_UNTIL."""
+    until = legacy_tokens_until(secrets)
+    return until is not None and (today or date.today()) <= until
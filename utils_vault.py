@@ -1,23 +1,34 @@
+"""Contract encryption at rest (Fernet).
 
+cryptography is imported, and FERNET_KEY read, on first use rather than at
+import, so importing this module is free and a missing key only fails the
+call that actually needs it.
+"""
 import os, hashlib
-from cryptography.fernet import Fernet, InvalidToken
 
-# Load Fernet key from env or (preferred) Streamlit secrets
-FERNET_KEY = os.environ.get("FERNET_KEY") or os.environ.get("STREAMLIT_FERNET_KEY")
-if not FERNET_KEY:
-    # For safety, do NOT auto-generate silently in production. Raise to avoid storing plaintext.
-    raise RuntimeError("Missing FERNET_KEY in environment (or STREAMLIT_FERNET_KEY).")
+_fernet = None
 
-fernet = Fernet(FERNET_KEY)
+
+def get_fernet():
+    """Fernet for FERNET_KEY (or STREAMLIT_FERNET_KEY); built once per process."""
+    global _fernet
+    if _fernet is None:
+        key = os.environ.get("FERNET_KEY") or os.environ.get("STREAMLIT_FERNET_KEY")
+        if not key:
+            # For safety, do NOT auto-generate silently in production. Raise to avoid storing plaintext.
+            raise RuntimeError("Missing FERNET_KEY in environment (or STREAMLIT_FERNET_KEY).")
+        from cryptography.fernet import Fernet
+        _fernet = Fernet(key)
+    return _fernet
 
 def sha256_bytes(b: bytes) -> str:
     return hashlib.sha256(b).hexdigest()
 
 def encrypt_bytes(b: bytes) -> bytes:
-    return fernet.encrypt(b)
+    return get_fernet().encrypt(b)
 
 def decrypt_bytes(b: bytes) -> bytes:
-    return fernet.decrypt(b)
+    return get_fernet().decrypt(b)
 
 def is_encrypted_sample(b: bytes) -> bool:
     # Fernet tokens always start with 'gAAAAA' (base64). This is heuristic.